@@ -1,3 +1,4 @@
+import os
 import sys
 import logging
 import traceback
@@ -22,8 +23,26 @@ def setup_logging():
         ]
     )
 
+def setup_metrics():
+    """环境变量SM2_METRICS_INTERVAL大于0时开启性能计数，每隔该秒数写入日志；
+    同时设置SM2_METRICS_PROM时把Prometheus文本写入该路径
+    """
+    try:
+        interval = float(os.environ.get('SM2_METRICS_INTERVAL') or 0)
+    except ValueError:
+        logging.warning("SM2_METRICS_INTERVAL不是有效的秒数，未开启性能计数")
+        return None
+    if interval <= 0:
+        return None
+    from sm2_core import enable_metrics, MetricsLogger
+    enable_metrics()
+    logging.info(f"已开启性能计数，每{interval:g}秒记录一次")
+    return MetricsLogger(interval, logging.getLogger('sm2.metrics'),
+                         os.environ.get('SM2_METRICS_PROM') or None).start()
+
 def main():
     """主函数"""
+    metrics_logger = None
     try:
         # 确保工作目录正确
         exe_dir = Path(sys.executable).parent if getattr(sys, 'frozen', False) else Path(__file__).parent
@@ -36,6 +55,9 @@ def main():
         logging.info(f"SM2签名验证系统 v{VERSION} 启动")
         logging.info(f"工作目录: {exe_dir}")
         
+        # 性能计数（默认关闭）
+        metrics_logger = setup_metrics()
+        
         # 创建必要的目录
         for dir_name in ['assets/keys', 'data/input', 'data/signed']:
             (exe_dir / dir_name).mkdir(parents=True, exist_ok=True)
@@ -50,6 +72,10 @@ def main():
         if getattr(sys, 'frozen', False):
             input("\n程序出错，按回车键退出...")
         sys.exit(1)
+    finally:
+        # GUI出错退出时也停止后台记录线程
+        if metrics_logger is not None:
+            metrics_logger.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
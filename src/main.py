@@ -1,9 +1,8 @@
 import argparse
 import sys
 from pathlib import Path
-from tkinter import Tk, ttk, messagebox
-from sm2_gui import SM2GUI
-from sm2_core import SM2
+
+# tkinter和sm2_gui只在启动图形界面时才导入，命令行/无界面调用不加载GUI相关模块
 
 def create_project_structure():
     """
@@ -51,6 +50,8 @@ def setup_style(root):
     3. 窗口大小和位置（居中显示）
     4. 窗口缩放属性
     """
+    from tkinter import ttk
+
     style = ttk.Style()
     style.configure('TButton', padding=5, font=('微软雅黑', 9))
     style.configure('TLabel', font=('微软雅黑', 9))
@@ -74,6 +75,9 @@ def run_gui():
     3. 创建SM2GUI实例并启动主循环
     4. 捕获和处理异常
     """
+    from tkinter import Tk, messagebox
+    from sm2_gui import SM2GUI
+
     try:
         # 创建目录结构
         create_project_structure()
@@ -93,21 +97,373 @@ def run_gui():
         messagebox.showerror("错误", f"程序运行出错: {str(e)}")
         sys.exit(1)
 
+def run_keygen(args):
+    """
+    批量生成密钥对（无界面）
+    私钥使用密码学安全随机数，公钥计算分批交给多个进程，
+    结果流式写入输出文件，指定--keystore时写入密钥库
+    """
+    import time
+    from sm2_parallel import generate_keypairs_to_file, generate_keypairs_to_keystore
+
+    start = time.perf_counter()
+    if args.keystore:
+        from sm2_keystore import KeyStore
+        with KeyStore(args.keystore) as store:
+            count = generate_keypairs_to_keystore(store, args.count, processes=args.processes,
+                                                  batch_size=args.batch_size, label=args.label)
+        destination = args.keystore
+    else:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        count = generate_keypairs_to_file(output, args.count, processes=args.processes, batch_size=args.batch_size)
+        destination = output
+    elapsed = time.perf_counter() - start
+    print(f"已生成 {count} 个密钥对 -> {destination}")
+    print(f"耗时 {elapsed:.2f} 秒，{count / elapsed if elapsed else 0:.1f} 个/秒")
+
+def load_signing_key(args):
+    """从密钥库中取签名私钥：指定--key时按指纹查找，否则使用默认密钥；找不到时返回None"""
+    from sm2_keystore import KeyStore
+
+    with KeyStore(args.keystore) as store:
+        record = store.get(args.key) if args.key else store.get_default()
+    return None if record is None else record.private_key
+
+def run_sign(args):
+    """
+    批量签名目录树（无界面）
+    I/O线程池计算文件杂凑值，进程池计算签名，签名记录写入输出目录或签名包
+    """
+    from sm2_pipeline import sign_tree
+
+    private_key = load_signing_key(args)
+    if private_key is None:
+        print("错误: 密钥库中没有可用的签名私钥", file=sys.stderr)
+        return 2
+
+    def report_error(relpath, message):
+        print(f"签名失败: {relpath}: {message}", file=sys.stderr)
+
+    output_dir = None if args.bundle else args.output
+    stats = sign_tree(args.input, private_key, output_dir=output_dir, bundle_path=args.bundle,
+                      io_threads=args.threads, processes=args.processes, on_error=report_error)
+    print(f"已签名 {stats.files} 个文件 ({stats.bytes / (1 << 20):.1f} MB) -> {args.bundle or output_dir}")
+    print(f"耗时 {stats.elapsed:.2f} 秒，{stats.files_per_second:.1f} 个文件/秒，{stats.mb_per_second:.1f} MB/秒")
+    if stats.failed:
+        print(f"失败 {stats.failed} 个文件", file=sys.stderr)
+        return 1
+    return 0
+
+def run_verify(args):
+    """
+    批量验证签名（无界面）
+    逐条以JSON Lines格式输出每个文件的验签结果和耗时，最后一行为汇总；任何一个文件验证失败时返回非零值
+    指定--manifest时按Merkle清单验证，清单的公钥必须在密钥库中
+    """
+    import json
+    import time
+    from sm2_keystore import KeyStore
+    from sm2_pipeline import iter_verify_tree
+
+    store = KeyStore(args.keystore)
+    if args.manifest:
+        from sm2_manifest import Manifest, iter_verify_manifest
+        manifest = Manifest.load(args.manifest)
+        if manifest.public_key.fingerprint() not in store:
+            print("错误: 清单的签名公钥不在密钥库中", file=sys.stderr)
+            store.close()
+            return 1
+        results = iter_verify_manifest(manifest, args.input, processes=args.processes)
+    else:
+        results = iter_verify_tree(args.signed, args.input, store.get_public_key, processes=args.processes)
+
+    report = sys.stdout if args.report == '-' else open(args.report, 'w', encoding='utf-8')
+    files = failed = total_bytes = 0
+    start = time.perf_counter()
+    try:
+        with store:
+            for result in results:
+                files += 1
+                total_bytes += result.size
+                if not result.ok:
+                    failed += 1
+                report.write(json.dumps(result.to_dict(), ensure_ascii=False) + '\n')
+        elapsed = time.perf_counter() - start
+        summary = {
+            'files': files,
+            'failed': failed,
+            'bytes': total_bytes,
+            'elapsed_s': round(elapsed, 3),
+            'files_per_second': round(files / elapsed, 1) if elapsed else 0.0,
+            'mb_per_second': round(total_bytes / elapsed / (1 << 20), 3) if elapsed else 0.0,
+        }
+        report.write(json.dumps({'summary': summary}, ensure_ascii=False) + '\n')
+    finally:
+        if report is not sys.stdout:
+            report.close()
+    print(f"已验证 {files} 个文件，失败 {failed} 个，耗时 {elapsed:.2f} 秒，"
+          f"{summary['files_per_second']} 个文件/秒", file=sys.stderr)
+    return 1 if failed else 0
+
+def run_manifest(args):
+    """
+    生成并签名Merkle清单（无界面）
+    文件摘要缓存在--cache指定的文件中，再次生成时只重新计算变化的文件
+    """
+    from sm2_manifest import DigestCache, build_manifest
+
+    private_key = load_signing_key(args)
+    if private_key is None:
+        print("错误: 密钥库中没有可用的签名私钥", file=sys.stderr)
+        return 2
+    Path(args.cache).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with DigestCache(args.cache) as cache:
+        manifest = build_manifest(args.input, private_key, cache, processes=args.processes,
+                                  exclude=[Path(args.cache).parent, Path(args.output).parent])
+        print(f"清单包含 {len(manifest.entries)} 个文件，重新计算摘要 {cache.misses} 个，命中缓存 {cache.hits} 个")
+    manifest.save(args.output)
+    print(f"Merkle根: {manifest.root.hex()}")
+    print(f"清单已签名 -> {args.output}")
+    return 0
+
+def run_proof(args):
+    """从清单中导出单个文件的包含证明"""
+    import json
+    from sm2_manifest import Manifest
+
+    manifest = Manifest.load(args.manifest)
+    try:
+        proof = manifest.proof(args.path)
+    except KeyError:
+        print(f"错误: 清单中没有 {args.path}", file=sys.stderr)
+        return 1
+    output = args.output or f"{Path(args.path).name}.proof"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(proof, f, ensure_ascii=False, indent=1)
+    print(f"包含证明 -> {output}")
+    return 0
+
+def run_verify_proof(args):
+    """
+    用包含证明验证单个文件，不需要整个清单
+    根的签名用--public-key或密钥库中的公钥验证，不信任证明中自带的公钥
+    """
+    import json
+    from sm2_core import SM2PublicKey
+    from sm2_manifest import verify_proof
+
+    with open(args.proof, 'r', encoding='utf-8') as f:
+        proof = json.load(f)
+    if args.public_key:
+        try:
+            public_key = SM2PublicKey.from_hex(args.public_key)
+        except ValueError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            return 1
+    else:
+        from sm2_keystore import KeyStore
+        try:
+            fingerprint = SM2PublicKey.from_hex(proof['public_key']).fingerprint()
+        except ValueError as e:
+            print(f"错误: 证明中的{e}", file=sys.stderr)
+            return 1
+        with KeyStore(args.keystore) as store:
+            public_key = store.get_public_key(fingerprint)
+        if public_key is None:
+            print("错误: 证明的签名公钥不在密钥库中", file=sys.stderr)
+            return 1
+    ok = verify_proof(args.file, proof, public_key=public_key)
+    print("验证成功" if ok else "验证失败")
+    return 0 if ok else 1
+
+def run_serve(args):
+    """
+    启动本地签名/验签守护进程（无界面）
+    密钥库和预计算表常驻内存，其他服务通过sm2_client连接Unix套接字或本机TCP端口请求签名
+    """
+    import asyncio
+    from sm2_daemon import SigningDaemon
+    from sm2_keystore import KeyStore
+
+    store = KeyStore(args.keystore)
+    daemon = SigningDaemon(store, processes=args.processes, batch_window=args.batch_window / 1000,
+                           batch_size=args.batch_size, max_pending=args.max_pending)
+    if args.port is not None:
+        print(f"守护进程监听 127.0.0.1:{args.port}", file=sys.stderr)
+        serve = daemon.serve_tcp('127.0.0.1', args.port)
+    else:
+        print(f"守护进程监听 {args.socket}", file=sys.stderr)
+        serve = daemon.serve_unix(args.socket)
+    try:
+        asyncio.run(serve)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+    return 0
+
+def run_bench(args):
+    """
+    运行SM2/SM3基准测试并与gmssl对比（无界面）
+    指定--output时保存JSON结果；指定--compare时与之前的结果对比，任何一项退化超过--threshold时返回非零值
+    """
+    from sm2_bench import (DEFAULT_SIZES, FULL_SIZES, SM3_STREAM_CHUNK, case_names, compare_results,
+                           format_results, load_results, parse_size, run_benchmarks, save_results)
+
+    baseline_max_size = parse_size(args.baseline_max_size)
+    if baseline_max_size > SM3_STREAM_CHUNK:
+        print("错误: --baseline-max-size不能超过1M，gmssl的SM3无法分段处理更大的消息", file=sys.stderr)
+        return 1
+    if args.sizes:
+        sizes = [parse_size(size) for size in args.sizes.split(',')]
+    else:
+        sizes = FULL_SIZES if args.full else DEFAULT_SIZES
+    names = case_names(sizes)
+    if args.only:
+        prefixes = [name.strip() for name in args.only.split(',')]
+        names = [name for name in names if any(name == p or name.startswith(p + '/') for p in prefixes)]
+
+    def report(result):
+        if 'error' in result:
+            print(f"{result['name']} [{result['impl']}] 出错: {result['error']}", file=sys.stderr)
+        else:
+            print(f"{result['name']} [{result['impl']}] {result['ops_per_s']:.1f} ops/s", file=sys.stderr)
+
+    results = run_benchmarks(names, sizes, baseline=not args.no_baseline,
+                             baseline_max_size=baseline_max_size,
+                             min_time=args.min_time, on_result=report)
+    print(format_results(results))
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        save_results(results, args.output)
+        print(f"结果已保存 -> {args.output}")
+    if not args.compare:
+        return 0
+    regressions = 0
+    print(f"\n与 {args.compare} 对比（{'相对gmssl的倍数' if args.relative else 'ops/s'}，阈值 {args.threshold:.0%}）：")
+    for name, before, after, change, regressed in compare_results(load_results(args.compare), results,
+                                                                  args.threshold, args.relative):
+        regressions += regressed
+        print(f"  {name:<24}{before:>12.2f} -> {after:<12.2f}{change:+.1%}{'  退化' if regressed else ''}")
+    if regressions:
+        print(f"{regressions} 项性能退化超过 {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
 def main():
     """
     主函数，处理命令行参数或启动GUI
     支持的命令行参数：
     --gui: 启动图形界面（默认选项）
+    keygen: 批量生成密钥对
+    sign: 批量签名目录下的所有文件
+    verify: 批量验证签名，输出JSON Lines报告
+    manifest / proof / verify-proof: Merkle清单签名、导出和验证单个文件的包含证明
+    serve: 启动本地签名/验签守护进程
+    bench: 基准测试，与gmssl对比并可与之前的结果对比
     
     如果没有参数，默认启动图形界面
     """
     parser = argparse.ArgumentParser(description='SM2签名验证系统')
     parser.add_argument('--gui', action='store_true', help='启动图形界面')
+    subparsers = parser.add_subparsers(dest='command')
+    
+    keygen_parser = subparsers.add_parser('keygen', help='批量生成密钥对')
+    keygen_parser.add_argument('-n', '--count', type=int, required=True, help='生成的密钥对数量')
+    keygen_parser.add_argument('-o', '--output', default=str(Path(__file__).parent / 'assets' / 'keys' / 'keypairs.txt'),
+                               help='输出文件，每行为"私钥 公钥X 公钥Y"')
+    keygen_parser.add_argument('-p', '--processes', type=int, default=None, help='工作进程数，默认为CPU核心数')
+    keygen_parser.add_argument('--batch-size', type=int, default=1024, help='每个进程任务生成的密钥对数量')
+    keygen_parser.add_argument('--keystore', help='写入指定的密钥库文件，而不是文本文件')
+    keygen_parser.add_argument('--label', help='写入密钥库时使用的标签')
+    
+    base_path = Path(__file__).parent
+    sign_parser = subparsers.add_parser('sign', help='批量签名目录下的所有文件')
+    sign_parser.add_argument('-i', '--input', default=str(base_path / 'data' / 'input'), help='待签名的目录')
+    sign_parser.add_argument('-o', '--output', default=str(base_path / 'data' / 'signed'),
+                             help='签名输出目录，保持与输入相同的相对路径')
+    sign_parser.add_argument('--bundle', help='把所有签名写入一个签名包文件，而不是单独的.sig文件')
+    sign_parser.add_argument('--keystore', default=str(base_path / 'assets' / 'keys' / 'keystore.db'), help='密钥库文件')
+    sign_parser.add_argument('--key', help='签名私钥的指纹，默认使用密钥库中的默认密钥')
+    sign_parser.add_argument('-t', '--threads', type=int, default=4, help='读取和杂凑文件的线程数')
+    sign_parser.add_argument('-p', '--processes', type=int, default=None, help='签名进程数，默认为CPU核心数')
+    
+    verify_parser = subparsers.add_parser('verify', help='批量验证签名，输出JSON Lines报告')
+    verify_parser.add_argument('-s', '--signed', default=str(base_path / 'data' / 'signed'),
+                               help='签名目录或签名包文件')
+    verify_parser.add_argument('-i', '--input', default=str(base_path / 'data' / 'input'), help='原始文件所在目录')
+    verify_parser.add_argument('-r', '--report', default='-', help='报告文件，默认输出到标准输出')
+    verify_parser.add_argument('--keystore', default=str(base_path / 'assets' / 'keys' / 'keystore.db'),
+                               help='按指纹查找签名公钥的密钥库文件')
+    verify_parser.add_argument('-m', '--manifest', help='按Merkle清单验证，而不是逐个签名文件')
+    verify_parser.add_argument('-p', '--processes', type=int, default=None, help='验签进程数，默认为CPU核心数')
+    
+    manifest_parser = subparsers.add_parser('manifest', help='生成并签名目录的Merkle清单')
+    manifest_parser.add_argument('-i', '--input', default=str(base_path / 'data' / 'input'), help='目录')
+    manifest_parser.add_argument('-o', '--output', default=str(base_path / 'data' / 'signed' / 'manifest.json'),
+                                 help='清单文件')
+    manifest_parser.add_argument('--cache', default=str(base_path / 'data' / 'signed' / 'digest_cache.db'),
+                                 help='文件摘要缓存')
+    manifest_parser.add_argument('--keystore', default=str(base_path / 'assets' / 'keys' / 'keystore.db'), help='密钥库文件')
+    manifest_parser.add_argument('--key', help='签名私钥的指纹，默认使用密钥库中的默认密钥')
+    manifest_parser.add_argument('-p', '--processes', type=int, default=None, help='计算摘要的进程数，默认为CPU核心数')
+    
+    proof_parser = subparsers.add_parser('proof', help='从清单导出单个文件的包含证明')
+    proof_parser.add_argument('manifest', help='清单文件')
+    proof_parser.add_argument('path', help='文件在清单中的相对路径')
+    proof_parser.add_argument('-o', '--output', help='证明文件，默认为<文件名>.proof')
+    
+    verify_proof_parser = subparsers.add_parser('verify-proof', help='用包含证明验证单个文件')
+    verify_proof_parser.add_argument('file', help='待验证的文件')
+    verify_proof_parser.add_argument('proof', help='包含证明文件')
+    verify_proof_parser.add_argument('--keystore', default=str(base_path / 'assets' / 'keys' / 'keystore.db'),
+                                     help='可信公钥所在的密钥库文件，证明的签名公钥必须在其中')
+    verify_proof_parser.add_argument('--public-key', help='可信的签名公钥（128位十六进制，可带04前缀），指定时不使用密钥库')
+    
+    serve_parser = subparsers.add_parser('serve', help='启动本地签名/验签守护进程')
+    serve_parser.add_argument('--socket', default=str(base_path / 'assets' / 'sm2d.sock'), help='Unix套接字路径')
+    serve_parser.add_argument('--port', type=int, help='改为监听本机TCP端口')
+    serve_parser.add_argument('--keystore', default=str(base_path / 'assets' / 'keys' / 'keystore.db'), help='密钥库文件')
+    serve_parser.add_argument('-p', '--processes', type=int, default=None, help='工作进程数，默认为CPU核心数')
+    serve_parser.add_argument('--batch-window', type=float, default=2.0, help='微批等待时间(毫秒)')
+    serve_parser.add_argument('--batch-size', type=int, default=64, help='每批最多的请求数')
+    serve_parser.add_argument('--max-pending', type=int, default=1024, help='同时处理中的请求数上限')
+    
+    bench_parser = subparsers.add_parser('bench', help='SM2/SM3基准测试，与gmssl对比')
+    bench_parser.add_argument('-o', '--output', help='保存JSON结果的文件')
+    bench_parser.add_argument('--compare', help='与之前保存的JSON结果对比')
+    bench_parser.add_argument('--threshold', type=float, default=0.10, help='每秒操作数下降超过该比例视为退化')
+    bench_parser.add_argument('--relative', action='store_true', help='对比相对gmssl的倍数，而不是绝对的每秒操作数')
+    bench_parser.add_argument('--sizes', help='SM3消息长度，逗号分隔，例如64,1K,1M,1G')
+    bench_parser.add_argument('--full', action='store_true', help='SM3消息长度从64B到1GB（耗时很长）')
+    bench_parser.add_argument('--only', help='只运行指定的测试项，逗号分隔，例如sign,verify,sm3')
+    bench_parser.add_argument('--min-time', type=float, default=1.0, help='每项至少运行的秒数')
+    bench_parser.add_argument('--no-baseline', action='store_true', help='不运行gmssl基线')
+    bench_parser.add_argument('--baseline-max-size', default='64K', help='gmssl的SM3基线只测到该消息长度，最大1M')
     
     args = parser.parse_args()
     
-    if args.gui or len(sys.argv) == 1:
+    if args.command == 'keygen':
+        run_keygen(args)
+    elif args.command == 'sign':
+        return run_sign(args)
+    elif args.command == 'verify':
+        return run_verify(args)
+    elif args.command == 'manifest':
+        return run_manifest(args)
+    elif args.command == 'proof':
+        return run_proof(args)
+    elif args.command == 'verify-proof':
+        return run_verify_proof(args)
+    elif args.command == 'serve':
+        return run_serve(args)
+    elif args.command == 'bench':
+        return run_bench(args)
+    elif args.gui or len(sys.argv) == 1:
         run_gui()
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,350 @@
+"""SM2/SM3热点路径的基准测试
+覆盖addPoint、multiPoint（任意点和固定基点）、compute_ZA、sign、verify、KDF以及不同长度消息的SM3，
+每项同时运行gmssl的对应实现(CryptSM2 / sm3)作为基线，报告每秒操作数、延迟分位数和峰值内存(RSS)。
+
+- 每个测试项在新启动的Python子进程中运行（不fork，不继承父进程的内存），峰值RSS只反映该项本身
+  （含解释器和导入的模块）；子进程先预热一次再计时，
+  循环到累计耗时达到min_time且次数达到min_iterations为止，每次调用单独计时
+- 1 MB以上的SM3消息不整体分配，而是反复送入同一个1 MB缓冲区，内存占用与消息长度无关；
+  SM3默认使用OpenSSL实现（每秒上百MB），回退到纯Python实现时每秒只有数百KB，1 GB一次需要数十分钟，
+  因此默认只测到1 MB（见FULL_SIZES），结果的meta中记录了所用的SM3实现
+- gmssl的SM3需要先把消息转换为整数列表，内存占用约为消息的数十倍，只对不超过baseline_max_size的消息运行，
+  baseline_max_size最大为SM3_STREAM_CHUNK(1 MB)
+- 结果保存为JSON，compare_results按(名称, 实现)对比两次结果，每秒操作数下降超过阈值即视为退化
+"""
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from sm2_core import SM2
+from sm3_core import SM3, SM3_BACKEND, sm3_hash
+
+try:
+    from gmssl import func as gmssl_func, sm2 as gmssl_sm2, sm3 as gmssl_sm3
+except ImportError:
+    gmssl_sm2 = None
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+RESULT_VERSION = 1
+IMPL = 'sm2_core'
+BASELINE = 'gmssl'
+DEFAULT_SIZES = (64, 1 << 10, 64 << 10, 1 << 20)
+FULL_SIZES = DEFAULT_SIZES + (16 << 20, 256 << 20, 1 << 30)
+SM3_STREAM_CHUNK = 1 << 20
+DEFAULT_BASELINE_MAX_SIZE = 64 << 10
+DEFAULT_THRESHOLD = 0.10
+_MESSAGE = b'benchmark message ' * 4
+# 预先生成的随机标量个数，计时循环中依次取用
+_SCALARS = 64
+
+
+def format_size(size):
+    for unit, shift in (('GB', 30), ('MB', 20), ('KB', 10)):
+        if size >= 1 << shift and size % (1 << shift) == 0:
+            return f"{size >> shift}{unit}"
+    return f"{size}B"
+
+
+def parse_size(text):
+    """'64'、'1K'、'64KB'、'1M'、'1G' -> 字节数"""
+    text = text.strip().upper().rstrip('B')
+    for suffix, shift in (('K', 10), ('M', 20), ('G', 30)):
+        if text.endswith(suffix):
+            return int(text[:-1]) << shift
+    return int(text)
+
+
+# ---- 测试项 ----
+
+def case_names(sizes=DEFAULT_SIZES):
+    """所有测试项名称，SM3按消息长度各为一项"""
+    names = ['addPoint', 'multiPoint/random', 'multiPoint/fixed_base', 'compute_ZA', 'sign', 'verify', 'KDF']
+    return names + [f"sm3/{format_size(size)}" for size in sizes]
+
+
+def _keys():
+    sm2 = SM2(load_key=False)
+    sm2.setSecretKey()
+    return sm2, sm2.PBx, sm2.PBy
+
+
+def _gmssl(sm2):
+    return gmssl_sm2.CryptSM2(private_key='%064x' % sm2.d, public_key='%064x%064x' % (sm2.PBx, sm2.PBy))
+
+
+def _make_op(name, impl):
+    """在子进程中构造测试项，返回(无参数的操作函数, 每次操作处理的字节数)；准备工作不计入耗时"""
+    sm2, Px, Py = _keys()
+    rng = random.Random(0x5332)
+    scalars = itertools.cycle([rng.randrange(1, sm2.n) for _ in range(_SCALARS)])
+    ours = impl == IMPL
+    crypt = None if ours else _gmssl(sm2)
+    point_hex = '%064x%064x' % (Px, Py)
+
+    if name == 'addPoint':
+        if ours:
+            G = [sm2.Gx, sm2.Gy]
+            return (lambda: sm2.addPoint(G, [Px, Py])), 0
+        g = crypt.ecc_table['g']
+        return (lambda: crypt._convert_jacb_to_nor(crypt._add_point(g, point_hex))), 0
+    if name == 'multiPoint/random':
+        if ours:
+            return (lambda: sm2.multiPoint([Px, Py], next(scalars))), 0
+        return (lambda: crypt._kg(next(scalars), point_hex)), 0
+    if name == 'multiPoint/fixed_base':
+        if ours:
+            sm2.base_multiply(1)    # 加载预计算表
+            return (lambda: sm2.base_multiply(next(scalars))), 0
+        g = crypt.ecc_table['g']
+        return (lambda: crypt._kg(next(scalars), g)), 0
+    if name == 'compute_ZA':
+        if ours:
+            # compute_ZA的结果会被缓存，每次先清空缓存以测量实际计算
+            def op():
+                sm2.za_cache.evict()
+                return sm2.compute_ZA(SM2.DEFAULT_USER_ID, Px, Py)
+            return op, 0
+        # gmssl不单独提供ZA，_sm3_z在ZA之外还会对空消息再做一次SM3
+        return (lambda: crypt._sm3_z(b'')), 0
+    if name == 'sign':
+        if ours:
+            sm2.base_multiply(1)
+            return (lambda: sm2.sign(_MESSAGE)), len(_MESSAGE)
+        return (lambda: crypt.sign_with_sm3(_MESSAGE)), len(_MESSAGE)
+    if name == 'verify':
+        if ours:
+            signature = sm2.sign(_MESSAGE)
+            return (lambda: sm2.verify(_MESSAGE, signature, Px, Py)), len(_MESSAGE)
+        signature = crypt.sign_with_sm3(_MESSAGE)
+        return (lambda: crypt.verify_with_sm3(signature, _MESSAGE)), len(_MESSAGE)
+    if name == 'KDF':
+        z = '%064X%064X' % (Px, Py)
+        if ours:
+            # 输出128字节密钥（KDF的klen以十六进制字符计）
+            return (lambda: sm2.KDF(z, 256)), 0
+        z = z.encode('utf-8')
+        return (lambda: gmssl_sm3.sm3_kdf(z, 128)), 0
+    if name.startswith('sm3/'):
+        size = parse_size(name[4:])
+        if not ours and size > SM3_STREAM_CHUNK:
+            # gmssl的SM3不支持分段输入，大消息无法在可控的内存内测量
+            raise ValueError(f"gmssl基线的SM3消息长度不能超过{format_size(SM3_STREAM_CHUNK)}")
+        if size > SM3_STREAM_CHUNK:
+            chunk = os.urandom(SM3_STREAM_CHUNK)
+            rounds = size // SM3_STREAM_CHUNK
+
+            def op():
+                hasher = SM3()
+                for _ in range(rounds):
+                    hasher.update(chunk)
+                return hasher.digest()
+            return op, size
+        data = os.urandom(size)
+        if ours:
+            return (lambda: sm3_hash(data)), size
+        return (lambda: gmssl_sm3.sm3_hash(gmssl_func.bytes_to_list(data))), size
+    raise ValueError(f"未知的测试项: {name}")
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(op, min_time=1.0, min_iterations=5, max_iterations=1000000, size=0):
+    """反复调用op并逐次计时，返回统计结果(dict)，延迟单位为微秒"""
+    op()    # 预热
+    latencies = []
+    total = 0
+    clock = time.perf_counter_ns
+    limit = min_time * 1e9
+    while (total < limit or len(latencies) < min_iterations) and len(latencies) < max_iterations:
+        start = clock()
+        op()
+        elapsed = clock() - start
+        latencies.append(elapsed)
+        total += elapsed
+    latencies.sort()
+    seconds = total / 1e9
+    result = {
+        'iterations': len(latencies),
+        'ops_per_s': round(len(latencies) / seconds, 3) if seconds else 0.0,
+        'mean_us': round(total / len(latencies) / 1000, 3),
+        'min_us': round(latencies[0] / 1000, 3),
+        'p50_us': round(_percentile(latencies, 0.50) / 1000, 3),
+        'p90_us': round(_percentile(latencies, 0.90) / 1000, 3),
+        'p99_us': round(_percentile(latencies, 0.99) / 1000, 3),
+    }
+    if size:
+        result['mb_per_s'] = round(size * len(latencies) / seconds / (1 << 20), 3) if seconds else 0.0
+    return result
+
+
+def peak_rss_kb():
+    """当前进程的峰值常驻内存(KB)，平台不支持时返回None
+    Linux上读取/proc/self/status中的VmHWM：getrusage的ru_maxrss在fork和exec之后保留父进程的峰值
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _run_case(name, impl, min_time, min_iterations):
+    op, size = _make_op(name, impl)
+    result = {'name': name, 'impl': impl}
+    result.update(measure(op, min_time, min_iterations, size=size))
+    return result
+
+
+# 子进程为新启动的解释器，只导入本模块；不用multiprocessing，避免fork继承父进程的内存，
+# 也避免spawn重新执行调用方的主模块
+_CHILD_CODE = "import sys; sys.path.insert(0, sys.argv[1]); import sm2_bench; sm2_bench._child_main(sys.argv[2])"
+
+
+def _child_main(args):
+    """子进程入口：args为JSON编码的_run_case参数，结果以JSON写到标准输出"""
+    args = json.loads(args)
+    try:
+        result = _run_case(*args)
+        result['peak_rss_kb'] = peak_rss_kb()
+    except BaseException as exc:
+        result = {'name': args[0], 'impl': args[1], 'error': f"{type(exc).__name__}: {exc}"}
+    sys.stdout.write(json.dumps(result))
+
+
+def run_case(name, impl=IMPL, min_time=1.0, min_iterations=5, isolate=True):
+    """运行单个测试项；isolate为True时在新启动的子进程中运行，结果带该进程的峰值RSS(peak_rss_kb)。
+    isolate为False时在当前进程中运行，当前进程的峰值RSS是整个生命周期的峰值，不代表该项，因此不记录
+    """
+    args = (name, impl, min_time, min_iterations)
+    if not isolate:
+        return _run_case(*args)
+    directory = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.run([sys.executable, '-c', _CHILD_CODE, directory, json.dumps(args)],
+                             stdout=subprocess.PIPE)
+    try:
+        return json.loads(process.stdout)
+    except ValueError:
+        return {'name': name, 'impl': impl, 'error': f"子进程异常退出(退出码{process.returncode})"}
+
+
+def run_benchmarks(names=None, sizes=DEFAULT_SIZES, baseline=True, baseline_max_size=DEFAULT_BASELINE_MAX_SIZE,
+                   min_time=1.0, min_iterations=5, isolate=True, on_result=None):
+    """运行测试项并返回结果(dict，可直接保存为JSON)；on_result(单项结果)在每项完成时调用
+    baseline_max_size不能超过SM3_STREAM_CHUNK：更大的消息只有本实现能分段送入
+    """
+    if baseline_max_size > SM3_STREAM_CHUNK:
+        raise ValueError(f"baseline_max_size不能超过{format_size(SM3_STREAM_CHUNK)}")
+    if baseline and gmssl_sm2 is None:
+        baseline = False
+    results = []
+    for name in names or case_names(sizes):
+        impls = [IMPL]
+        if baseline and not (name.startswith('sm3/') and parse_size(name[4:]) > baseline_max_size):
+            impls.append(BASELINE)
+        for impl in impls:
+            result = run_case(name, impl, min_time, min_iterations, isolate)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    return {'version': RESULT_VERSION, 'meta': environment(), 'results': results}
+
+
+def environment():
+    meta = {
+        'created': int(time.time()),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'sm3_backend': SM3_BACKEND,
+    }
+    if gmssl_sm2 is not None:
+        try:
+            from importlib.metadata import version
+            meta['gmssl'] = version('gmssl')
+        except Exception:
+            meta['gmssl'] = 'unknown'
+    return meta
+
+
+# ---- 结果保存与对比 ----
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=1)
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    if results.get('version') != RESULT_VERSION:
+        raise ValueError("不支持的基准测试结果版本")
+    return results
+
+
+def _index(results):
+    return {(item['name'], item['impl']): item for item in results['results'] if 'error' not in item}
+
+
+def speedups(results):
+    """{名称: sm2_core相对gmssl的每秒操作数倍数}"""
+    index = _index(results)
+    ratios = {}
+    for (name, impl), item in index.items():
+        base = index.get((name, BASELINE))
+        if impl == IMPL and base is not None and base['ops_per_s']:
+            ratios[name] = item['ops_per_s'] / base['ops_per_s']
+    return ratios
+
+
+def compare_results(old, new, threshold=DEFAULT_THRESHOLD, relative=False):
+    """对比两次结果中sm2_core的每秒操作数，返回[(名称, 旧值, 新值, 变化比例, 是否退化)]
+    relative为True时对比相对gmssl的倍数而不是绝对值，可以抵消两台机器之间的性能差异
+    """
+    if relative:
+        before, after = speedups(old), speedups(new)
+    else:
+        before = {name: item['ops_per_s'] for (name, impl), item in _index(old).items() if impl == IMPL}
+        after = {name: item['ops_per_s'] for (name, impl), item in _index(new).items() if impl == IMPL}
+    rows = []
+    for name, value in after.items():
+        previous = before.get(name)
+        if not previous:
+            continue
+        change = value / previous - 1
+        rows.append((name, previous, value, change, change < -threshold))
+    return rows
+
+
+def format_results(results):
+    """结果表格（每项一行）"""
+    ratios = speedups(results)
+    lines = [f"{'测试项':<24}{'实现':<10}{'ops/s':>12}{'p50(us)':>12}{'p99(us)':>12}{'MB/s':>10}{'RSS(MB)':>9}{'倍数':>8}"]
+    for item in results['results']:
+        if 'error' in item:
+            lines.append(f"{item['name']:<24}{item['impl']:<10}  出错: {item['error']}")
+            continue
+        rss = item.get('peak_rss_kb')
+        ratio = ratios.get(item['name']) if item['impl'] == IMPL else None
+        lines.append(f"{item['name']:<24}{item['impl']:<10}{item['ops_per_s']:>12.1f}{item['p50_us']:>12.1f}"
+                     f"{item['p99_us']:>12.1f}{item.get('mb_per_s', ''):>10}"
+                     f"{rss / 1024 if rss else 0:>9.1f}{f'{ratio:.1f}x' if ratio else '':>8}")
+    return '\n'.join(lines)
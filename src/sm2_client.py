@@ -0,0 +1,142 @@
+"""SM2签名守护进程(sm2_daemon)的客户端
+只依赖标准库，同步阻塞调用：
+    with SM2Client('/path/to/sm2d.sock') as client:        # 或 SM2Client(port=8765)
+        r, s = client.sign(b'message')
+        ok = client.verify((r, s), b'message', public_key='04...')
+sign_many / verify_many 在同一连接上连续发送请求而不逐个等待响应（在途请求数不超过PIPELINE_WINDOW），
+守护进程可以把它们合并为少数几个批次。
+"""
+import base64
+import json
+import os
+import socket
+
+DEFAULT_SOCKET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'sm2d.sock')
+# 批量调用时已发送但尚未收到响应的请求数上限，避免双方都因对方不读取而阻塞在写入上
+PIPELINE_WINDOW = 256
+
+
+class DaemonError(Exception):
+    """守护进程返回的错误响应"""
+
+
+def _message_fields(data=None, digest=None):
+    if (data is None) == (digest is None):
+        raise ValueError("data和digest必须且只能指定一个")
+    if digest is not None:
+        return {'digest': digest.hex() if isinstance(digest, (bytes, bytearray)) else digest}
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return {'data': base64.b64encode(data).decode('ascii')}
+
+
+def _signature_fields(signature):
+    r, s = signature
+    return ['%064X' % r if isinstance(r, int) else r, '%064X' % s if isinstance(s, int) else s]
+
+
+def _public_key_fields(public_key=None, key=None):
+    if public_key is not None:
+        return {'public_key': public_key if isinstance(public_key, str) else public_key.to_hex()}
+    if key is not None:
+        return {'key': key.hex() if isinstance(key, (bytes, bytearray)) else key}
+    raise ValueError("验签需要指定public_key或key")
+
+
+class SM2Client:
+    """守护进程客户端；path为Unix套接字路径，指定port时改为连接host:port"""
+
+    def __init__(self, path=None, host='127.0.0.1', port=None, timeout=30.0):
+        if port is not None:
+            self._sock = socket.create_connection((host, port), timeout=timeout)
+        else:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(timeout)
+            self._sock.connect(path or DEFAULT_SOCKET_PATH)
+        self._reader = self._sock.makefile('rb')
+        self._next_id = 0
+
+    def _send(self, request):
+        self._next_id += 1
+        request['id'] = self._next_id
+        self._sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        return self._next_id
+
+    def _receive(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("守护进程关闭了连接")
+        return json.loads(line)
+
+    def _call_many(self, requests):
+        """连续发送请求，在途请求达到PIPELINE_WINDOW时先读取响应，按请求顺序返回响应"""
+        ids = []
+        responses = {}
+
+        def receive():
+            response = self._receive()
+            if response.get('id') is None:
+                raise DaemonError(response.get('error'))
+            responses[response['id']] = response
+
+        for request in requests:
+            while len(ids) - len(responses) >= PIPELINE_WINDOW:
+                receive()
+            ids.append(self._send(request))
+        while len(responses) < len(ids):
+            receive()
+        return [responses[i] for i in ids]
+
+    def _call(self, request):
+        response = self._call_many([request])[0]
+        if not response.get('ok'):
+            raise DaemonError(response.get('error'))
+        return response
+
+    def ping(self):
+        return self._call({'op': 'ping'})['ok']
+
+    def stats(self):
+        return self._call({'op': 'stats'})['stats']
+
+    def sign(self, data=None, digest=None, key=None):
+        """对数据或已计算好的e = H(ZA || M)签名，返回(r, s)；key为签名私钥的指纹，默认使用守护进程的默认密钥"""
+        request = {'op': 'sign', **_message_fields(data, digest)}
+        if key is not None:
+            request['key'] = key.hex() if isinstance(key, (bytes, bytearray)) else key
+        return tuple(int(v, 16) for v in self._call(request)['signature'])
+
+    def verify(self, signature, data=None, digest=None, public_key=None, key=None):
+        """验证签名，public_key为SM2PublicKey或十六进制字符串，也可以用key指定密钥库中的公钥指纹"""
+        request = {'op': 'verify', 'signature': _signature_fields(signature),
+                   **_message_fields(data, digest), **_public_key_fields(public_key, key)}
+        return self._call(request)['valid']
+
+    def sign_many(self, messages, key=None):
+        """对多条数据签名，返回[(r, s)或DaemonError]，与输入一一对应"""
+        requests = []
+        for data in messages:
+            request = {'op': 'sign', **_message_fields(data)}
+            if key is not None:
+                request['key'] = key.hex() if isinstance(key, (bytes, bytearray)) else key
+            requests.append(request)
+        return [tuple(int(v, 16) for v in response['signature']) if response.get('ok')
+                else DaemonError(response.get('error')) for response in self._call_many(requests)]
+
+    def verify_many(self, items, public_key=None, key=None):
+        """items为[(数据, (r, s))]，返回[bool或DaemonError]"""
+        fields = _public_key_fields(public_key, key)
+        requests = [{'op': 'verify', 'signature': _signature_fields(signature), **_message_fields(data), **fields}
+                    for data, signature in items]
+        return [response['valid'] if response.get('ok') else DaemonError(response.get('error'))
+                for response in self._call_many(requests)]
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,39 +1,197 @@
+import functools
 import hashlib
+import json
+import logging
 import math
-import random
-import sys
+import secrets
 import os
-from gmssl import sm3, func
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from sm2_field import P as FIELD_P, fp_batch_inv, fp_inv, fp_reduce, fp_sqr
+from sm2_tables import load_tables, save_tables
+from sm3_core import SM3, sm3_hash, update_from_stream, update_from_file
+
+# 验签失败原因只写入日志，不输出到stdout（批量验签的JSON Lines报告默认写到stdout）
+logger = logging.getLogger('sm2.core')
+
+
+class LRUCache:
+    """线程安全的定长LRU缓存
+    超出容量时淘汰最久未使用的条目，并统计命中/未命中次数
+    """
+
+    def __init__(self, capacity=128):
+        if capacity < 1:
+            raise ValueError("缓存容量必须大于0")
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def evict(self, key=None):
+        """淘汰指定条目；key为None时清空整个缓存"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def resize(self, capacity):
+        if capacity < 1:
+            raise ValueError("缓存容量必须大于0")
+        with self._lock:
+            self.capacity = capacity
+            while len(self._data) > capacity:
+                self._data.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'size': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class PublicKeyEntry:
+    """验签公钥的预计算结果：曲线校验结论、wNAF奇数倍点表和默认用户ID的ZA"""
+    __slots__ = ('point', 'valid', 'table', 'za')
+
+    def __init__(self, point, valid, table=None):
+        self.point = point
+        self.valid = valid
+        self.table = table
+        self.za = None
+
 
 class SM2:
-    def __init__(self, keyfile_path=None):
-        # SM2椭圆曲线推荐参数：
-        # y^2 = x^3 + ax + b over Fp
-        self.p = 0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00000000FFFFFFFFFFFFFFFF  # 有限域的模数
-        self.a = 0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00000000FFFFFFFFFFFFFFFC  # 椭圆曲线参数a
-        self.b = 0x28E9FA9E9D9F5E344D5A9E4BCF6509A7F39789F515AB8F92DDBCBD414D940E93  # 椭圆曲线参数b
-        self.n = 0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFF7203DF6B21C6052B53BBF40939D54123  # 基点G的阶，用于生成私钥
-        self.Gx = 0x32C4AE2C1F1981195F9904466A39C9948FE30BBFF2660BE1715A4589334C74C7  # 基点G的x坐标
-        self.Gy = 0xBC3736A2F4F6779C59BDCEE36B692153D0A9877CC62A474002DF32E52139F0A0  # 基点G的y坐标
-        self.h = 1  # 余因子，用于辅助计算公钥
-        keyfile_path = os.path.join(os.path.dirname(__file__), 'assets', 'keys.txt')
+    # SM2椭圆曲线推荐参数：
+    # y^2 = x^3 + ax + b over Fp
+    p = FIELD_P  # 有限域的模数 0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00000000FFFFFFFFFFFFFFFF
+    a = 0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00000000FFFFFFFFFFFFFFFC  # 椭圆曲线参数a
+    b = 0x28E9FA9E9D9F5E344D5A9E4BCF6509A7F39789F515AB8F92DDBCBD414D940E93  # 椭圆曲线参数b
+    n = 0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFF7203DF6B21C6052B53BBF40939D54123  # 基点G的阶，用于生成私钥
+    Gx = 0x32C4AE2C1F1981195F9904466A39C9948FE30BBFF2660BE1715A4589334C74C7  # 基点G的x坐标
+    Gy = 0xBC3736A2F4F6779C59BDCEE36B692153D0A9877CC62A474002DF32E52139F0A0  # 基点G的y坐标
+    h = 1  # 余因子，用于辅助计算公钥
+
+    # 基点G的固定窗口预计算表，进程内所有SM2实例共享，首次使用时构建
+    BASE_WINDOW = 5
+    _base_table = None
+    _base_table_lock = threading.Lock()
+    # 双标量乘法中G和任意点P的wNAF窗口宽度，G的奇数倍点表同样全局共享
+    G_WNAF_WINDOW = 7
+    POINT_WNAF_WINDOW = 5
+    _g_wnaf_table = None
+    # G的两张预计算表的持久化文件，首次使用时mmap读取，缺失或失效时重新构建并写入；为None时不读写文件
+    TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'sm2_tables.bin')
+    DEFAULT_USER_ID = "1234567812345678"
+    # 流式签名/验签每次读取的块大小
+    STREAM_CHUNK_SIZE = 1 << 20
+
+    def __init__(self, keyfile_path=None, key_cache_size=64, za_cache_size=256, load_key=True):
+        """创建SM2实例
+        load_key为True时从keyfile_path（默认assets/keys.txt）加载签名私钥，文件不存在或无效时生成新私钥并写入；
+        为False时构造过程没有任何文件读写和点运算，适合只做验签的工作进程和命令行调用，
+        之后可以通过set_private_key设置私钥。公钥在首次使用时才计算
+        """
+        # 验签公钥缓存：(Px, Py) -> PublicKeyEntry
+        self.key_cache = LRUCache(key_cache_size)
+        # ZA缓存：(user_id, Px, Py) -> ZA摘要(bytes)
+        self.za_cache = LRUCache(za_cache_size)
+        # 可选的(k, x1)预签名池，见enable_presign_pool
+        self.presign_pool = None
+        # 可选的文件摘要缓存(sm3_core.FileDigestCache)，设置后sign_file/verify_file对未修改的文件不再重复计算杂凑值
+        self.digest_cache = None
+        # 当前签名私钥(SM2PrivateKey)，d/PBx/PBy均由它派生
+        self.private_key = None
+        if load_key:
+            if keyfile_path is None:
+                keyfile_path = os.path.join(os.path.dirname(__file__), 'assets', 'keys.txt')
+            self.load_or_create_key(keyfile_path)
+
+    def load_or_create_key(self, keyfile_path):
+        """从密钥文件加载私钥，文件不存在或内容无效时生成新私钥并写入该文件"""
         if os.path.exists(keyfile_path):
             try:
                 with open(keyfile_path, 'r') as f:
                     key_hex = f.readline().strip()
                     self.d = int(key_hex, 16)
+                return
             except Exception:
-                self.setSecretKey(True)
-                with open(keyfile_path, 'w') as f:
-                    f.write(self.hex(self.d))
+                pass
+        self.setSecretKey(True)
+        with open(keyfile_path, 'w') as f:
+            f.write(self.hex(self.d))
+
+    @property
+    def d(self):
+        """私钥整数；赋值时替换为新的SM2PrivateKey，派生值随之失效"""
+        return None if self.private_key is None else self.private_key.d
+
+    @d.setter
+    def d(self, value):
+        self.set_private_key(value)
+
+    @property
+    def public_key(self):
+        return None if self.private_key is None else self.private_key.public_key
+
+    @property
+    def PBx(self):
+        if self.private_key is None:
+            raise ValueError("未加载密钥")
+        return self.public_key.x
+
+    @property
+    def PBy(self):
+        if self.private_key is None:
+            raise ValueError("未加载密钥")
+        return self.public_key.y
+
+    def set_private_key(self, key):
+        """设置签名私钥，key可以是整数、十六进制字符串或SM2PrivateKey"""
+        if key is None:
+            self.private_key = None
+        elif isinstance(key, SM2PrivateKey):
+            self.private_key = key
         else:
-            self.setSecretKey(True)
-            with open(keyfile_path, 'w') as f:
-                f.write(self.hex(self.d))
-        self.PBx, self.PBy = self.multiPoint([self.Gx, self.Gy], self.d)
-        print("公钥:({},{})".format(self.hex(self.PBx), self.hex(self.PBy)))
-        if self.PBx + self.PBy == 0:
-            sys.exit(-1)
+            if isinstance(key, str):
+                key = int(key, 16)
+            self.private_key = SM2PrivateKey(key, self)
+        return self.private_key
 
     def getInverse(self, a):
         # 在有限域上计算乘法逆元，使用费马小定理：a^(p-2) ≡ a^(-1) (mod p)
@@ -79,21 +237,296 @@ class SM2:
         
         return (x3, y3)
 
+    # Jacobian射影坐标点运算：(X, Y, Z)表示仿射点(X/Z^2, Y/Z^3)，None表示无穷远点
+    # 点加和倍点均不需要求逆，只在标量乘法结束时转换一次仿射坐标
+    # 域运算按sm2_field的约定内联：平方用a * a，小常数乘法用移位，加减的中间结果不单独归约
+    def _jacobian_double(self, P):
+        """Jacobian坐标倍点，利用SM2曲线a = -3的特性：
+        3X^2 + aZ^4 = 3(X - Z^2)(X + Z^2)
+        """
+        if P is None:
+            return None
+        X1, Y1, Z1 = P
+        if Y1 == 0:
+            return None
+        p = self.p
+        delta = Z1 * Z1 % p
+        gamma = Y1 * Y1 % p
+        beta = X1 * gamma % p
+        alpha = 3 * (X1 - delta) * (X1 + delta) % p
+        X3 = (alpha * alpha - (beta << 3)) % p
+        # Z3 = 2Y1Z1，CPython中一次乘法比(Y1 + Z1)^2 - gamma - delta更快
+        Z3 = (Y1 * Z1 << 1) % p
+        Y3 = (alpha * ((beta << 2) - X3) - (gamma * gamma << 3)) % p
+        return (X3, Y3, Z3)
+
+    def _jacobian_add(self, P, Q):
+        """Jacobian坐标点加法，P、Q均为Jacobian坐标"""
+        if P is None:
+            return Q
+        if Q is None:
+            return P
+        p = self.p
+        X1, Y1, Z1 = P
+        X2, Y2, Z2 = Q
+        Z1Z1 = Z1 * Z1 % p
+        Z2Z2 = Z2 * Z2 % p
+        U1 = X1 * Z2Z2 % p
+        U2 = X2 * Z1Z1 % p
+        S1 = Y1 * Z2 * Z2Z2 % p
+        S2 = Y2 * Z1 * Z1Z1 % p
+        if U1 == U2:
+            # x相同：y相同为倍点，否则互为相反数得到无穷远点
+            return self._jacobian_double(P) if S1 == S2 else None
+        # H、r只参与乘法，不必先归约
+        H = U2 - U1
+        r = S2 - S1
+        HH = H * H % p
+        HHH = H * HH % p
+        V = U1 * HH % p
+        X3 = (r * r - HHH - (V << 1)) % p
+        Y3 = (r * (V - X3) - S1 * HHH) % p
+        Z3 = Z1 * Z2 * H % p
+        return (X3, Y3, Z3)
+
+    def _jacobian_add_affine(self, P, Q):
+        """混合坐标点加法：P为Jacobian坐标，Q为仿射坐标(Z = 1)，比一般点加少4次乘法"""
+        if Q is None:
+            return P
+        if P is None:
+            return (Q[0], Q[1], 1)
+        p = self.p
+        X1, Y1, Z1 = P
+        Z1Z1 = Z1 * Z1 % p
+        U2 = Q[0] * Z1Z1 % p
+        S2 = Q[1] * Z1 * Z1Z1 % p
+        if U2 == X1:
+            return self._jacobian_double(P) if S2 == Y1 else None
+        H = U2 - X1
+        r = S2 - Y1
+        HH = H * H % p
+        HHH = H * HH % p
+        V = X1 * HH % p
+        X3 = (r * r - HHH - (V << 1)) % p
+        Y3 = (r * (V - X3) - Y1 * HHH) % p
+        Z3 = Z1 * H % p
+        return (X3, Y3, Z3)
+
+    def _to_affine(self, P):
+        """Jacobian坐标转换为仿射坐标，仅需一次求逆"""
+        if P is None:
+            return None
+        X, Y, Z = P
+        p = self.p
+        z_inv = fp_inv(Z)
+        z_inv2 = z_inv * z_inv % p
+        return (X * z_inv2 % p, Y * z_inv2 * z_inv % p)
+
+    def batch_to_affine(self, points):
+        """批量将Jacobian坐标点转换为仿射坐标
+        使用Montgomery同时求逆，n个点只需一次求逆，无穷远点(None)原样保留
+        """
+        p = self.p
+        z_invs = fp_batch_inv([0 if P is None else P[2] for P in points])
+        result = []
+        for P, z_inv in zip(points, z_invs):
+            if P is None:
+                result.append(None)
+                continue
+            z_inv2 = z_inv * z_inv % p
+            result.append((P[0] * z_inv2 % p, P[1] * z_inv2 * z_inv % p))
+        return result
+
     def multiPoint(self, P, k):
         """椭圆曲线标量乘法，计算kP
-        使用二进制展开法，从高位到低位扫描k的每一位：
-        - k的当前位为1，结果加上对应的2^i倍点
-        - 每次将点翻倍
+        使用从高位到低位的二进制展开法：
+        - 每扫描一位先将累加点翻倍
+        - k的当前位为1，再加上P
+        中间结果保持Jacobian坐标，只在最后求逆一次转换为仿射坐标
         这是SM2算法中最核心的运算
         """
+        if P is None or k <= 0:
+            return None
+        if P[0] == self.Gx and P[1] == self.Gy:
+            return self.base_multiply(k)
         R = None  # 无穷远点
-        Q = P
-        while k > 0:
+        for bit in bin(k)[2:]:
+            R = self._jacobian_double(R)
+            if bit == '1':
+                R = self._jacobian_add_affine(R, P)
+        return self._to_affine(R)
+
+    def _get_base_table(self):
+        """获取基点G的预计算表，不存在时加锁加载或构建
+        表的第i行为 j * 2^(w*i) * G (j = 1..2^w-1)，均为仿射坐标
+        """
+        table = SM2._base_table
+        if table is None:
+            self._load_tables()
+            table = SM2._base_table
+        return table
+
+    def _load_tables(self):
+        """加载G的基点表和wNAF表：优先读取TABLE_PATH，文件缺失、过期或损坏时重新构建并写回"""
+        with SM2._base_table_lock:
+            if SM2._base_table is not None:
+                return
+            tables = None
+            if self.TABLE_PATH:
+                tables = load_tables(self.TABLE_PATH, self, self.BASE_WINDOW, self.G_WNAF_WINDOW)
+                # 摘要只能发现文件损坏，再确认表的起点确实是G
+                if tables is not None and tables[0][0][0] != (self.Gx, self.Gy):
+                    tables = None
+            if tables is None:
+                tables = (self._build_base_table(),
+                          self._odd_multiples((self.Gx, self.Gy), self.G_WNAF_WINDOW))
+                if self.TABLE_PATH:
+                    save_tables(self.TABLE_PATH, self, self.BASE_WINDOW, self.G_WNAF_WINDOW, *tables)
+            SM2._g_wnaf_table = tables[1]
+            SM2._base_table = tables[0]
+
+    def _build_base_table(self):
+        w = self.BASE_WINDOW
+        windows = (self.n.bit_length() + w - 1) // w
+        table = []
+        row_size = (1 << w) - 1
+        points = []
+        B = (self.Gx, self.Gy, 1)
+        for _ in range(windows):
+            row = [B]
+            for _ in range(row_size - 1):
+                row.append(self._jacobian_add(row[-1], B))
+            points.extend(row)
+            # 下一行的起点为 2^w * B
+            for _ in range(w):
+                B = self._jacobian_double(B)
+        # 整张表一次性批量转换为仿射坐标
+        points = self.batch_to_affine(points)
+        return [points[i:i + row_size] for i in range(0, len(points), row_size)]
+
+    def base_multiply(self, k):
+        """基点标量乘法，计算kG
+        将k按w位一组切分，第i组的值j直接查表取 j * 2^(w*i) * G 累加，
+        整个过程只有约 256/w 次混合点加，没有倍点运算
+        """
+        return self._to_affine(self._base_multiply_jacobian(k))
+
+    def base_multiply_many(self, ks):
+        """批量计算[k]G，结果统一做一次批量仿射转换，适合生成多个密钥或预签名"""
+        return self.batch_to_affine([self._base_multiply_jacobian(k) for k in ks])
+
+    def _base_multiply_jacobian(self, k):
+        k %= self.n
+        if k == 0:
+            return None
+        table = self._get_base_table()
+        w = self.BASE_WINDOW
+        mask = (1 << w) - 1
+        R = None
+        i = 0
+        while k:
+            j = k & mask
+            if j:
+                R = self._jacobian_add_affine(R, table[i][j - 1])
+            k >>= w
+            i += 1
+        return R
+
+    def _wnaf(self, k, w):
+        """计算k的宽度为w的非相邻形式(wNAF)，低位在前
+        每个非零位都是奇数且绝对值小于2^(w-1)，任意w个相邻位中至多一个非零
+        """
+        digits = []
+        width = 1 << w
+        half = width >> 1
+        while k:
             if k & 1:
-                R = self.addPoint(R, Q)
-            Q = self.addPoint(Q, Q)
+                d = k & (width - 1)
+                if d >= half:
+                    d -= width
+                k -= d
+            else:
+                d = 0
+            digits.append(d)
             k >>= 1
-        return R
+        return digits
+
+    def _odd_multiples(self, P, w):
+        """计算仿射点P的奇数倍点表 [P, 3P, 5P, ..., (2^(w-1)-1)P]，结果为仿射坐标"""
+        P2 = self._jacobian_double((P[0], P[1], 1))
+        row = [(P[0], P[1], 1)]
+        for _ in range((1 << (w - 2)) - 1):
+            row.append(self._jacobian_add(row[-1], P2))
+        return self.batch_to_affine(row)
+
+    def _get_g_wnaf_table(self):
+        table = SM2._g_wnaf_table
+        if table is None:
+            self._load_tables()
+            table = SM2._g_wnaf_table
+        return table
+
+    def double_scalar_multiply(self, s, t, P, P_table=None):
+        """双标量乘法，计算[s]G + [t]P
+        将s、t分别做wNAF展开后交错扫描（Shamir技巧），两个标量共用同一串倍点运算，
+        G使用全局共享的宽窗口奇数倍点表，P的奇数倍点表可由调用方预先计算后传入
+        """
+        p = self.p
+        if P_table is None:
+            P_table = self._odd_multiples(P, self.POINT_WNAF_WINDOW)
+        G_table = self._get_g_wnaf_table()
+        s_digits = self._wnaf(s % self.n, self.G_WNAF_WINDOW)
+        t_digits = self._wnaf(t % self.n, self.POINT_WNAF_WINDOW)
+        s_len = len(s_digits)
+        t_len = len(t_digits)
+        R = None
+        for i in range(max(s_len, t_len) - 1, -1, -1):
+            R = self._jacobian_double(R)
+            if i < s_len:
+                d = s_digits[i]
+                if d > 0:
+                    R = self._jacobian_add_affine(R, G_table[d >> 1])
+                elif d < 0:
+                    x, y = G_table[(-d) >> 1]
+                    R = self._jacobian_add_affine(R, (x, p - y))
+            if i < t_len:
+                d = t_digits[i]
+                if d > 0:
+                    R = self._jacobian_add_affine(R, P_table[d >> 1])
+                elif d < 0:
+                    x, y = P_table[(-d) >> 1]
+                    R = self._jacobian_add_affine(R, (x, p - y))
+        return self._to_affine(R)
+
+    @classmethod
+    def is_on_curve(cls, Px, Py):
+        """检查(Px, Py)是否为曲线上的有效点（SM2余因子为1，在曲线上即属于G生成的群）"""
+        if not (0 <= Px < cls.p and 0 <= Py < cls.p):
+            return False
+        return fp_sqr(Py) == fp_reduce(fp_sqr(Px) * Px + cls.a * Px + cls.b)
+
+    def get_public_key_entry(self, Px, Py):
+        """从缓存获取公钥的预计算结果，未命中时完成曲线校验和倍点表计算后放入缓存"""
+        key = (Px, Py)
+        entry = self.key_cache.get(key)
+        if entry is None:
+            if self.is_on_curve(Px, Py):
+                entry = PublicKeyEntry(key, True, self._odd_multiples(key, self.POINT_WNAF_WINDOW))
+            else:
+                entry = PublicKeyEntry(key, False)
+            self.key_cache.put(key, entry)
+        return entry
+
+    def generate_keypairs(self, count, batch_size=256):
+        """批量生成count个密钥对，逐个产出(d, Px, Py)
+        私钥来自密码学安全随机数，公钥用基点预计算表计算，每批batch_size个点只做一次求逆
+        """
+        while count > 0:
+            size = min(batch_size, count)
+            ds = [self.random_private_key() for _ in range(size)]
+            for d, (Px, Py) in zip(ds, self.base_multiply_many(ds)):
+                yield d, Px, Py
+            count -= size
 
     def hex(self, num):
         num = hex(num).upper()[2:]
@@ -113,8 +546,12 @@ class SM2:
             Ha += hs.hexdigest()
         return Ha[0:klen]
 
+    def random_private_key(self):
+        """使用密码学安全随机数生成私钥d ∈ [1, n-2]，保证1 + d可逆"""
+        return secrets.randbelow(self.n - 2) + 1
+
     def setSecretKey(self, show=False):
-        self.d = random.randint(1, self.n)
+        self.d = self.random_private_key()
         if show:
             print("私钥为:", self.hex(self.d))
 
@@ -123,15 +560,13 @@ class SM2:
             key_hex = f.readline().strip()
             if not key_hex:
                 self.setSecretKey(True)
-                self.PBx, self.PBy = self.multiPoint([self.Gx, self.Gy], self.d)
                 with open(keyfile_path, 'w') as fw:
                     fw.write(hex(self.d)[2:])
             else:
                 self.d = int(key_hex, 16)
-                self.PBx, self.PBy = self.multiPoint([self.Gx, self.Gy], self.d)
 
     def compute_ZA(self, user_id="1234567812345678", Px=None, Py=None):
-        """计算用户ZA值
+        """计算用户ZA值，返回十六进制字符串
         ZA = H256(ENTLA || IDA || a || b || xG || yG || xA || yA)
         其中：
         - ENTLA为用户ID的比特长度
@@ -140,61 +575,67 @@ class SM2:
         - G为基点
         - A为公钥点
         """
+        return self.get_ZA(user_id, Px, Py).hex()
+
+    def get_ZA(self, user_id="1234567812345678", Px=None, Py=None):
+        """获取用户ZA值的原始摘要(bytes)
+        ZA只取决于(user_id, Px, Py)，结果保存在za_cache中，重复调用直接查表
+        """
         if isinstance(user_id, str):
             user_id = user_id.encode('utf-8')
-            
         if Px is None:
             Px = self.PBx
         if Py is None:
             Py = self.PBy
-            
-        ENTL = len(user_id) * 8
-        entl_bytes = ENTL.to_bytes(2, 'big')
-        a_bytes = self.a.to_bytes(32, 'big')
-        b_bytes = self.b.to_bytes(32, 'big')
-        gx_bytes = self.Gx.to_bytes(32, 'big')
-        gy_bytes = self.Gy.to_bytes(32, 'big')
-        px_bytes = Px.to_bytes(32, 'big')
-        py_bytes = Py.to_bytes(32, 'big')
-        
-        data = (
-            entl_bytes + 
-            user_id +
-            a_bytes +
-            b_bytes +
-            gx_bytes +
-            gy_bytes +
-            px_bytes +
-            py_bytes
-        )
-        return sm3.sm3_hash(func.bytes_to_list(data))
 
-    def sign(self, data, user_id="1234567812345678"):
-        """SM2签名算法标准实现
-        1. 计算ZA和消息M的杂凑值e = H(ZA || M)
-        2. 生成随机数k ∈ [1, n-1]
-        3. 计算点(x1, y1) = [k]G
-        4. 计算r = (e + x1) mod n，若r=0或r+k=n重新生成k
-        5. 计算s = ((1 + dA)^(-1) * (k - r*dA)) mod n，若s=0重新生成k
-        6. 签名值为(r,s)
-        """
-        if isinstance(data, str):
-            data = data.encode('utf-8')
-            
-        user_id = user_id.encode('utf-8') if isinstance(user_id, str) else user_id
-        ZA_hex = self.compute_ZA(user_id=user_id)
-        
-        # 计算e = H(ZA || M)
-        data_to_hash = bytes.fromhex(ZA_hex) + data
-        e = int(sm3.sm3_hash(func.bytes_to_list(data_to_hash)), 16)
-        
+        key = (user_id, Px, Py)
+        ZA = self.za_cache.get(key)
+        if ZA is None:
+            ZA = compute_za(user_id, Px, Py)
+            self.za_cache.put(key, ZA)
+        return ZA
+
+    def _normalize_ZA(self, ZA):
+        """调用方直接提供的ZA可以是32字节摘要或64位十六进制字符串"""
+        if isinstance(ZA, str):
+            ZA = bytes.fromhex(ZA)
+        if len(ZA) != 32:
+            raise ValueError("ZA必须为32字节的SM3摘要")
+        return bytes(ZA)
+
+    def _signing_key(self, private_key):
+        if private_key is None:
+            private_key = self.private_key
+            if private_key is None:
+                raise ValueError("未设置签名私钥")
+        elif not isinstance(private_key, SM2PrivateKey):
+            private_key = SM2PrivateKey(private_key, self)
+        return private_key
+
+    def _signer_ZA(self, user_id, ZA, private_key):
+        if ZA is not None:
+            return self._normalize_ZA(ZA)
+        public_key = private_key.public_key
+        if user_id == self.DEFAULT_USER_ID or user_id == self.DEFAULT_USER_ID.encode('utf-8'):
+            return public_key.default_za()
+        return self.get_ZA(user_id, public_key.x, public_key.y)
+
+    def _sign_hash(self, e, private_key):
+        """用private_key对已计算好的杂凑值e = H(ZA || M)生成签名(r, s)"""
+        d = private_key.d
+        d_inverse = private_key.inverse
+        pool = self.presign_pool
         while True:
-            # 1. 生成随机数k ∈ [1, n-1]
-            k = random.randint(1, self.n - 1)
-            
-            # 2. 计算点(x1, y1) = [k]G
-            point = self.multiPoint([self.Gx, self.Gy], k)
-            x1 = point[0]
+            if pool is not None:
+                # 1-2. 从预签名池中取出预先计算好的k和[k]G的x坐标
+                k, x1 = pool.take()
+            else:
+                # 1. 生成密码学安全随机数k ∈ [1, n-1]
+                k = secrets.randbelow(self.n - 1) + 1
+                
+                # 2. 计算点(x1, y1) = [k]G
+                point = self.base_multiply(k)
+                x1 = point[0]
             
             # 3. 计算r = (e + x1) mod n
             r = (e + x1) % self.n
@@ -204,7 +645,7 @@ class SM2:
                 continue
                 
             # 5. 计算s = ((1 + dA)^-1 * (k - r * dA)) mod n
-            s = (pow(1 + self.d, -1, self.n) * (k - r * self.d)) % self.n
+            s = (d_inverse * (k - r * d)) % self.n
             
             # 6. 如果s = 0则返回步骤1
             if s == 0:
@@ -214,17 +655,100 @@ class SM2:
         
         return (r, s)
 
-    def verify(self, data, signature, Px, Py, user_id="1234567812345678"):
-        """SM2验签算法标准实现
-        1. 验证签名值r,s ∈ [1,n-1]
-        2. 计算ZA和消息M的杂凑值e = H(ZA || M)
-        3. 计算t = (r + s) mod n，若t=0验证失败
-        4. 计算点R = [s]G + [t]PA
-        5. 计算R = (e + x1) mod n
-        6. 验证R == r
+    def enable_presign_pool(self, size=64, low_watermark=None):
+        """启用后台预签名池，签名时直接取用预先计算的(k, x1)，返回池对象以便监控"""
+        from sm2_presign import PresignaturePool
+        self.disable_presign_pool()
+        self.presign_pool = PresignaturePool(self, size=size, low_watermark=low_watermark)
+        return self.presign_pool
+
+    def disable_presign_pool(self):
+        pool = self.presign_pool
+        self.presign_pool = None
+        if pool is not None:
+            pool.stop()
+
+    def sign(self, data, user_id="1234567812345678", ZA=None, private_key=None):
+        """SM2签名算法标准实现
+        1. 计算ZA和消息M的杂凑值e = H(ZA || M)
+        2. 生成随机数k ∈ [1, n-1]
+        3. 计算点(x1, y1) = [k]G
+        4. 计算r = (e + x1) mod n，若r=0或r+k=n重新生成k
+        5. 计算s = ((1 + dA)^(-1) * (k - r*dA)) mod n，若s=0重新生成k
+        6. 签名值为(r,s)
+        已预先计算好ZA的调用方可以通过ZA参数直接传入，此时忽略user_id
+        private_key为SM2PrivateKey时使用其缓存的(1+d)^-1、公钥和ZA，默认使用当前私钥
         """
         if isinstance(data, str):
             data = data.encode('utf-8')
+            
+        private_key = self._signing_key(private_key)
+        ZA = self._signer_ZA(user_id, ZA, private_key)
+        
+        # 计算e = H(ZA || M)
+        e = self._message_hash(data, ZA)
+        return self._sign_hash(e, private_key)
+
+    def sign_stream(self, stream, user_id="1234567812345678", ZA=None, chunk_size=None, private_key=None):
+        """对文件对象中的数据签名，按块增量计算H(ZA || M)，不把整个消息读入内存"""
+        private_key = self._signing_key(private_key)
+        e = self._stream_hash(stream, self._signer_ZA(user_id, ZA, private_key), chunk_size)
+        return self._sign_hash(e, private_key)
+
+    def sign_file(self, path, user_id="1234567812345678", ZA=None, chunk_size=None, use_mmap=True, private_key=None):
+        """对文件签名，默认通过mmap映射文件分块计算杂凑值，峰值内存与文件大小无关"""
+        private_key = self._signing_key(private_key)
+        e = self._file_hash(path, self._signer_ZA(user_id, ZA, private_key), chunk_size, use_mmap)
+        return self._sign_hash(e, private_key)
+
+    def sign_digest(self, e, private_key=None):
+        """对已计算好的杂凑值e = H(ZA || M)签名，e可以是32字节摘要或整数
+        ZA应由签名公钥计算（见file_digest/get_ZA），适合杂凑值已经在别处算好的调用方
+        """
+        if not isinstance(e, int):
+            e = int.from_bytes(e, 'big')
+        return self._sign_hash(e, self._signing_key(private_key))
+
+    def file_digest(self, path, public_key=None, user_id="1234567812345678", chunk_size=None):
+        """计算文件的e = H(ZA || M)，返回32字节；ZA由public_key（默认为当前私钥的公钥）和user_id确定
+        设置了digest_cache时结果会被缓存，同一文件未修改时不再重复读取
+        """
+        if public_key is None:
+            public_key = self._signing_key(None).public_key
+        elif not isinstance(public_key, SM2PublicKey):
+            public_key = SM2PublicKey(*public_key)
+        if user_id == self.DEFAULT_USER_ID:
+            ZA = public_key.default_za()
+        else:
+            ZA = self.get_ZA(user_id, public_key.x, public_key.y)
+        return self._file_hash(path, ZA, chunk_size, True).to_bytes(32, 'big')
+
+    def _message_hash(self, data, ZA):
+        """计算H(ZA || M)，返回整数"""
+        hasher = SM3(ZA)
+        hasher.update(data)
+        return int.from_bytes(hasher.digest(), 'big')
+
+    def _stream_hash(self, stream, ZA, chunk_size):
+        """按块读取文件对象计算H(ZA || M)，返回整数"""
+        hasher = SM3(ZA)
+        update_from_stream(hasher, stream, chunk_size or self.STREAM_CHUNK_SIZE)
+        return int.from_bytes(hasher.digest(), 'big')
+
+    def _file_hash(self, path, ZA, chunk_size, use_mmap):
+        """计算文件的H(ZA || M)，返回整数；有digest_cache时走缓存"""
+        chunk_size = chunk_size or self.STREAM_CHUNK_SIZE
+        cache = self.digest_cache
+        if cache is not None:
+            return int.from_bytes(cache.digest(path, ZA, chunk_size), 'big')
+        hasher = SM3(ZA)
+        update_from_file(hasher, path, chunk_size, use_mmap)
+        return int.from_bytes(hasher.digest(), 'big')
+
+    def _prepare_verify(self, signature, Px, Py, user_id, ZA):
+        """验签的消息无关部分：解析签名值并做范围校验、取公钥缓存、确定ZA
+        校验失败时返回None，否则返回(r, s, entry, ZA)
+        """
         user_id = user_id.encode('utf-8') if isinstance(user_id, str) else user_id
         
         r, s = signature
@@ -235,23 +759,45 @@ class SM2:
         
         # 1. 检验r,s是否属于[1,n-1]
         if not (1 <= r < self.n and 1 <= s < self.n):
-            print("签名值范围校验失败")
-            return False
+            logger.debug("签名值范围校验失败")
+            return None
             
-        # 2. 计算M'的杂凑值e
-        ZA_hex = self.compute_ZA(user_id=user_id, Px=Px, Py=Py)
-        data_to_hash = bytes.fromhex(ZA_hex) + data
-        e = int(sm3.sm3_hash(func.bytes_to_list(data_to_hash)), 16)
-        
+        # 公钥必须是曲线上的点，校验结果随预计算表一起缓存
+        if isinstance(Px, SM2PublicKey):
+            public_key = Px
+            Px, Py = public_key.x, public_key.y
+            entry = public_key.entry
+            if entry is None:
+                entry = public_key.entry = self.get_public_key_entry(Px, Py)
+        else:
+            public_key = None
+            entry = self.get_public_key_entry(Px, Py)
+        if not entry.valid:
+            logger.debug("公钥校验失败")
+            return None
+
+        if ZA is not None:
+            ZA = self._normalize_ZA(ZA)
+        elif user_id == self.DEFAULT_USER_ID.encode('utf-8'):
+            if public_key is not None:
+                ZA = public_key.default_za()
+            else:
+                if entry.za is None:
+                    entry.za = self.get_ZA(user_id=user_id, Px=Px, Py=Py)
+                ZA = entry.za
+        else:
+            ZA = self.get_ZA(user_id=user_id, Px=Px, Py=Py)
+        return r, s, entry, ZA
+
+    def _verify_hash(self, e, r, s, entry):
+        """用已计算好的杂凑值e = H(ZA || M)完成验签"""
         # 3. 计算t = (r + s) mod n
         t = (r + s) % self.n
         if t == 0:
             return False
             
         # 4. 计算点(x1', y1') = [s]G + [t]PA
-        sG = self.multiPoint([self.Gx, self.Gy], s)
-        tPA = self.multiPoint([Px, Py], t)
-        R = self.addPoint(sG, tPA)
+        R = self.double_scalar_multiply(s, t, entry.point, entry.table)
         if R is None:  # 如果得到无穷远点，验证失败
             return False
         x1, y1 = R
@@ -260,4 +806,477 @@ class SM2:
         R = (e + x1) % self.n
         
         # 6. 检验R == r
-        return R == r
\ No newline at end of file
+        return R == r
+
+    def verify(self, data, signature, Px, Py=None, user_id="1234567812345678", ZA=None):
+        """SM2验签算法标准实现
+        1. 验证签名值r,s ∈ [1,n-1]
+        2. 计算ZA和消息M的杂凑值e = H(ZA || M)
+        3. 计算t = (r + s) mod n，若t=0验证失败
+        4. 计算点R = [s]G + [t]PA
+        5. 计算R = (e + x1) mod n
+        6. 验证R == r
+        已预先计算好ZA的调用方可以通过ZA参数直接传入，此时忽略user_id
+        Px可以直接传入SM2PublicKey（此时省略Py），验签预计算结果会缓存在公钥对象上
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        prepared = self._prepare_verify(signature, Px, Py, user_id, ZA)
+        if prepared is None:
+            return False
+        r, s, entry, ZA = prepared
+
+        # 2. 计算M'的杂凑值e
+        e = self._message_hash(data, ZA)
+        return self._verify_hash(e, r, s, entry)
+
+    def verify_stream(self, stream, signature, Px, Py=None, user_id="1234567812345678", ZA=None, chunk_size=None):
+        """验证文件对象中数据的签名，按块增量计算杂凑值"""
+        prepared = self._prepare_verify(signature, Px, Py, user_id, ZA)
+        if prepared is None:
+            return False
+        r, s, entry, ZA = prepared
+        return self._verify_hash(self._stream_hash(stream, ZA, chunk_size), r, s, entry)
+
+    def verify_file(self, path, signature, Px, Py=None, user_id="1234567812345678", ZA=None, chunk_size=None, use_mmap=True):
+        """验证文件的签名，默认通过mmap映射文件分块计算杂凑值"""
+        prepared = self._prepare_verify(signature, Px, Py, user_id, ZA)
+        if prepared is None:
+            return False
+        r, s, entry, ZA = prepared
+        return self._verify_hash(self._file_hash(path, ZA, chunk_size, use_mmap), r, s, entry)
+
+    def verify_digest(self, e, signature, Px, Py=None):
+        """用已计算好的杂凑值e = H(ZA || M)验签，e可以是32字节摘要或整数
+        ZA必须由同一个公钥计算，Px可以直接传入SM2PublicKey
+        """
+        if not isinstance(e, int):
+            e = int.from_bytes(e, 'big')
+        prepared = self._prepare_verify(signature, Px, Py, self.DEFAULT_USER_ID, None)
+        if prepared is None:
+            return False
+        r, s, entry, _ = prepared
+        return self._verify_hash(e, r, s, entry)
+
+    def verify_many(self, items, processes=None, ordered=True):
+        """批量并行验签
+        items中每一项为(消息或文件路径, (r, s), 公钥[, user_id])，公钥可为(Px, Py)或128位十六进制字符串
+        任务按公钥分组后分发到进程池，ordered为True时按输入顺序返回结果列表，
+        否则返回按完成顺序产出(index, 结果)的迭代器
+        """
+        from sm2_parallel import verify_many
+        return verify_many(items, processes=processes, ordered=ordered, sm2=self)
+
+
+# ZA计算中固定不变的 a || b || xG || yG 部分，首次使用时生成
+_za_curve_bytes = None
+
+
+def compute_za(user_id, Px, Py):
+    """计算ZA = H256(ENTLA || IDA || a || b || xG || yG || xA || yA)，返回32字节摘要
+    其中 a || b || xG || yG 部分固定不变，只在首次调用时生成
+    """
+    global _za_curve_bytes
+    if isinstance(user_id, str):
+        user_id = user_id.encode('utf-8')
+    curve_bytes = _za_curve_bytes
+    if curve_bytes is None:
+        curve_bytes = _za_curve_bytes = (
+            SM2.a.to_bytes(32, 'big') +
+            SM2.b.to_bytes(32, 'big') +
+            SM2.Gx.to_bytes(32, 'big') +
+            SM2.Gy.to_bytes(32, 'big')
+        )
+    ENTL = len(user_id) * 8
+    data = (
+        ENTL.to_bytes(2, 'big') +
+        user_id +
+        curve_bytes +
+        Px.to_bytes(32, 'big') +
+        Py.to_bytes(32, 'big')
+    )
+    return sm3_hash(data)
+
+
+class SM2PublicKey:
+    """SM2公钥(x, y)，不可变
+    缓存默认用户ID的ZA以及验签用的公钥预计算结果(PublicKeyEntry)
+    """
+    __slots__ = ('_x', '_y', '_za', '_fingerprint', 'entry')
+
+    def __init__(self, x, y):
+        self._x = x
+        self._y = y
+        self._za = None
+        self._fingerprint = None
+        self.entry = None
+
+    @classmethod
+    def from_hex(cls, key_hex):
+        """从128位十六进制字符串(x || y)构造，允许带04前缀；不在曲线上的点抛出ValueError"""
+        key_hex = key_hex.strip()
+        if len(key_hex) == 130 and key_hex[:2] == '04':
+            key_hex = key_hex[2:]
+        if len(key_hex) != 128:
+            raise ValueError("公钥格式无效")
+        x, y = int(key_hex[:64], 16), int(key_hex[64:], 16)
+        if not SM2.is_on_curve(x, y):
+            raise ValueError("公钥不在曲线上")
+        return cls(x, y)
+
+    @property
+    def x(self):
+        return self._x
+
+    @property
+    def y(self):
+        return self._y
+
+    @property
+    def point(self):
+        return (self._x, self._y)
+
+    def default_za(self):
+        """默认用户ID对应的ZA，首次使用时计算"""
+        za = self._za
+        if za is None:
+            za = self._za = compute_za(SM2.DEFAULT_USER_ID, self._x, self._y)
+        return za
+
+    def fingerprint(self):
+        """公钥指纹：SM3(04 || x || y)，32字节"""
+        fingerprint = self._fingerprint
+        if fingerprint is None:
+            fingerprint = self._fingerprint = sm3_hash(
+                b'\x04' + self._x.to_bytes(32, 'big') + self._y.to_bytes(32, 'big'))
+        return fingerprint
+
+    def to_hex(self):
+        return '%064X%064X' % (self._x, self._y)
+
+    def __eq__(self, other):
+        if not isinstance(other, SM2PublicKey):
+            return NotImplemented
+        return self._x == other._x and self._y == other._y
+
+    def __hash__(self):
+        return hash((self._x, self._y))
+
+    def __repr__(self):
+        return 'SM2PublicKey(%s)' % self.to_hex()
+
+
+class SM2PrivateKey:
+    """SM2私钥d
+    签名所需的(1 + d)^-1 mod n和公钥[d]G（连同其ZA）只在首次使用时计算，
+    修改d后这些派生值自动失效
+    public_key为已知的对应公钥（例如从密钥库读出），传入时不再重新计算[d]G
+    """
+    __slots__ = ('_d', '_sm2', '_inverse', '_public_key')
+
+    def __init__(self, d, sm2, public_key=None):
+        self._sm2 = sm2
+        self.d = d
+        self._public_key = public_key
+
+    @property
+    def d(self):
+        return self._d
+
+    @d.setter
+    def d(self, value):
+        if not 1 <= value <= SM2.n - 2:
+            raise ValueError("私钥必须在[1, n-2]范围内")
+        self._d = value
+        self._inverse = None
+        self._public_key = None
+
+    @property
+    def inverse(self):
+        """(1 + d)^-1 mod n"""
+        inverse = self._inverse
+        if inverse is None:
+            inverse = self._inverse = pow(1 + self._d, -1, SM2.n)
+        return inverse
+
+    @property
+    def public_key(self):
+        public_key = self._public_key
+        if public_key is None:
+            public_key = self._public_key = SM2PublicKey(*self._sm2.base_multiply(self._d))
+        return public_key
+
+    def to_hex(self):
+        return '%064X' % self._d
+
+    def __repr__(self):
+        return 'SM2PrivateKey(<hidden>)'
+
+
+# ---- 性能计数（可选） ----
+# enable_metrics()把热点函数替换为带计数/计时的包装函数，disable_metrics()换回原函数，
+# 未开启时执行的就是原来的代码，没有任何额外开销。计数和计时每个线程各一份，汇总时才合并，
+# 线程结束后其计数并入累计值并移除，
+# 因此只统计当前进程，进程池中的工作进程各自独立。
+
+METRIC_COUNTERS = ('field_inversions', 'point_adds', 'point_doubles', 'sm3_blocks', 'sm3_bytes')
+_COUNTER_HELP = {
+    'field_inversions': '有限域Fp求逆次数（批量求逆计1次，addPoint每次计1次）',
+    'point_adds': '点加次数（Jacobian、混合坐标和仿射坐标）',
+    'point_doubles': '倍点次数',
+    'sm3_blocks': '已完成的SM3杂凑处理的64字节分组数（含填充）',
+    'sm3_bytes': '送入SM3的字节数',
+}
+# SM2方法 -> 计时名称：各阶段互不重叠，合起来覆盖sign/verify的全部耗时
+_PHASE_METHODS = {
+    '_signer_ZA': 'za',
+    '_prepare_verify': 'verify_prepare',
+    '_message_hash': 'hash',
+    '_stream_hash': 'stream_hash',
+    '_file_hash': 'file_hash',
+    '_sign_hash': 'sign_scalar',
+    '_verify_hash': 'verify_scalar',
+}
+_OPERATION_METHODS = ('sign', 'sign_stream', 'sign_file', 'sign_digest',
+                      'verify', 'verify_stream', 'verify_file', 'verify_digest')
+
+
+def _merge_metrics(target, source):
+    """把source的(计数dict, 计时dict)累加到target"""
+    counts, timers = target
+    for name, value in list(source[0].items()):
+        counts[name] += value
+    for name, (count, total, longest) in list(source[1].items()):
+        record = timers.setdefault(name, [0, 0, 0])
+        record[0] += count
+        record[1] += total
+        record[2] = max(record[2], longest)
+
+
+class _MetricsState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.threads = []       # 每个活动线程的(线程的弱引用, (计数dict, 计时dict))
+        self.totals = (dict.fromkeys(METRIC_COUNTERS, 0), {})   # 已结束线程的累计值
+        self.originals = None   # 开启时被替换的[(对象, 属性名, 原函数)]
+        self.since = time.time()
+
+    def current(self):
+        data = getattr(self.local, 'data', None)
+        if data is None:
+            data = self.local.data = (dict.fromkeys(METRIC_COUNTERS, 0), {})
+            with self.lock:
+                self.collect()
+                self.threads.append((weakref.ref(threading.current_thread()), data))
+        return data
+
+    def collect(self):
+        """把已结束线程的计数并入totals并移除，threads的长度不超过活动线程数；调用方须持有lock"""
+        alive = []
+        for ref, data in self.threads:
+            thread = ref()
+            if thread is not None and thread.is_alive():
+                alive.append((ref, data))
+            else:
+                _merge_metrics(self.totals, data)
+        self.threads = alive
+
+
+_metrics = _MetricsState()
+
+
+def _counted(func, name, inversions=0):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        counts = _metrics.current()[0]
+        counts[name] += 1
+        if inversions:
+            counts['field_inversions'] += inversions
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def _timed(func, name):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            timers = _metrics.current()[1]
+            record = timers.get(name)
+            if record is None:
+                timers[name] = [1, elapsed, elapsed]
+            else:
+                record[0] += 1
+                record[1] += elapsed
+                if elapsed > record[2]:
+                    record[2] = elapsed
+    return wrapper
+
+
+def enable_metrics():
+    """开启性能计数，重复调用无影响"""
+    import sm3_core
+
+    update = sm3_core.SM3.update
+    digest = sm3_core.SM3.digest
+
+    def counted_digest(self):
+        # OpenSSL实现不经过_compress，分组数按消息长度加填充计算
+        _metrics.current()[0]['sm3_blocks'] += ((self._length + 8) >> 6) + 1
+        return digest(self)
+
+    def counted_update(self, data):
+        _metrics.current()[0]['sm3_bytes'] += memoryview(data).nbytes
+        return update(self, data)
+
+    module = sys.modules[__name__]
+    patches = [
+        (module, 'fp_inv', _counted(fp_inv, 'field_inversions')),
+        (module, 'fp_batch_inv', _counted(fp_batch_inv, 'field_inversions')),
+        (SM2, 'getInverse', _counted(SM2.getInverse, 'field_inversions')),
+        (SM2, 'addPoint', _counted(SM2.addPoint, 'point_adds', inversions=1)),
+        (SM2, '_jacobian_add', _counted(SM2._jacobian_add, 'point_adds')),
+        (SM2, '_jacobian_add_affine', _counted(SM2._jacobian_add_affine, 'point_adds')),
+        (SM2, '_jacobian_double', _counted(SM2._jacobian_double, 'point_doubles')),
+        (sm3_core.SM3, 'update', counted_update),
+        (sm3_core.SM3, 'digest', counted_digest),
+    ]
+    patches += [(SM2, method, _timed(getattr(SM2, method), name)) for method, name in _PHASE_METHODS.items()]
+    patches += [(SM2, method, _timed(getattr(SM2, method), method)) for method in _OPERATION_METHODS]
+    with _metrics.lock:
+        if _metrics.originals is not None:
+            return
+        _metrics.originals = [(owner, name, getattr(owner, name)) for owner, name, _ in patches]
+        for owner, name, wrapper in patches:
+            setattr(owner, name, wrapper)
+
+
+def disable_metrics():
+    """关闭性能计数，恢复原函数；已有的计数保留，可继续读取"""
+    with _metrics.lock:
+        originals, _metrics.originals = _metrics.originals, None
+        for owner, name, original in reversed(originals or ()):
+            setattr(owner, name, original)
+
+
+def metrics_enabled():
+    return _metrics.originals is not None
+
+
+def reset_metrics():
+    """清零所有线程的计数和计时"""
+    with _metrics.lock:
+        _metrics.collect()
+        for _, (counts, timers) in _metrics.threads + [(None, _metrics.totals)]:
+            for name in counts:
+                counts[name] = 0
+            timers.clear()
+        _metrics.since = time.time()
+
+
+def metrics_snapshot():
+    """汇总所有线程的计数和计时，返回dict：
+    {'enabled', 'since', 'counters': {名称: 值},
+     'phases' / 'operations': {名称: {'count', 'total_s', 'mean_ms', 'max_ms'}}}
+    phases为sign/verify内部的各阶段，operations为sign、verify_file等整次调用
+    """
+    total = (dict.fromkeys(METRIC_COUNTERS, 0), {})
+    with _metrics.lock:
+        _metrics.collect()
+        _merge_metrics(total, _metrics.totals)
+        threads = [data for _, data in _metrics.threads]
+        since = _metrics.since
+    for data in threads:
+        _merge_metrics(total, data)
+    counters, merged = total
+    phase_names = set(_PHASE_METHODS.values())
+    phases, operations = {}, {}
+    for name, (count, total, longest) in sorted(merged.items()):
+        (phases if name in phase_names else operations)[name] = {
+            'count': count,
+            'total_s': total / 1e9,
+            'mean_ms': total / count / 1e6 if count else 0.0,
+            'max_ms': longest / 1e6,
+        }
+    return {'enabled': metrics_enabled(), 'since': since, 'counters': counters,
+            'phases': phases, 'operations': operations}
+
+
+def metrics_to_prometheus(snapshot=None, prefix='sm2'):
+    """把快照转换为Prometheus文本格式"""
+    snapshot = snapshot or metrics_snapshot()
+    lines = []
+    for name, value in snapshot['counters'].items():
+        metric = f'{prefix}_{name}_total'
+        lines += [f'# HELP {metric} {_COUNTER_HELP[name]}', f'# TYPE {metric} counter', f'{metric} {value}']
+    for group, label, help_text in (('phases', 'phase', 'sign/verify各阶段耗时'),
+                                    ('operations', 'operation', 'sign/verify整次调用耗时')):
+        metric = f'{prefix}_{label}_seconds'
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} summary']
+        for name, timer in snapshot[group].items():
+            lines.append(f'{metric}_count{{{label}="{name}"}} {timer["count"]}')
+            lines.append(f'{metric}_sum{{{label}="{name}"}} {timer["total_s"]:.9f}')
+        lines += [f'# HELP {metric}_max {help_text}的最大值', f'# TYPE {metric}_max gauge']
+        for name, timer in snapshot[group].items():
+            lines.append(f'{metric}_max{{{label}="{name}"}} {timer["max_ms"] / 1000:.9f}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path, snapshot=None):
+    """原子写入Prometheus文本文件（例如node_exporter的textfile采集目录）"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.sm2_metrics-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(metrics_to_prometheus(snapshot))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class MetricsLogger:
+    """后台线程，每interval秒把性能计数快照写入日志，指定prometheus_path时同时写出Prometheus文本文件
+    stop()时再写一次，程序退出前的计数不会丢失
+    """
+
+    def __init__(self, interval=60.0, logger=None, prometheus_path=None):
+        self.interval = interval
+        self.logger = logger or logging.getLogger('sm2.metrics')
+        self.prometheus_path = prometheus_path
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sm2-metrics', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.log_once()
+
+    def log_once(self):
+        snapshot = metrics_snapshot()
+        self.logger.info("性能计数 %s", json.dumps(snapshot, ensure_ascii=False, sort_keys=True))
+        if self.prometheus_path:
+            try:
+                write_prometheus(self.prometheus_path, snapshot)
+            except OSError as exc:
+                self.logger.warning("写入Prometheus文件失败: %s", exc)
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.log_once()
@@ -0,0 +1,378 @@
+"""本地SM2签名/验签守护进程
+长期运行，密钥库、私钥和预计算表常驻内存，调用方不必各自创建SM2实例、读取密钥文件。
+基于asyncio，监听Unix套接字或本机TCP端口，协议为JSON Lines：每行一个请求，每行一个响应，
+同一连接上可以连续发送多个请求而不必等待响应（响应可能乱序，以id对应）。
+
+请求：
+    {"id": 1, "op": "sign", "data": "<base64>"}                      对原始数据签名
+    {"id": 2, "op": "sign", "digest": "<hex>", "key": "<指纹>"}       对已计算好的e = H(ZA || M)签名
+    {"id": 3, "op": "verify", "data"|"digest": ..., "signature": ["<r>", "<s>"],
+     "public_key": "04..."或"key": "<指纹>"}
+    {"id": 4, "op": "ping"} / {"id": 5, "op": "stats"}
+响应：
+    {"id": 1, "ok": true, "signature": ["<r>", "<s>"], "fingerprint": "<指纹>"}
+    {"id": 3, "ok": true, "valid": true}
+    {"id": ..., "ok": false, "error": "..."}
+未指定key时使用密钥库的默认密钥；ZA按默认用户ID计算。
+
+微批处理：请求先进入队列，凑满batch_size或距第一个请求超过batch_window秒时作为一批交给工作池，
+单次进程间通信分摊到整批请求上。工作池为进程池（processes > 1）或单个后台线程，
+工作进程启动时加载预计算表，并缓存私钥的(1 + d)^-1和验签公钥的wNAF表。
+安全：任何能连接上的进程都可以用常驻的私钥签名。Unix套接字文件创建后、开始监听前即设为0o600，
+只有守护进程的所有者可以连接；不存在的父目录按0o700创建。TCP端口只应监听本机地址。
+背压：同时处理中的请求数超过max_pending时暂停读取连接上的后续请求（客户端的写入随之阻塞），
+交给工作池的在途批次数也有上限；超过max_request_size的请求行直接拒绝并关闭连接。
+"""
+import asyncio
+import base64
+import json
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from sm2_client import DEFAULT_SOCKET_PATH
+from sm2_core import SM2, SM2PrivateKey, SM2PublicKey, LRUCache
+from sm2_keystore import KeyStore, parse_fingerprint
+from sm3_core import SM3
+
+DEFAULT_BATCH_WINDOW = 0.002
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_MAX_PENDING = 1024
+DEFAULT_MAX_REQUEST_SIZE = 16 << 20
+# Unix套接字文件的权限：只有守护进程的所有者可以连接
+SOCKET_MODE = 0o600
+
+# 工作进程内的SM2实例和密钥缓存
+_worker_state = None
+
+
+def _init_worker():
+    """工作进程初始化：加载预计算表，之后每个批次都不再有首次调用的开销"""
+    global _worker_state
+    sm2 = SM2(load_key=False)
+    sm2._get_base_table()
+    sm2._get_g_wnaf_table()
+    _worker_state = (sm2, LRUCache(64), LRUCache(256))
+
+
+def _hash(public_key, data, e):
+    if e is not None:
+        return e
+    hasher = SM3(public_key.default_za())
+    hasher.update(data)
+    return hasher.digest()
+
+
+def _process_batch(items):
+    """工作池入口：items中每项为
+    ('sign', d, 公钥坐标, 数据或None, e或None) 或 ('verify', 公钥坐标, 数据或None, e或None, r, s)
+    返回与items一一对应的结果：签名为(r, s)，验签为bool，出错时为错误信息字符串
+    """
+    if _worker_state is None:
+        _init_worker()
+    sm2, private_keys, public_keys = _worker_state
+    results = []
+    for item in items:
+        try:
+            if item[0] == 'sign':
+                _, d, point, data, e = item
+                private_key = private_keys.get(d)
+                if private_key is None:
+                    private_key = SM2PrivateKey(d, sm2, SM2PublicKey(*point))
+                    private_keys.put(d, private_key)
+                results.append(sm2.sign_digest(_hash(private_key.public_key, data, e), private_key))
+            else:
+                _, point, data, e, r, s = item
+                public_key = public_keys.get(point)
+                if public_key is None:
+                    public_key = SM2PublicKey(*point)
+                    public_keys.put(point, public_key)
+                results.append(sm2.verify_digest(_hash(public_key, data, e), (r, s), public_key))
+        except Exception as exc:
+            results.append(str(exc))
+    return results
+
+
+class RequestError(Exception):
+    """请求格式无效或引用了不存在的密钥，作为错误响应返回给客户端"""
+
+
+class DaemonStats:
+    """守护进程统计：请求数、批次数、失败数和当前处理中的请求数"""
+    __slots__ = ('requests', 'batches', 'batched_items', 'errors', 'pending', 'started')
+
+    def __init__(self):
+        self.requests = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.errors = 0
+        self.pending = 0
+        self.started = time.time()
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'average_batch_size': round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+            'errors': self.errors,
+            'pending': self.pending,
+            'uptime_s': round(time.time() - self.started, 1),
+        }
+
+
+class SigningDaemon:
+    """签名/验签守护进程
+    daemon = SigningDaemon(KeyStore(path), processes=2)
+    asyncio.run(daemon.serve_unix('/tmp/sm2d.sock'))
+    """
+
+    def __init__(self, keystore=None, processes=None, batch_window=DEFAULT_BATCH_WINDOW,
+                 batch_size=DEFAULT_BATCH_SIZE, max_pending=DEFAULT_MAX_PENDING,
+                 max_request_size=DEFAULT_MAX_REQUEST_SIZE):
+        self.keystore = keystore if keystore is not None else KeyStore()
+        if processes is None:
+            processes = os.cpu_count() or 1
+        self.processes = processes
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.max_request_size = max_request_size
+        self.stats = DaemonStats()
+        self._queue = []        # [(工作项, asyncio.Future)]
+        self._flush_handle = None
+        self._pool = None
+        self._pending_slots = None
+        self._batch_slots = None
+        self._servers = []
+
+    # ---- 生命周期 ----
+
+    async def _ensure_started(self):
+        if self._pool is not None:
+            return
+        if self.processes > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sm2-daemon',
+                                            initializer=_init_worker)
+        # 信号量须在事件循环中创建
+        self._pending_slots = asyncio.Semaphore(self.max_pending)
+        self._batch_slots = asyncio.Semaphore(max(self.processes, 1) * 2)
+        # 预热：在开始接受连接前完成工作池的启动和预计算表加载
+        await asyncio.get_running_loop().run_in_executor(self._pool, _process_batch, [])
+
+    async def start_unix(self, path=DEFAULT_SOCKET_PATH):
+        """在Unix套接字上开始监听，返回asyncio服务器对象"""
+        await self._ensure_started()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(path)
+        # 连接套接字即可使用私钥签名：bind之后、listen之前把权限改为0o600，
+        # 此时还不接受连接，不依赖进程的umask（umask为进程级设置，多线程下修改不安全）
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.bind(path)
+            os.chmod(path, SOCKET_MODE)
+        except BaseException:
+            sock.close()
+            raise
+        server = await asyncio.start_unix_server(self._handle_connection, sock=sock, limit=self.max_request_size)
+        self._servers.append(server)
+        return server
+
+    async def start_tcp(self, host='127.0.0.1', port=0):
+        """在本机TCP端口上开始监听（port为0时由系统分配），返回实际端口"""
+        await self._ensure_started()
+        server = await asyncio.start_server(self._handle_connection, host, port, limit=self.max_request_size)
+        self._servers.append(server)
+        return server.sockets[0].getsockname()[1]
+
+    async def serve_unix(self, path=DEFAULT_SOCKET_PATH):
+        server = await self.start_unix(path)
+        try:
+            await server.serve_forever()
+        finally:
+            await self.close()
+
+    async def serve_tcp(self, host='127.0.0.1', port=0):
+        await self.start_tcp(host, port)
+        try:
+            await self._servers[-1].serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # ---- 连接 ----
+
+    async def _handle_connection(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(response):
+            async with write_lock:
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+
+        async def run(request_id, request):
+            try:
+                response = await self._handle_request(request)
+            except Exception as exc:
+                # RequestError为请求本身的问题，其他异常同样只影响这一个请求，不中断连接
+                self.stats.errors += 1
+                response = {'ok': False, 'error': str(exc)}
+            finally:
+                self.stats.pending -= 1
+                self._pending_slots.release()
+            response['id'] = request_id
+            try:
+                await respond(response)
+            except ConnectionError:
+                pass
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    await respond({'id': None, 'ok': False, 'error': '请求过大'})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError
+                except ValueError:
+                    self.stats.errors += 1
+                    await respond({'id': None, 'ok': False, 'error': '请求不是有效的JSON对象'})
+                    continue
+                # 处理中的请求达到上限时在这里等待，不再读取该连接上的后续请求
+                await self._pending_slots.acquire()
+                self.stats.pending += 1
+                self.stats.requests += 1
+                task = asyncio.ensure_future(run(request.get('id'), request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # ---- 请求 ----
+
+    async def _handle_request(self, request):
+        op = request.get('op')
+        if op == 'ping':
+            return {'ok': True}
+        if op == 'stats':
+            return {'ok': True, 'stats': self.stats.to_dict()}
+        if op == 'sign':
+            private_key = self._private_key(request.get('key'))
+            public_key = private_key.public_key
+            data, e = self._message(request)
+            result = await self.submit(('sign', private_key.d, public_key.point, data, e))
+            if isinstance(result, str):
+                raise RequestError(result)
+            return {'ok': True, 'signature': ['%064X' % result[0], '%064X' % result[1]],
+                    'fingerprint': public_key.fingerprint().hex()}
+        if op == 'verify':
+            public_key = self._public_key(request)
+            data, e = self._message(request)
+            try:
+                r, s = (int(v, 16) for v in request['signature'])
+            except (KeyError, TypeError, ValueError):
+                raise RequestError("签名值格式无效")
+            result = await self.submit(('verify', public_key.point, data, e, r, s))
+            if isinstance(result, str):
+                raise RequestError(result)
+            return {'ok': True, 'valid': result}
+        raise RequestError(f"不支持的操作: {op}")
+
+    @staticmethod
+    def _message(request):
+        """返回(数据, e)，两者只有一个不为None"""
+        if 'digest' in request:
+            try:
+                e = bytes.fromhex(request['digest'])
+            except (TypeError, ValueError):
+                raise RequestError("摘要格式无效")
+            if len(e) != 32:
+                raise RequestError("摘要必须为32字节")
+            return None, e
+        if 'data' in request:
+            try:
+                return base64.b64decode(request['data'], validate=True), None
+            except (TypeError, ValueError):
+                raise RequestError("数据不是有效的base64")
+        raise RequestError("请求中缺少data或digest")
+
+    def _private_key(self, fingerprint):
+        try:
+            record = self.keystore.get(fingerprint) if fingerprint else self.keystore.get_default()
+        except ValueError:
+            raise RequestError("指纹格式无效")
+        if record is None or record.private_key is None:
+            raise RequestError("密钥库中没有可用的签名私钥")
+        return record.private_key
+
+    def _public_key(self, request):
+        if request.get('public_key'):
+            try:
+                public_key = SM2PublicKey.from_hex(request['public_key'])
+            except (TypeError, ValueError):
+                raise RequestError("公钥格式无效")
+            return public_key
+        try:
+            public_key = self.keystore.get_public_key(parse_fingerprint(request.get('key') or ''))
+        except ValueError:
+            raise RequestError("请求中缺少public_key或key")
+        if public_key is None:
+            raise RequestError("未知的公钥指纹")
+        return public_key
+
+    # ---- 微批处理 ----
+
+    def submit(self, item):
+        """把工作项加入当前批次，返回完成时得到结果的asyncio.Future"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((item, future))
+        if len(self._queue) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._queue = self._queue, []
+        if batch:
+            asyncio.ensure_future(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        async with self._batch_slots:
+            self.stats.batches += 1
+            self.stats.batched_items += len(batch)
+            loop = asyncio.get_running_loop()
+            try:
+                results = await loop.run_in_executor(self._pool, _process_batch, [item for item, _ in batch])
+            except Exception as exc:
+                results = [f"工作进程出错: {exc}"] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -2,26 +2,44 @@ from tkinter import *
 from tkinter import ttk, filedialog, messagebox
 from tkinter.scrolledtext import ScrolledText
 import hashlib
-from sm2_core import SM2
-from gmssl import sm3, func
+from sm2_core import SM2, SM2PublicKey
+from sm2_keystore import KeyStore
+from sm2_sigfile import SignatureRecord, read_signature, write_signature
+from sm2_tasks import TaskRunner
+from sm3_core import session_digest_cache
 import os
 from pathlib import Path
-from datetime import datetime  # 添加datetime模块导入
 
 class SM2GUI:
+    # 后台任务每读取一块检查一次取消并更新进度；纯Python的SM3约为每秒数百KB，块不宜过大
+    TASK_CHUNK_SIZE = 64 * 1024
+    # 后台任务运行时状态栏的刷新间隔(毫秒)
+    POLL_INTERVAL_MS = 50
+
     def __init__(self, master):
         """
         初始化SM2图形界面
         使用Tkinter创建一个包含密钥管理、签名和验证三个标签页的界面
         """
         self.master = master
-        self.sm2 = SM2()  # 创建SM2算法实例
+        self.sm2 = SM2(load_key=False)  # 创建SM2算法实例，私钥由load_or_generate_keys加载
+        # 签名、验签与界面显示共用会话摘要缓存，每个文件只读取和计算一次杂凑值
+        self.sm2.digest_cache = session_digest_cache
+        self.keystore = None  # 密钥库，在load_or_generate_keys中打开
+        # 杂凑计算和签名/验签在后台线程中执行，主线程通过root.after轮询进度和结果，界面不会卡住
+        self.tasks = TaskRunner(max_workers=2)
+        self._polling = False
+        master.protocol("WM_DELETE_WINDOW", self.close)
         
-        # 定义支持的文件类型，当前仅支持txt文件
+        # 签名和验证支持任意类型的文件
         self.supported_filetypes = [
+            ("所有文件", "*.*"),
             ("文本文件", "*.txt"),
         ]
         
+        # 底部状态栏：显示后台任务的阶段和进度，可取消
+        self.setup_status_bar()
+        
         # 创建标签页控件，用于分页显示不同功能
         self.notebook = ttk.Notebook(master)
         self.notebook.pack(fill='both', expand=True, padx=5, pady=5)
@@ -44,6 +62,18 @@ class SM2GUI:
         # 程序启动时自动加载或生成密钥对
         self.load_or_generate_keys()
 
+    def setup_status_bar(self):
+        """设置底部状态栏：任务说明、进度条和取消按钮"""
+        status_frame = ttk.Frame(self.master)
+        status_frame.pack(side='bottom', fill='x', padx=5, pady=(0, 5))
+        
+        self.cancel_button = ttk.Button(status_frame, text="取消", command=self.cancel_tasks, state='disabled')
+        self.cancel_button.pack(side='right', padx=5)
+        self.progress = ttk.Progressbar(status_frame, length=200, maximum=1000)
+        self.progress.pack(side='right', padx=5)
+        self.status_label = ttk.Label(status_frame, text="就绪")
+        self.status_label.pack(side='left', fill='x', expand=True)
+
     def setup_key_page(self):
         """
         设置密钥管理页面的界面元素
@@ -67,13 +97,22 @@ class SM2GUI:
         self.pub_y = ttk.Entry(key_group, width=70)
         self.pub_y.grid(row=2, column=1, padx=5, pady=2)
         
+        ttk.Label(key_group, text="指纹:").grid(row=3, column=0, sticky='w')
+        self.key_fingerprint = ttk.Entry(key_group, width=70)
+        self.key_fingerprint.grid(row=3, column=1, padx=5, pady=2)
+        
+        ttk.Label(key_group, text="标签:").grid(row=4, column=0, sticky='w')
+        self.key_label = ttk.Entry(key_group, width=70)
+        self.key_label.grid(row=4, column=1, padx=5, pady=2)
+        
         # 按钮区域
         btn_frame = ttk.Frame(key_group)
-        btn_frame.grid(row=3, column=0, columnspan=2, pady=10)
+        btn_frame.grid(row=5, column=0, columnspan=2, pady=10)
         
         ttk.Button(btn_frame, text="生成新密钥对", command=self.generate_new_keypair).pack(side='left', padx=5)
         ttk.Button(btn_frame, text="导出密钥对", command=self.export_keypair).pack(side='left', padx=5)
         ttk.Button(btn_frame, text="导入密钥对", command=self.import_keypair).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="按指纹加载", command=self.load_keypair_by_fingerprint).pack(side='left', padx=5)
 
     def setup_sign_page(self):
         """
@@ -89,7 +128,7 @@ class SM2GUI:
         
         # 添加文件类型说明
         supported_types = ttk.Label(file_group, 
-            text="支持的文件类型: TXT",
+            text="支持的文件类型: 任意文件",
             font=('微软雅黑', 8))
         supported_types.grid(row=0, column=0, columnspan=3, sticky='w', pady=(0,5))
         
@@ -179,37 +218,48 @@ class SM2GUI:
     def load_or_generate_keys(self):
         """
         加载或生成SM2密钥对
-        1. 尝试从预设路径加载已存在的密钥文件
-        2. 如果密钥文件不存在，则生成新的密钥对并保存
-        3. 更新界面显示
+        1. 打开密钥库，存在默认密钥时直接使用（公钥从密钥库读取，无需重新计算）
+        2. 密钥库为空时导入旧版的sm2_key.txt / keys.txt
+        3. 仍然没有密钥时生成新的密钥对并保存到密钥库
+        4. 更新界面显示
         """
         try:
-            keyfile_path = Path(__file__).parent / 'assets' / 'keys' / 'sm2_key.txt'
-            keyfile_path.parent.mkdir(parents=True, exist_ok=True)
+            keys_dir = Path(__file__).parent / 'assets' / 'keys'
+            self.keystore = KeyStore(keys_dir / 'keystore.db', sm2=self.sm2)
             
-            if keyfile_path.exists():
-                with open(keyfile_path, 'r') as f:
-                    self.sm2.d = int(f.readline().strip(), 16)
-            else:
-                self.sm2.setSecretKey(True)
-                with open(keyfile_path, 'w') as f:
-                    f.write(self.sm2.hex(self.sm2.d))
-                    
-            self.sm2.PBx, self.sm2.PBy = self.sm2.multiPoint([self.sm2.Gx, self.sm2.Gy], self.sm2.d)
-            self.update_key_display()
+            record = self.keystore.get_default()
+            if record is None or record.private_key is None:
+                for legacy_path in (keys_dir / 'sm2_key.txt', keys_dir.parent / 'keys.txt'):
+                    if legacy_path.exists():
+                        fingerprints = self.keystore.import_legacy_file(legacy_path, label=legacy_path.name)
+                        if fingerprints:
+                            self.keystore.set_default(fingerprints[0])
+                            break
+                else:
+                    self.sm2.setSecretKey(True)
+                    self.keystore.set_default(self.keystore.add_private_key(self.sm2.private_key))
+                record = self.keystore.get_default()
+            
+            self.sm2.set_private_key(record.private_key)
+            self.update_key_display(record.label)
             
         except Exception as e:
             messagebox.showerror("错误", f"加载密钥出错: {str(e)}")
 
-    def update_key_display(self):
+    def update_key_display(self, label=None):
         """更新密钥显示"""
         self.priv_key.delete(0, END)
         self.pub_x.delete(0, END)
         self.pub_y.delete(0, END)
+        self.key_fingerprint.delete(0, END)
+        self.key_label.delete(0, END)
         
         self.priv_key.insert(0, self.sm2.hex(self.sm2.d))
         self.pub_x.insert(0, self.sm2.hex(self.sm2.PBx))
         self.pub_y.insert(0, self.sm2.hex(self.sm2.PBy))
+        self.key_fingerprint.insert(0, self.sm2.public_key.fingerprint().hex())
+        if label:
+            self.key_label.insert(0, label)
         
         # 同时更新验证页面的公钥
         self.verify_pub_x.delete(0, END)
@@ -218,18 +268,31 @@ class SM2GUI:
         self.verify_pub_y.insert(0, self.sm2.hex(self.sm2.PBy))
 
     def generate_new_keypair(self):
-        """生成新的密钥对"""
+        """生成新的密钥对，保存到密钥库并设为默认密钥"""
         try:
+            label = self.key_label.get().strip() or None
             self.sm2.setSecretKey(True)
-            keyfile_path = Path(__file__).parent / 'assets' / 'keys.txt'
-            with open(keyfile_path, 'w') as f:
-                f.write(self.sm2.hex(self.sm2.d))
-            self.sm2.PBx, self.sm2.PBy = self.sm2.multiPoint([self.sm2.Gx, self.sm2.Gy], self.sm2.d)
-            self.update_key_display()
+            fingerprint = self.keystore.add_private_key(self.sm2.private_key, label)
+            self.keystore.set_default(fingerprint)
+            self.update_key_display(label)
             messagebox.showinfo("成功", "已生成新的密钥对")
         except Exception as e:
             messagebox.showerror("错误", f"生成密钥对失败: {str(e)}")
 
+    def load_keypair_by_fingerprint(self):
+        """按指纹从密钥库加载密钥对，并设为默认密钥"""
+        try:
+            fingerprint = self.key_fingerprint.get().strip()
+            record = self.keystore.get(fingerprint)
+            if record is None or record.private_key is None:
+                messagebox.showerror("错误", "密钥库中没有该指纹对应的私钥")
+                return
+            self.sm2.set_private_key(record.private_key)
+            self.keystore.set_default(record.fingerprint)
+            self.update_key_display(record.label)
+        except Exception as e:
+            messagebox.showerror("错误", f"加载密钥对失败: {str(e)}")
+
     def export_keypair(self):
         """导出密钥对"""
         try:
@@ -240,7 +303,7 @@ class SM2GUI:
                 title="导出密钥对"
             )
             if filename:
-                with open(filename, 'w') as f:
+                with open(filename, 'w', encoding='utf-8') as f:
                     f.write(f"私钥: {self.sm2.hex(self.sm2.d)}\n")
                     f.write(f"公钥X: {self.sm2.hex(self.sm2.PBx)}\n")
                     f.write(f"公钥Y: {self.sm2.hex(self.sm2.PBy)}\n")
@@ -257,14 +320,15 @@ class SM2GUI:
                 title="导入密钥对"
             )
             if filename:
-                with open(filename, 'r') as f:
-                    lines = f.readlines()
-                    for line in lines:
-                        if line.startswith("私钥:"):
-                            self.sm2.d = int(line.split(":")[1].strip(), 16)
-                            break
-                self.sm2.PBx, self.sm2.PBy = self.sm2.multiPoint([self.sm2.Gx, self.sm2.Gy], self.sm2.d)
-                self.update_key_display()
+                # 导入到密钥库，文件中的第一个私钥设为当前密钥
+                fingerprints = self.keystore.import_legacy_file(filename, label=Path(filename).name)
+                if not fingerprints:
+                    messagebox.showerror("错误", "文件中没有找到私钥")
+                    return
+                record = self.keystore.get(fingerprints[0])
+                self.sm2.set_private_key(record.private_key)
+                self.keystore.set_default(record.fingerprint)
+                self.update_key_display(record.label)
                 messagebox.showinfo("成功", "密钥对已导入")
         except Exception as e:
             messagebox.showerror("错误", f"导入密钥对失败: {str(e)}")
@@ -274,52 +338,32 @@ class SM2GUI:
         filepath = filedialog.askopenfilename(
             initialdir=str(Path(__file__).parent / 'data' / 'input'),
             title="选择要签名的文件",
-            filetypes=[("文本文件", "*.txt")]
+            filetypes=self.supported_filetypes
         )
         if filepath:
-            if not filepath.lower().endswith('.txt'):
-                messagebox.showerror("错误", "只支持TXT文本文件")
-                return
-                
             self.file_to_sign.delete(0, END)
             self.file_to_sign.insert(0, filepath)
-            
-            try:
-                with open(filepath, 'rb') as f:
-                    data = f.read()
-                    hash_value = sm3.sm3_hash(func.bytes_to_list(data))
-                    self.file_hash.delete('1.0', END)
-                    self.file_hash.insert('1.0', f"SM3哈希值:\n{hash_value}")
-            except Exception as e:
-                messagebox.showerror("错误", f"读取文件失败: {str(e)}")
+            self._show_file_hash(filepath, "SM3哈希值")
 
     def select_verify_file(self):
         """选择要验证的文件"""
         filepath = filedialog.askopenfilename(
             initialdir=str(Path(__file__).parent / 'data' / 'input'),
             title="选择要验证的文件",
-            filetypes=[("文本文件", "*.txt")]
+            filetypes=self.supported_filetypes
         )
         if filepath:
             self.file_to_verify.delete(0, END)
             self.file_to_verify.insert(0, filepath)
-            
-            try:
-                # 显示文件哈希值
-                with open(filepath, 'rb') as f:
-                    data = f.read()
-                    hash_value = sm3.sm3_hash(func.bytes_to_list(data))
-                    self.file_hash.delete('1.0', END)
-                    self.file_hash.insert('1.0', f"文件SM3哈希值:\n{hash_value}")
-            except Exception as e:
-                messagebox.showerror("错误", f"读取文件失败: {str(e)}")
+            # 显示文件哈希值
+            self._show_file_hash(filepath, "文件SM3哈希值", self._entered_public_key())
 
     def select_original_file(self):
         """手动选择原始文件"""
         filepath = filedialog.askopenfilename(
             initialdir=str(Path(__file__).parent / 'data' / 'input'),
             title="选择原始文件",
-            filetypes=[("文本文件", "*.txt")]
+            filetypes=self.supported_filetypes
         )
         if filepath:
             self.file_to_verify.delete(0, END)
@@ -338,41 +382,34 @@ class SM2GUI:
                 self.sig_file.delete(0, END)
                 self.sig_file.insert(0, filepath)
                 
-                # 读取签名文件内容
-                with open(filepath, 'r') as f:
-                    lines = f.readlines()
-                    
-                # 解析签名文件信息
-                for line in lines:
-                    if line.startswith("r:"):
-                        r_value = line.split(":")[1].strip()
-                        self.verify_r.delete(0, END)
-                        self.verify_r.insert(0, r_value)
-                    elif line.startswith("s:"):
-                        s_value = line.split(":")[1].strip()
-                        self.verify_s.delete(0, END)
-                        self.verify_s.insert(0, s_value)
-                    elif line.startswith("公钥X:"):
-                        x_value = line.split(":")[1].strip()
-                        self.verify_pub_x.delete(0, END)
-                        self.verify_pub_x.insert(0, x_value)
-                    elif line.startswith("公钥Y:"):
-                        y_value = line.split(":")[1].strip()
-                        self.verify_pub_y.delete(0, END)
-                        self.verify_pub_y.insert(0, y_value)
-                    elif line.startswith("原始文件:"):
-                        orig_filename = line.split(":")[1].strip()
-                        # 查找对应的原始文件
-                        orig_file = Path(__file__).parent / 'data' / 'input' / orig_filename
-                        if orig_file.exists():
-                            self.file_to_verify.delete(0, END)
-                            self.file_to_verify.insert(0, str(orig_file))
-                            # 更新哈希值显示
-                            with open(orig_file, 'rb') as f:
-                                data = f.read()
-                                hash_value = sm3.sm3_hash(func.bytes_to_list(data))
-                                self.file_hash.delete('1.0', END)
-                                self.file_hash.insert('1.0', f"原始文件SM3哈希值:\n{hash_value}")
+                # 读取签名文件，支持二进制记录和旧版文本格式
+                record, public_key, orig_filename = read_signature(filepath)
+                if public_key is None and record.fingerprint is not None:
+                    # 二进制记录只保存公钥指纹，公钥从密钥库中查找
+                    public_key = self.keystore.get_public_key(record.fingerprint)
+                
+                self.verify_r.delete(0, END)
+                self.verify_r.insert(0, self.sm2.hex(record.r))
+                self.verify_s.delete(0, END)
+                self.verify_s.insert(0, self.sm2.hex(record.s))
+                self.verify_pub_x.delete(0, END)
+                self.verify_pub_y.delete(0, END)
+                if public_key is not None:
+                    self.verify_pub_x.insert(0, self.sm2.hex(public_key.x))
+                    self.verify_pub_y.insert(0, self.sm2.hex(public_key.y))
+                
+                if orig_filename:
+                    # 查找对应的原始文件
+                    orig_file = Path(__file__).parent / 'data' / 'input' / orig_filename
+                    if orig_file.exists():
+                        self.file_to_verify.delete(0, END)
+                        self.file_to_verify.insert(0, str(orig_file))
+                        # 更新哈希值显示
+                        self._show_file_hash(str(orig_file), "原始文件SM3哈希值", public_key)
+                
+                if public_key is None:
+                    messagebox.showwarning("提示", "密钥库中没有该签名的公钥，请手动填写公钥")
+                    return
                         
                 messagebox.showinfo("成功", "已导入签名信息")
                 
@@ -387,11 +424,12 @@ class SM2GUI:
         2. 使用SM2算法生成签名值(r,s)
         3. 在界面上显示签名结果
         4. 同时在验证页面自动填入签名值
-        5. 将签名信息保存为.sig文件，包含：
-           - 原始文件信息
+        5. 将签名信息保存为.sig文件（固定120字节的二进制记录），包含：
+           - 原始文件大小
            - 签名时间戳
            - 签名值(r,s)
-           - 公钥信息
+           - 公钥指纹（公钥本身保存在密钥库中）
+        步骤1、2和5在后台线程中执行，完成后在主线程中显示结果
         """
         filepath = self.file_to_sign.get()
         if not filepath:
@@ -401,52 +439,133 @@ class SM2GUI:
         if not Path(filepath).exists():
             messagebox.showerror("错误", "文件不存在")
             return
-            
+        
+        # 提交时确定签名私钥，签名过程中切换密钥不影响本次签名
+        private_key = self.sm2.private_key
+        self._start_task(('sign', filepath), f"签名 {Path(filepath).name}",
+                         self._sign_task, filepath, private_key,
+                         on_done=self._show_signature,
+                         on_error=lambda e: messagebox.showerror("错误", f"签名生成失败: {str(e)}"))
+
+    def _sign_task(self, task, filepath, private_key):
+        """后台线程：计算杂凑值、签名并保存签名记录，返回(r, s, 签名文件路径, 文件大小)"""
+        public_key = private_key.public_key
+        size = Path(filepath).stat().st_size
+        task.set_phase("计算杂凑值", size)
+        # 分块读取文件并计算e = H(ZA || M)，不将整个文件读入内存
+        e = session_digest_cache.digest(filepath, public_key.default_za(), self.TASK_CHUNK_SIZE, task.progress)
+        task.set_phase("签名")
+        r, s = self.sm2.sign_digest(e, private_key)
+        
+        # 保存签名信息
+        output_dir = Path(__file__).parent / 'data' / 'signed'
+        output_dir.mkdir(exist_ok=True)
+        signature_path = output_dir / f"{Path(filepath).name}.sig"
+        
+        # 保存二进制签名记录
+        write_signature(signature_path, SignatureRecord(r, s, public_key.fingerprint(), size))
+        return r, s, signature_path, size
+
+    def _show_signature(self, result):
+        """主线程：显示签名结果"""
+        r, s, signature_path, size = result
+        self.sig_r.delete(0, END)
+        self.sig_r.insert(0, self.sm2.hex(r))
+        self.sig_s.delete(0, END)
+        self.sig_s.insert(0, self.sm2.hex(s))
+        
+        # 同时填入验证页面
+        self.verify_r.delete(0, END)
+        self.verify_s.delete(0, END)
+        self.verify_r.insert(0, self.sm2.hex(r))
+        self.verify_s.insert(0, self.sm2.hex(s))
+        
+        messagebox.showinfo("成功", 
+            f"签名已生成并保存到:\n{signature_path}\n\n"
+            f"原始文件: {signature_path.name[:-4]}\n"
+            f"文件大小: {size / 1024:.1f} KB")
+
+    def _start_task(self, name, description, func, *args, on_done=None, on_error=None):
+        """提交后台任务并开始轮询进度；同名任务会取消之前未完成的那个"""
+        self.tasks.submit(name, description, func, *args, on_done=on_done, on_error=on_error)
+        if not self._polling:
+            self._polling = True
+            self.master.after(self.POLL_INTERVAL_MS, self._poll_tasks)
+        self._update_status(self.tasks.running())
+
+    def _poll_tasks(self):
+        """主线程定时调用：执行已完成任务的回调并刷新状态栏，没有任务时停止轮询"""
         try:
-            # 读取文件内容
-            with open(filepath, 'rb') as f:
-                file_content = f.read()
+            self.tasks.poll()
+        finally:
+            # 回调抛出异常时同样继续轮询并刷新状态栏，异常照常交给Tk的错误处理
+            pending = len(self.tasks) > 0
+            self._polling = pending
+            if pending:
+                self.master.after(self.POLL_INTERVAL_MS, self._poll_tasks)
+            self._update_status(self.tasks.running())
 
-            # 生成签名
-            r, s = self.sm2.sign(file_content)
-            
-            # 显示签名结果
-            self.sig_r.delete(0, END)
-            self.sig_r.insert(0, self.sm2.hex(r))
-            self.sig_s.delete(0, END)
-            self.sig_s.insert(0, self.sm2.hex(s))
-            
-            # 同时填入验证页面
-            self.verify_r.delete(0, END)
-            self.verify_s.delete(0, END)
-            self.verify_r.insert(0, self.sm2.hex(r))
-            self.verify_s.insert(0, self.sm2.hex(s))
-            
-            # 保存签名信息
-            output_dir = Path(__file__).parent / 'data' / 'signed'
-            output_dir.mkdir(exist_ok=True)
-            
-            original_filename = Path(filepath).name
-            signature_filename = f"{original_filename}.sig"
-            signature_path = output_dir / signature_filename
-            
-            # 保存签名文件，包含更多信息
-            with open(signature_path, 'w') as f:
-                f.write(f"原始文件: {original_filename}\n")
-                f.write(f"文件大小: {Path(filepath).stat().st_size} bytes\n")
-                f.write(f"签名时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"r: {self.sm2.hex(r)}\n")
-                f.write(f"s: {self.sm2.hex(s)}\n")
-                f.write(f"公钥X: {self.sm2.hex(self.sm2.PBx)}\n")
-                f.write(f"公钥Y: {self.sm2.hex(self.sm2.PBy)}\n")
-            
-            messagebox.showinfo("成功", 
-                f"签名已生成并保存到:\n{signature_path}\n\n"
-                f"原始文件: {original_filename}\n"
-                f"文件大小: {Path(filepath).stat().st_size / 1024:.1f} KB")
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"签名生成失败: {str(e)}")
+    def _update_status(self, running):
+        if not running:
+            self.status_label.config(text="就绪")
+            self.progress['value'] = 0
+            self.cancel_button.config(state='disabled')
+            return
+        self.status_label.config(text="；".join(task.status() for task in running))
+        total = sum(task.total for task in running)
+        done = sum(task.done for task in running)
+        self.progress['value'] = 1000 * done // total if total else 0
+        self.cancel_button.config(state='normal')
+
+    def cancel_tasks(self):
+        """取消所有正在运行的后台任务"""
+        self.tasks.cancel()
+        self._update_status([])
+
+    def close(self):
+        """关闭窗口：取消后台任务，不等待其结束"""
+        self.tasks.shutdown()
+        if self.keystore is not None:
+            self.keystore.close()
+        self.master.destroy()
+
+    def _file_hash(self, filepath, public_key=None, progress=None):
+        """返回文件的SM3哈希值(十六进制)，用于界面显示
+        同一遍读取中同时计算当前私钥和public_key对应的e = H(ZA || M)并放入会话摘要缓存，
+        之后的签名、验签直接使用缓存，不再读取文件
+        """
+        prefixes = [b'']
+        for key in (self.sm2.public_key, public_key):
+            if key is not None:
+                prefixes.append(key.default_za())
+        return session_digest_cache.digests(filepath, prefixes, self.TASK_CHUNK_SIZE, progress)[0].hex()
+
+    def _show_file_hash(self, filepath, title, public_key=None):
+        """在后台计算文件哈希值，完成后显示在哈希值区域；连续选择文件时只显示最后一个"""
+        def hash_task(task):
+            task.set_phase("计算杂凑值", os.path.getsize(filepath))
+            return self._file_hash(filepath, public_key, task.progress)
+
+        def show(hash_value):
+            self.file_hash.delete('1.0', END)
+            self.file_hash.insert('1.0', f"{title}:\n{hash_value}")
+
+        self._start_task('hash', f"读取 {Path(filepath).name}", hash_task, on_done=show,
+                         on_error=lambda e: messagebox.showerror("错误", f"读取文件失败: {str(e)}"))
+
+    def _entered_public_key(self):
+        """验证页面中填写的公钥，未填写或格式无效时返回None"""
+        try:
+            return self._verify_public_key(int(self.verify_pub_x.get(), 16), int(self.verify_pub_y.get(), 16))
+        except ValueError:
+            return None
+
+    def _verify_public_key(self, pub_x, pub_y):
+        """返回验签用的SM2PublicKey，公钥未变化时复用同一对象及其预计算结果"""
+        public_key = self.sm2.public_key
+        if public_key is not None and public_key.point == (pub_x, pub_y):
+            return public_key
+        return SM2PublicKey(pub_x, pub_y)
 
     def verify_signature(self):
         """
@@ -457,6 +576,7 @@ class SM2GUI:
         3. 计算并显示文件的哈希值
         4. 使用SM2算法进行标准的签名验证
         5. 显示验证结果（成功/失败）
+        步骤3、4在后台线程中执行
         """
         filepath = self.file_to_verify.get()
         r_hex = self.verify_r.get()
@@ -468,25 +588,31 @@ class SM2GUI:
             messagebox.showerror("错误", "请填写完整的验证信息")
             return
             
+        # 基本格式验证
         try:
-            # 基本格式验证
-            try:
-                pub_x = int(pub_x_hex, 16)
-                pub_y = int(pub_y_hex, 16)
-                r = int(r_hex, 16)
-                s = int(s_hex, 16)
-            except ValueError:
-                messagebox.showerror("错误", "签名值或公钥格式无效")
-                return
+            pub_x = int(pub_x_hex, 16)
+            pub_y = int(pub_y_hex, 16)
+            r = int(r_hex, 16)
+            s = int(s_hex, 16)
+        except ValueError:
+            messagebox.showerror("错误", "签名值或公钥格式无效")
+            return
+        
+        public_key = self._verify_public_key(pub_x, pub_y)
+        
+        def verify_task(task):
+            task.set_phase("计算杂凑值", os.path.getsize(filepath))
+            hash_value = self._file_hash(filepath, public_key, task.progress)
+            task.set_phase("验签")
+            # 执行SM2标准验证，杂凑值已在上一步放入会话摘要缓存
+            return hash_value, self.sm2.verify_file(filepath, (r, s), public_key)
 
-            # 读取文件内容
-            with open(filepath, 'rb') as f:
-                file_content = f.read()
-                
+        def show(result):
+            hash_value, valid = result
             # 显示验证信息
             info_text = f"验证信息:\n"
             info_text += f"文件: {Path(filepath).name}\n"
-            info_text += f"文件哈希: {sm3.sm3_hash(func.bytes_to_list(file_content))}\n"
+            info_text += f"文件哈希: {hash_value}\n"
             info_text += f"签名值 r: {r_hex}\n"
             info_text += f"签名值 s: {s_hex}\n"
             info_text += f"公钥 X: {pub_x_hex}\n"
@@ -495,13 +621,11 @@ class SM2GUI:
             self.file_hash.delete('1.0', END)
             self.file_hash.insert('1.0', info_text)
             
-            # 执行SM2标准验证
-            valid = self.sm2.verify(file_content, (r, s), pub_x, pub_y)
-            
             if valid:
                 self.verify_result.config(text="✓ 签名验证成功", foreground='green')
             else:
                 self.verify_result.config(text="✗ 签名验证失败", foreground='red')
 
-        except Exception as e:
-            messagebox.showerror("错误", f"验证过程出错: {str(e)}")
\ No newline at end of file
+        self.verify_result.config(text="验证中...", foreground='black')
+        self._start_task(('verify', filepath), f"验证 {Path(filepath).name}", verify_task, on_done=show,
+                         on_error=lambda e: messagebox.showerror("错误", f"验证过程出错: {str(e)}"))
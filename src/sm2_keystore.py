@@ -0,0 +1,343 @@
+"""SM2密钥库
+所有密钥保存在一个SQLite数据库文件中，以公钥指纹SM3(04 || x || y)为主键：
+- 私钥、公钥均以32字节大端整数存储，按指纹查找直接走主键索引，不需要重新计算[d]G
+- 只有公钥的条目（例如对方的验签公钥）私钥列为NULL
+- 条目按需从数据库读出，并保存在LRU缓存中，打开包含大量密钥的密钥库不会整体加载
+"""
+import locale
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from sm2_core import SM2, SM2PrivateKey, SM2PublicKey, LRUCache
+
+DEFAULT_KEYSTORE_PATH = Path(__file__).parent / 'assets' / 'keys' / 'keystore.db'
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS keys (
+    fingerprint BLOB PRIMARY KEY,
+    label TEXT,
+    private_key BLOB,
+    public_x BLOB NOT NULL,
+    public_y BLOB NOT NULL,
+    created REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS keys_label ON keys(label);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _to_bytes(value):
+    return value.to_bytes(32, 'big')
+
+
+def _to_int(value):
+    return int.from_bytes(value, 'big')
+
+
+def read_legacy_text(path):
+    """读取旧版程序写出的文本文件（密钥文件、.sig），返回str
+    旧版按系统默认编码写文件（中文Windows上为GBK），依次尝试UTF-8、系统默认编码和GB18030
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    encodings = dict.fromkeys(['utf-8', locale.getpreferredencoding(False), 'gb18030'])
+    for encoding in encodings:
+        try:
+            return data.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            continue
+    raise ValueError(f"无法识别文件编码: {path}")
+
+
+def parse_fingerprint(fingerprint):
+    """指纹可以是32字节bytes或64位十六进制字符串"""
+    if isinstance(fingerprint, str):
+        fingerprint = bytes.fromhex(fingerprint.strip())
+    fingerprint = bytes(fingerprint)
+    if len(fingerprint) != 32:
+        raise ValueError("指纹格式无效")
+    return fingerprint
+
+
+class KeyRecord:
+    """密钥库中的一条记录；private_key为None表示只有公钥"""
+    __slots__ = ('fingerprint', 'label', 'private_key', 'public_key', 'created')
+
+    def __init__(self, fingerprint, label, private_key, public_key, created):
+        self.fingerprint = fingerprint
+        self.label = label
+        self.private_key = private_key
+        self.public_key = public_key
+        self.created = created
+
+    def __repr__(self):
+        return 'KeyRecord(%s, label=%r, private=%s)' % (
+            self.fingerprint.hex(), self.label, self.private_key is not None)
+
+
+class KeyStore:
+    """线程安全的SM2密钥库
+    with KeyStore(path) as store:
+        fingerprint = store.add_private_key(d, label='device-1')
+        sm2.set_private_key(store.get_private_key(fingerprint))
+    """
+
+    def __init__(self, path=None, sm2=None, cache_size=256):
+        self.path = Path(path) if path is not None else DEFAULT_KEYSTORE_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.sm2 = sm2 if sm2 is not None else SM2(load_key=False)
+        self.cache = LRUCache(cache_size)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            version = self._get_meta('schema_version')
+            if version is None:
+                self._set_meta('schema_version', str(SCHEMA_VERSION))
+            elif int(version) != SCHEMA_VERSION:
+                raise ValueError(f"不支持的密钥库版本: {version}")
+
+    # ---- 元数据 ----
+
+    def _get_meta(self, name):
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return None if row is None else row[0]
+
+    def _set_meta(self, name, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta(name, value) VALUES (?, ?)", (name, value))
+
+    @property
+    def default_fingerprint(self):
+        """默认密钥的指纹，未设置时为None"""
+        with self._lock:
+            value = self._get_meta('default')
+        return None if value is None else bytes.fromhex(value)
+
+    def set_default(self, fingerprint):
+        fingerprint = parse_fingerprint(fingerprint)
+        with self._lock, self._conn:
+            if fingerprint not in self:
+                raise KeyError(fingerprint.hex())
+            self._set_meta('default', fingerprint.hex())
+
+    # ---- 写入 ----
+
+    def _insert(self, rows):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO keys(fingerprint, label, private_key, public_x, public_y, created) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def add_private_key(self, key, label=None, public_key=None):
+        """保存私钥（整数、十六进制字符串或SM2PrivateKey），返回公钥指纹
+        public_key已知时直接使用，否则计算一次[d]G
+        """
+        if isinstance(key, str):
+            key = int(key, 16)
+        if not isinstance(key, SM2PrivateKey):
+            key = SM2PrivateKey(key, self.sm2, public_key)
+        public_key = key.public_key
+        fingerprint = public_key.fingerprint()
+        with self._lock, self._conn:
+            self._insert([(fingerprint, label, _to_bytes(key.d),
+                           _to_bytes(public_key.x), _to_bytes(public_key.y), time.time())])
+            self.cache.evict(fingerprint)
+        return fingerprint
+
+    def add_public_key(self, public_key, label=None):
+        """保存只有公钥的条目，返回指纹；已存在相同指纹的私钥条目时保留其私钥"""
+        if not isinstance(public_key, SM2PublicKey):
+            public_key = SM2PublicKey(*public_key)
+        if not self.sm2.is_on_curve(public_key.x, public_key.y):
+            raise ValueError("公钥不在曲线上")
+        fingerprint = public_key.fingerprint()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO keys(fingerprint, label, private_key, public_x, public_y, created) "
+                "VALUES (?, ?, NULL, ?, ?, ?)",
+                (fingerprint, label, _to_bytes(public_key.x), _to_bytes(public_key.y), time.time()))
+            self.cache.evict(fingerprint)
+        return fingerprint
+
+    def add_keypairs(self, keypairs, label=None, chunk_size=1024, check=True):
+        """批量保存(d, Px, Py)，例如SM2.generate_keypairs的输出
+        每chunk_size条提交一次事务，输入可以是任意长度的迭代器。返回保存的数量
+        check为True时每批重新计算[d]G并与给出的公钥比对，不一致时抛出ValueError，该批及之后的条目不写入；
+        密钥对由本程序刚刚生成时可以传入check=False跳过
+        """
+        count = 0
+        batch = []
+        now = time.time()
+        for keypair in keypairs:
+            batch.append(keypair)
+            if len(batch) >= chunk_size:
+                count += self._flush_keypairs(batch, label, now, check)
+                batch = []
+        if batch:
+            count += self._flush_keypairs(batch, label, now, check)
+        return count
+
+    def check_keypairs(self, keypairs):
+        """确认每个(d, Px, Py)满足[d]G == (Px, Py)，整批[d]G共用一次求逆"""
+        for d, _, _ in keypairs:
+            if not 1 <= d <= SM2.n - 2:
+                raise ValueError("私钥必须在[1, n-2]范围内")
+        points = self.sm2.base_multiply_many([d for d, _, _ in keypairs])
+        for (_, Px, Py), point in zip(keypairs, points):
+            if tuple(point) != (Px, Py):
+                raise ValueError(f"私钥与公钥不匹配（公钥X: {Px:064X}）")
+
+    def _flush_keypairs(self, keypairs, label, now, check):
+        if check:
+            self.check_keypairs(keypairs)
+        return self._flush([(SM2PublicKey(Px, Py).fingerprint(), label, _to_bytes(d), _to_bytes(Px), _to_bytes(Py), now)
+                            for d, Px, Py in keypairs])
+
+    def _flush(self, rows):
+        with self._lock, self._conn:
+            self._insert(rows)
+            for row in rows:
+                self.cache.evict(row[0])
+        return len(rows)
+
+    def set_label(self, fingerprint, label):
+        fingerprint = parse_fingerprint(fingerprint)
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE keys SET label = ? WHERE fingerprint = ?", (label, fingerprint))
+            self.cache.evict(fingerprint)
+
+    def remove(self, fingerprint):
+        """删除条目，返回是否存在"""
+        fingerprint = parse_fingerprint(fingerprint)
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM keys WHERE fingerprint = ?", (fingerprint,)).rowcount > 0
+            if self._get_meta('default') == fingerprint.hex():
+                self._conn.execute("DELETE FROM meta WHERE name = 'default'")
+            self.cache.evict(fingerprint)
+        return removed
+
+    # ---- 查询 ----
+
+    def get(self, fingerprint):
+        """按指纹读取KeyRecord，不存在时返回None"""
+        fingerprint = parse_fingerprint(fingerprint)
+        record = self.cache.get(fingerprint)
+        if record is not None:
+            return record
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT label, private_key, public_x, public_y, created FROM keys WHERE fingerprint = ?",
+                (fingerprint,)).fetchone()
+        if row is None:
+            return None
+        record = self._make_record(fingerprint, *row)
+        self.cache.put(fingerprint, record)
+        return record
+
+    def _make_record(self, fingerprint, label, private_key, public_x, public_y, created):
+        public_key = SM2PublicKey(_to_int(public_x), _to_int(public_y))
+        if private_key is not None:
+            private_key = SM2PrivateKey(_to_int(private_key), self.sm2, public_key)
+        return KeyRecord(fingerprint, label, private_key, public_key, created)
+
+    def get_private_key(self, fingerprint):
+        """按指纹取SM2PrivateKey，其公钥直接来自密钥库；不存在或只有公钥时返回None"""
+        record = self.get(fingerprint)
+        return None if record is None else record.private_key
+
+    def get_public_key(self, fingerprint):
+        record = self.get(fingerprint)
+        return None if record is None else record.public_key
+
+    def get_default(self):
+        """默认密钥的KeyRecord，未设置时返回None"""
+        fingerprint = self.default_fingerprint
+        return None if fingerprint is None else self.get(fingerprint)
+
+    def find(self, label):
+        """按标签查找，返回指纹列表"""
+        with self._lock:
+            rows = self._conn.execute("SELECT fingerprint FROM keys WHERE label = ?", (label,)).fetchall()
+        return [row[0] for row in rows]
+
+    def fingerprints(self, batch_size=1024):
+        """按指纹顺序逐个产出所有指纹，每次只从数据库读取batch_size条"""
+        last = b''
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT fingerprint FROM keys WHERE fingerprint > ? ORDER BY fingerprint LIMIT ?",
+                    (last, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[0]
+            last = rows[-1][0]
+
+    def __contains__(self, fingerprint):
+        fingerprint = parse_fingerprint(fingerprint)
+        if fingerprint in self.cache:
+            return True
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM keys WHERE fingerprint = ?", (fingerprint,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    # ---- 旧格式导入 ----
+
+    def import_legacy_file(self, path, label=None):
+        """导入旧版文本密钥文件，返回导入的指纹列表
+        支持三种格式：只有一行私钥十六进制（keys.txt、sm2_key.txt），
+        导出的"私钥: ..."标签格式，以及keygen输出的"私钥 公钥X 公钥Y"每行一个密钥对
+        文件中给出的公钥都会与[d]G比对，任何一个不一致时抛出ValueError，不导入任何条目
+        """
+        keypairs = []
+        private_keys = []
+        labeled = {}
+        for line in read_legacy_text(path).splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if ':' in line:
+                name, _, value = line.partition(':')
+                name = name.strip()
+                if name == '私钥':
+                    private_keys.append(value.strip())
+                elif name in ('公钥X', '公钥Y'):
+                    labeled[name] = int(value.strip(), 16)
+                continue
+            fields = line.split()
+            if len(fields) == 3:
+                keypairs.append(tuple(int(v, 16) for v in fields))
+            elif len(fields) == 1:
+                private_keys.append(fields[0])
+        # 导出格式同时带有公钥时与私钥一起校验
+        if len(private_keys) == 1 and len(labeled) == 2:
+            keypairs.insert(0, (int(private_keys.pop(), 16), labeled['公钥X'], labeled['公钥Y']))
+        # 先校验全部密钥对，文件中任何一个不匹配时不导入任何条目
+        if keypairs:
+            self.check_keypairs(keypairs)
+        fingerprints = [self.add_private_key(key, label) for key in private_keys]
+        if keypairs:
+            self.add_keypairs(keypairs, label, check=False)
+            fingerprints.extend(SM2PublicKey(Px, Py).fingerprint() for _, Px, Py in keypairs)
+        return fingerprints
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
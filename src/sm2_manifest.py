@@ -0,0 +1,323 @@
+"""SM2 Merkle清单签名
+对整个目录只做一次SM2签名：
+1. 每个文件计算SM3摘要，叶子节点 leaf = SM3(0x00 || 路径长度(u16) || 路径 || 文件大小(u64) || 文件摘要)
+2. 叶子按路径排序后两两合并，内部节点 node = SM3(0x01 || 左 || 右)，奇数个时最后一个节点直接进入上一层
+3. 用SM2.sign对32字节的根签名
+清单(JSON)记录所有文件的路径、大小、摘要以及根、签名和公钥；
+单个文件的包含证明只包含从叶子到根路径上的兄弟节点，不需要整个清单即可验证该文件。
+
+文件摘要缓存在SQLite中，以(相对路径, 大小, mtime, inode)为键，重新生成清单时只对变化的文件重新计算摘要。
+"""
+import json
+import os
+import sqlite3
+import struct
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from sm2_core import SM2, SM2PublicKey
+from sm2_pipeline import VerifyResult, iter_file_stats
+from sm3_core import sm3_file, sm3_hash
+
+MANIFEST_VERSION = 1
+# 每个进程任务计算摘要的文件数
+DIGEST_BATCH_SIZE = 32
+
+_LEAF_PREFIX = b'\x00'
+_NODE_PREFIX = b'\x01'
+
+
+# ---- Merkle树 ----
+
+def leaf_hash(relpath, size, digest):
+    path = relpath.encode('utf-8')
+    return sm3_hash(_LEAF_PREFIX + struct.pack('>H', len(path)) + path + struct.pack('>Q', size) + digest)
+
+
+def node_hash(left, right):
+    return sm3_hash(_NODE_PREFIX + left + right)
+
+
+def merkle_levels(leaves):
+    """从叶子开始逐层计算，返回所有层，最后一层只有根；没有叶子时根为32字节0"""
+    if not leaves:
+        return [[bytes(32)]]
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parent = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) & 1:
+            parent.append(level[-1])
+        levels.append(parent)
+    return levels
+
+
+def inclusion_proof(levels, index):
+    """第index个叶子的包含证明：[(兄弟节点在左侧, 兄弟节点)]，从叶子一层开始"""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append((sibling < index, level[sibling]))
+        index >>= 1
+    return proof
+
+
+def root_from_proof(leaf, proof):
+    node = leaf
+    for is_left, sibling in proof:
+        node = node_hash(sibling, node) if is_left else node_hash(node, sibling)
+    return node
+
+
+# ---- 摘要缓存 ----
+
+class DigestCache:
+    """文件SM3摘要的持久化缓存，键为(相对路径, 大小, mtime_ns, inode)，任何一项变化都视为未命中"""
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(str(path))
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS digests ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, inode INTEGER, digest BLOB)")
+
+    def get(self, relpath, st):
+        row = self._conn.execute(
+            "SELECT digest FROM digests WHERE path = ? AND size = ? AND mtime = ? AND inode = ?",
+            (relpath, st.st_size, st.st_mtime_ns, st.st_ino)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put_many(self, rows):
+        """rows为[(相对路径, os.stat结果, 摘要)]"""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO digests(path, size, mtime, inode, digest) VALUES (?, ?, ?, ?, ?)",
+                [(relpath, st.st_size, st.st_mtime_ns, st.st_ino, digest) for relpath, st, digest in rows])
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _digest_files(paths):
+    """工作进程入口：计算一批文件的SM3摘要，返回[(摘要, 耗时)]；文件无法读取时摘要为None"""
+    results = []
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            digest = sm3_file(path)
+        except OSError:
+            digest = None
+        results.append((digest, time.perf_counter() - start))
+    return results
+
+
+def iter_file_digests(root, cache=None, processes=None, batch_size=DIGEST_BATCH_SIZE, exclude=()):
+    """逐个产出(相对路径, os.stat结果, 摘要, 计算耗时)，顺序与目录遍历顺序一致
+    命中cache的文件不再读取，耗时为0；未命中的文件分批交给进程池计算，在途批次数有上限；
+    遍历之后被删除或无法读取的文件摘要为None
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+    pending = deque()   # ([(相对路径, stat, 已知摘要或None)], future或None)
+    batch = []
+
+    def submit():
+        nonlocal batch
+        paths = [os.path.join(root, relpath) for relpath, _, digest in batch if digest is None]
+        if pool is None or not paths:
+            future = _digest_files(paths) if paths else []
+        else:
+            future = pool.submit(_digest_files, paths)
+        pending.append((batch, future))
+        batch = []
+
+    def drain():
+        entries, future = pending.popleft()
+        digests = iter(future if isinstance(future, list) else future.result())
+        computed = []
+        for relpath, st, digest in entries:
+            elapsed = 0.0
+            if digest is None:
+                digest, elapsed = next(digests)
+                if digest is not None:
+                    computed.append((relpath, st, digest))
+            yield relpath, st, digest, elapsed
+        if cache is not None and computed:
+            cache.put_many(computed)
+
+    try:
+        for _, relpath, st in iter_file_stats(root, exclude):
+            digest = cache.get(relpath, st) if cache is not None else None
+            batch.append((relpath, st, digest))
+            if len(batch) >= batch_size:
+                submit()
+                while len(pending) > processes * 2:
+                    yield from drain()
+        if batch:
+            submit()
+        while pending:
+            yield from drain()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+# ---- 清单 ----
+
+class Manifest:
+    """已签名的Merkle清单
+    entries为按路径排序的[(相对路径, 大小, 摘要)]，root为Merkle根，signature为对根的签名(r, s)
+    """
+
+    def __init__(self, entries, signature, public_key, created=None):
+        self.entries = entries
+        self.signature = signature
+        self.public_key = public_key
+        self.created = int(time.time()) if created is None else created
+        self._levels = None
+        self._index = None
+
+    @property
+    def levels(self):
+        levels = self._levels
+        if levels is None:
+            levels = self._levels = merkle_levels([leaf_hash(*entry) for entry in self.entries])
+        return levels
+
+    @property
+    def root(self):
+        return self.levels[-1][0]
+
+    def find(self, relpath):
+        """按路径查找条目序号，不存在时返回-1"""
+        if self._index is None:
+            self._index = {entry[0]: i for i, entry in enumerate(self.entries)}
+        return self._index.get(relpath, -1)
+
+    def verify_root(self, sm2=None):
+        """验证清单根的签名"""
+        sm2 = sm2 or SM2(load_key=False)
+        return sm2.verify(self.root, self.signature, self.public_key)
+
+    def proof(self, relpath):
+        """单个文件的包含证明（dict，可直接保存为JSON）"""
+        i = self.find(relpath)
+        if i < 0:
+            raise KeyError(relpath)
+        _, size, digest = self.entries[i]
+        return {
+            'version': MANIFEST_VERSION,
+            'path': relpath,
+            'size': size,
+            'digest': digest.hex(),
+            'proof': [['L' if is_left else 'R', node.hex()] for is_left, node in inclusion_proof(self.levels, i)],
+            'root': self.root.hex(),
+            'signature': ['%064X' % self.signature[0], '%064X' % self.signature[1]],
+            'public_key': self.public_key.to_hex(),
+        }
+
+    def to_dict(self):
+        return {
+            'version': MANIFEST_VERSION,
+            'created': self.created,
+            'root': self.root.hex(),
+            'signature': ['%064X' % self.signature[0], '%064X' % self.signature[1]],
+            'public_key': self.public_key.to_hex(),
+            'fingerprint': self.public_key.fingerprint().hex(),
+            'files': [{'path': path, 'size': size, 'digest': digest.hex()} for path, size, digest in self.entries],
+        }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        """读取清单，并确认文件列表计算出的根与清单中记录的根一致"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != MANIFEST_VERSION:
+            raise ValueError("不支持的清单版本")
+        entries = [(item['path'], item['size'], bytes.fromhex(item['digest'])) for item in data['files']]
+        manifest = cls(entries, tuple(int(v, 16) for v in data['signature']),
+                       SM2PublicKey.from_hex(data['public_key']), data.get('created'))
+        if manifest.root.hex() != data['root']:
+            raise ValueError("清单内容与根不一致")
+        return manifest
+
+
+def build_manifest(root, private_key, cache=None, processes=None, exclude=(), sm2=None):
+    """对root下的所有文件生成并签名Merkle清单；private_key为SM2PrivateKey，cache为DigestCache"""
+    sm2 = sm2 or SM2(load_key=False)
+    entries = [(relpath, st.st_size, digest)
+               for relpath, st, digest, _ in iter_file_digests(root, cache, processes, exclude=exclude)
+               if digest is not None]
+    entries.sort()
+    manifest = Manifest(entries, None, private_key.public_key)
+    manifest.signature = sm2.sign(manifest.root, private_key=private_key)
+    return manifest
+
+
+def verify_proof(file_path, proof, sm2=None, public_key=None):
+    """用包含证明验证单个文件：重新计算文件摘要和叶子，沿证明折叠到根，再用public_key验证根的签名
+    public_key为可信的公钥（SM2PublicKey），必须指定：证明中记录的公钥任何人都可以伪造，只能用于与之比对
+    """
+    if public_key is None:
+        raise ValueError("验证包含证明必须指定可信的公钥")
+    try:
+        if public_key != SM2PublicKey.from_hex(proof['public_key']):
+            return False
+    except ValueError:
+        return False
+    digest = sm3_file(file_path)
+    if digest.hex() != proof['digest'] or os.path.getsize(file_path) != proof['size']:
+        return False
+    path = [(side == 'L', bytes.fromhex(node)) for side, node in proof['proof']]
+    root = root_from_proof(leaf_hash(proof['path'], proof['size'], digest), path)
+    if root.hex() != proof['root']:
+        return False
+    sm2 = sm2 or SM2(load_key=False)
+    return sm2.verify(root, tuple(int(v, 16) for v in proof['signature']), public_key)
+
+
+def iter_verify_manifest(manifest, input_dir, processes=None, sm2=None):
+    """按清单验证input_dir下的文件，逐个产出VerifyResult
+    清单根的签名无效时所有条目都失败；不在清单中的文件同样视为失败。
+    摘要计算分批交给进程池，不使用摘要缓存，确保每个文件都被重新读取
+    """
+    root_ok = manifest.verify_root(sm2)
+    seen = set()
+    for relpath, st, digest, elapsed in iter_file_digests(input_dir, None, processes):
+        i = manifest.find(relpath)
+        if i < 0:
+            yield VerifyResult(relpath, False, '文件不在清单中', st.st_size, elapsed)
+            continue
+        seen.add(i)
+        _, size, expected = manifest.entries[i]
+        if not root_ok:
+            yield VerifyResult(relpath, False, '清单签名无效', st.st_size, elapsed)
+        elif digest is None:
+            yield VerifyResult(relpath, False, '原始文件无法读取', size)
+        elif st.st_size != size or digest != expected:
+            yield VerifyResult(relpath, False, '文件摘要与清单不一致', st.st_size, elapsed)
+        else:
+            yield VerifyResult(relpath, True, None, size, elapsed)
+    for i, (relpath, size, _) in enumerate(manifest.entries):
+        if i not in seen:
+            yield VerifyResult(relpath, False, '原始文件不存在', size)
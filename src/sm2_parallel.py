@@ -0,0 +1,252 @@
+"""SM2批量并行运算
+通过进程池把大量验签任务分摊到多个CPU核心：
+- 任务按公钥分组，同一公钥的任务整批交给同一个工作进程，复用进程内SM2实例的公钥预计算缓存
+- 文件只传递路径，由工作进程自行mmap读取；较大的内存数据放入共享内存，只传递共享内存名称
+- 输入按窗口分批读取和提交，内存占用与输入总量无关
+批量生成密钥对同样分批交给工作进程，结果按顺序流式写入文件
+"""
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from multiprocessing import resource_tracker, shared_memory
+
+from sm2_core import SM2, SM2PublicKey
+
+# 超过该大小的bytes消息通过共享内存传给工作进程，而不是pickle整个消息
+SHARED_MEMORY_THRESHOLD = 1 << 20
+# 每个任务批次包含的验签条目数
+BATCH_SIZE = 64
+# 每次从输入中读取并按公钥分组的条目数
+GROUP_WINDOW = BATCH_SIZE * 16
+
+# 工作进程内复用的SM2实例
+_worker_sm2 = None
+
+
+def _init_worker():
+    global _worker_sm2
+    _worker_sm2 = SM2(load_key=False)
+
+
+def _get_worker_sm2():
+    global _worker_sm2
+    if _worker_sm2 is None:
+        _worker_sm2 = SM2(load_key=False)
+    return _worker_sm2
+
+
+def parse_public_key(public_key):
+    """公钥可以是SM2PublicKey、(Px, Py)整数/十六进制元组，或128位十六进制字符串(x || y)"""
+    if isinstance(public_key, SM2PublicKey):
+        return public_key.point
+    if isinstance(public_key, str):
+        key_hex = public_key.strip()
+        if key_hex[:2] in ('04', '0x') and len(key_hex) == 130:
+            key_hex = key_hex[2:]
+        if len(key_hex) != 128:
+            raise ValueError("公钥格式无效")
+        return int(key_hex[:64], 16), int(key_hex[64:], 16)
+    Px, Py = public_key
+    if isinstance(Px, str):
+        Px = int(Px, 16)
+    if isinstance(Py, str):
+        Py = int(Py, 16)
+    return Px, Py
+
+
+def _verify_job(sm2, Px, Py, job):
+    index, kind, payload, signature, user_id = job
+    try:
+        if kind == 'path':
+            return index, sm2.verify_file(payload, signature, Px, Py, user_id)
+        if kind == 'shm':
+            name, size = payload
+            shm = shared_memory.SharedMemory(name=name)
+            try:
+                view = shm.buf[:size]
+                try:
+                    return index, sm2.verify(view, signature, Px, Py, user_id)
+                finally:
+                    view.release()
+            finally:
+                shm.close()
+        return index, sm2.verify(payload, signature, Px, Py, user_id)
+    except Exception:
+        # 文件不存在、签名格式错误等情况一律视为验证失败
+        return index, False
+
+
+def _verify_batch(Px, Py, jobs):
+    """工作进程入口：用同一个公钥依次验证一批条目，返回[(index, 结果)]"""
+    sm2 = _get_worker_sm2()
+    return [_verify_job(sm2, Px, Py, job) for job in jobs]
+
+
+def _make_job(index, item):
+    message, signature, public_key = item[0], item[1], item[2]
+    user_id = item[3] if len(item) > 3 and item[3] is not None else SM2.DEFAULT_USER_ID
+    if isinstance(message, os.PathLike):
+        kind, payload = 'path', os.fspath(message)
+    elif isinstance(message, str):
+        kind, payload = 'path', message
+    elif len(message) >= SHARED_MEMORY_THRESHOLD:
+        # 较大的消息先不复制，提交批次时再放入共享内存
+        kind, payload = 'bytes', message
+    else:
+        kind, payload = 'bytes', bytes(message)
+    return parse_public_key(public_key), (index, kind, payload, signature, user_id)
+
+
+def _iter_batches(items):
+    """每次从items中读取GROUP_WINDOW条，窗口内按公钥分组，逐批产出(Px, Py, jobs)"""
+    items = enumerate(items)
+    while True:
+        groups = {}
+        for index, item in islice(items, GROUP_WINDOW):
+            key, job = _make_job(index, item)
+            groups.setdefault(key, []).append(job)
+        if not groups:
+            return
+        for (Px, Py), jobs in groups.items():
+            for i in range(0, len(jobs), BATCH_SIZE):
+                yield Px, Py, jobs[i:i + BATCH_SIZE]
+
+
+def _share_jobs(jobs):
+    """把批次中的大消息复制到共享内存，返回(新的jobs, 共享内存列表)"""
+    shared = []
+    try:
+        result = []
+        for index, kind, payload, signature, user_id in jobs:
+            if kind == 'bytes' and len(payload) >= SHARED_MEMORY_THRESHOLD:
+                shm = shared_memory.SharedMemory(create=True, size=len(payload))
+                shared.append(shm)
+                shm.buf[:len(payload)] = payload
+                kind, payload = 'shm', (shm.name, len(payload))
+            result.append((index, kind, payload, signature, user_id))
+        return result, shared
+    except BaseException:
+        _release(shared)
+        raise
+
+
+def _release(shared):
+    for shm in shared:
+        shm.close()
+        shm.unlink()
+
+
+def iter_verify_many(items, processes=None, sm2=None):
+    """并行验签，按完成顺序逐个产出(index, 结果)，index为条目在输入中的位置
+    items中每一项为(消息或文件路径, (r, s), 公钥[, user_id])；str/PathLike视为文件路径
+    items按GROUP_WINDOW条分窗口读取，在途批次数不超过进程数的2倍，共享内存随批次创建和释放，
+    因此items可以是生成器，第一批结果不必等全部输入读完
+    processes为1时在当前进程内直接验证，不创建进程池
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes <= 1:
+        sm2 = sm2 or _get_worker_sm2()
+        for Px, Py, jobs in _iter_batches(items):
+            for job in jobs:
+                yield _verify_job(sm2, Px, Py, job)
+        return
+
+    max_in_flight = processes * 2
+    pending = {}    # future -> 该批次的共享内存
+
+    def drain():
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            _release(pending.pop(future))
+            yield from future.result()
+
+    if os.name == 'posix':
+        # 共享内存在提交时才创建，工作进程可能先于资源跟踪进程启动；
+        # 先在父进程中启动资源跟踪进程，工作进程继承它，而不是各自启动一个并在退出时误报泄漏
+        resource_tracker.ensure_running()
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+            for Px, Py, jobs in _iter_batches(items):
+                while len(pending) >= max_in_flight:
+                    yield from drain()
+                jobs, shared = _share_jobs(jobs)
+                try:
+                    future = pool.submit(_verify_batch, Px, Py, jobs)
+                except BaseException:
+                    _release(shared)
+                    raise
+                pending[future] = shared
+            while pending:
+                yield from drain()
+    finally:
+        for shared in pending.values():
+            _release(shared)
+
+
+def verify_many(items, processes=None, ordered=True, sm2=None):
+    """并行验签
+    ordered为True时返回与输入顺序一致的结果列表；
+    为False时返回迭代器，按完成顺序产出(index, 结果)
+    """
+    results = iter_verify_many(items, processes, sm2)
+    if not ordered:
+        return results
+    collected = {}
+    for index, ok in results:
+        collected[index] = ok
+    return [collected[i] for i in range(len(collected))]
+
+
+def format_keypair(d, Px, Py):
+    """密钥对文件中的一行：私钥 公钥X 公钥Y（均为64位十六进制）"""
+    return '%064X %064X %064X\n' % (d, Px, Py)
+
+
+def _generate_keypair_batch(count):
+    """工作进程入口：生成count个密钥对，返回[(d, Px, Py)]"""
+    return list(_get_worker_sm2().generate_keypairs(count, batch_size=count))
+
+
+def iter_keypair_batches(count, processes=None, batch_size=1024):
+    """批量生成count个密钥对，按顺序逐批产出[(d, Px, Py)]
+    生成任务按batch_size分批分发到进程池，同时在途的批次数有上限，内存占用与count无关
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    batches = [batch_size] * (count // batch_size)
+    if count % batch_size:
+        batches.append(count % batch_size)
+
+    if processes <= 1:
+        for size in batches:
+            yield _generate_keypair_batch(size)
+        return
+
+    max_in_flight = processes * 2
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+        pending = deque()
+        for size in batches:
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+            pending.append(pool.submit(_generate_keypair_batch, size))
+        while pending:
+            yield pending.popleft().result()
+
+
+def generate_keypairs_to_file(path, count, processes=None, batch_size=1024):
+    """批量生成count个密钥对并写入path，每行一个密钥对，边生成边写入。返回写入的密钥对数量"""
+    with open(path, 'w') as f:
+        for batch in iter_keypair_batches(count, processes, batch_size):
+            f.write(''.join(format_keypair(d, Px, Py) for d, Px, Py in batch))
+    return count
+
+
+def generate_keypairs_to_keystore(store, count, processes=None, batch_size=1024, label=None):
+    """批量生成count个密钥对并逐批保存到密钥库(sm2_keystore.KeyStore)。返回保存的密钥对数量"""
+    saved = 0
+    for batch in iter_keypair_batches(count, processes, batch_size):
+        # 工作进程刚刚由[d]G算出的公钥，不必再校验一次
+        saved += store.add_keypairs(batch, label, chunk_size=len(batch), check=False)
+    return saved
@@ -0,0 +1,333 @@
+"""目录树批量签名/验签流水线
+签名：遍历目录 -> I/O线程池读取文件 -> 进程池计算H(ZA || M)和签名 -> 写出签名记录
+验签：遍历签名目录或签名包 -> 按原始文件索引配对 -> 进程池验签 -> 逐条产出结果
+- 遍历是惰性的（os.scandir），各阶段之间的在途任务数都有上限，上游在下游积压时阻塞等待，
+  内存占用只取决于队列长度，与文件总数无关
+- SM3是纯Python实现，杂凑本身受GIL限制，在线程中计算无法利用多核（实测比签名的点运算更耗时），
+  因此线程池只负责读取小文件，让文件I/O与计算重叠；杂凑和签名都在签名进程中完成。
+  超过large_file_threshold的大文件不经过线程池，只把路径交给签名进程，由进程自行mmap读取
+- 单进程模式(processes <= 1)下杂凑和签名都在当前进程完成
+- 输出为sm2_sigfile中的二进制签名记录，保持与输入目录相同的相对路径，或写入一个签名包
+"""
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from sm2_core import SM2, SM2PrivateKey
+from sm2_sigfile import SignatureBundle, SignatureBundleWriter, SignatureRecord, read_signature, write_signature
+from sm3_core import SM3, update_from_file
+
+# 每个签名进程任务包含的文件数
+SIGN_BATCH_SIZE = 64
+# 超过该大小的文件不由线程池读取，签名进程直接按路径读取
+LARGE_FILE_THRESHOLD = 64 << 10
+SIGNATURE_SUFFIX = '.sig'
+
+# 签名进程内的SM2实例、私钥和ZA
+_worker_state = None
+# 验签进程内复用的SM2实例
+_verify_sm2 = None
+
+
+def _init_sign_worker(d, ZA):
+    global _worker_state
+    sm2 = SM2(load_key=False)
+    _worker_state = (sm2, SM2PrivateKey(d, sm2), ZA)
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _sign_batch(items):
+    """签名进程入口：items中每项为('data', 文件内容)或('path', 路径)，返回[(r, s)或错误信息]"""
+    sm2, private_key, ZA = _worker_state
+    results = []
+    for kind, value in items:
+        try:
+            hasher = SM3(ZA)
+            if kind == 'data':
+                hasher.update(value)
+            else:
+                update_from_file(hasher, value, SM2.STREAM_CHUNK_SIZE)
+            results.append(sm2._sign_hash(int.from_bytes(hasher.digest(), 'big'), private_key))
+        except Exception as exc:
+            results.append(str(exc))
+    return results
+
+
+def iter_file_stats(root, exclude=()):
+    """递归遍历root，逐个产出(路径, 相对路径, os.stat结果)；相对路径统一使用'/'分隔
+    exclude中的目录（例如位于root之内的输出目录）不进入
+    """
+    excluded = {os.path.realpath(path) for path in exclude}
+    stack = [(root, '')]
+    while stack:
+        directory, prefix = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not excluded or os.path.realpath(entry.path) not in excluded:
+                        stack.append((entry.path, prefix + entry.name + '/'))
+                elif entry.is_file():
+                    yield entry.path, prefix + entry.name, entry.stat()
+
+
+def iter_files(root, exclude=()):
+    """递归遍历root，逐个产出(路径, 相对路径, 文件大小)"""
+    for path, relpath, st in iter_file_stats(root, exclude):
+        yield path, relpath, st.st_size
+
+
+class PipelineStats:
+    """流水线统计：处理的文件数、字节数、失败数和耗时"""
+    __slots__ = ('files', 'bytes', 'failed', 'elapsed')
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    @property
+    def files_per_second(self):
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mb_per_second(self):
+        return self.bytes / self.elapsed / (1 << 20) if self.elapsed else 0.0
+
+
+def sign_tree(root, private_key, output_dir=None, bundle_path=None, user_id=SM2.DEFAULT_USER_ID,
+              io_threads=4, processes=None, batch_size=SIGN_BATCH_SIZE, queue_size=256,
+              large_file_threshold=LARGE_FILE_THRESHOLD, on_error=None):
+    """对root下的所有文件签名，返回PipelineStats
+    private_key为SM2PrivateKey或私钥整数；结果写入output_dir下与输入相同的相对路径（加.sig后缀），
+    指定bundle_path时改为写入一个签名包。on_error(相对路径, 错误信息)在单个文件失败时调用
+    queue_size为读取阶段在途文件数上限，签名阶段在途批次数上限为进程数的2倍
+    """
+    if (output_dir is None) == (bundle_path is None):
+        raise ValueError("output_dir和bundle_path必须且只能指定一个")
+    if processes is None:
+        processes = os.cpu_count() or 1
+    sm2 = SM2(load_key=False)
+    private_key = sm2._signing_key(private_key)
+    ZA = sm2._signer_ZA(user_id, None, private_key)
+    fingerprint = private_key.public_key.fingerprint()
+
+    stats = PipelineStats()
+    start = time.perf_counter()
+    bundle = SignatureBundleWriter(bundle_path) if bundle_path is not None else None
+    created_dirs = set()
+
+    def write(relpath, size, result):
+        if isinstance(result, str):
+            stats.failed += 1
+            if on_error is not None:
+                on_error(relpath, result)
+            return
+        record = SignatureRecord(result[0], result[1], fingerprint, size)
+        if bundle is not None:
+            bundle.add(relpath, record)
+        else:
+            target = os.path.join(output_dir, relpath + SIGNATURE_SUFFIX)
+            directory = os.path.dirname(target)
+            if directory not in created_dirs:
+                os.makedirs(directory, exist_ok=True)
+                created_dirs.add(directory)
+            write_signature(target, record)
+        stats.files += 1
+        stats.bytes += size
+
+    if processes <= 1:
+        _init_sign_worker(private_key.d, ZA)
+        sign_pool = None
+    else:
+        sign_pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_sign_worker,
+                                        initargs=(private_key.d, ZA))
+    try:
+        with ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix='sm2-read') as read_pool:
+            reading = deque()   # (相对路径, 大小, 读取文件的future或None)
+            signing = deque()   # ([(相对路径, 大小)], future或结果列表)
+            batch_meta, batch_items = [], []
+
+            def submit_batch():
+                nonlocal batch_meta, batch_items
+                if not batch_items:
+                    return
+                if sign_pool is None:
+                    signing.append((batch_meta, _sign_batch(batch_items)))
+                else:
+                    signing.append((batch_meta, sign_pool.submit(_sign_batch, batch_items)))
+                batch_meta, batch_items = [], []
+                while len(signing) > processes * 2 or (sign_pool is None and signing):
+                    drain_signing()
+
+            def drain_signing():
+                meta, results = signing.popleft()
+                if sign_pool is not None:
+                    results = results.result()
+                for (relpath, size), result in zip(meta, results):
+                    write(relpath, size, result)
+
+            def drain_reading():
+                relpath, size, future = reading.popleft()
+                if future is None:
+                    item = ('path', os.path.join(root, relpath))
+                else:
+                    try:
+                        item = ('data', future.result())
+                    except Exception as exc:
+                        write(relpath, size, str(exc))
+                        return
+                batch_meta.append((relpath, size))
+                batch_items.append(item)
+                if len(batch_items) >= batch_size:
+                    submit_batch()
+
+            exclude = [output_dir] if output_dir is not None else []
+            bundle_abspath = os.path.abspath(bundle_path) if bundle_path is not None else None
+            for path, relpath, size in iter_files(root, exclude):
+                if bundle_abspath is not None and os.path.abspath(path) == bundle_abspath:
+                    continue
+                if size > large_file_threshold:
+                    reading.append((relpath, size, None))
+                else:
+                    reading.append((relpath, size, read_pool.submit(_read_file, path)))
+                if len(reading) >= queue_size:
+                    drain_reading()
+            while reading:
+                drain_reading()
+            submit_batch()
+            while signing:
+                drain_signing()
+    finally:
+        if sign_pool is not None:
+            sign_pool.shutdown()
+        if bundle is not None:
+            bundle.close()
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+class VerifyResult:
+    """单个文件的验签结果；error为失败原因，elapsed为该文件验签耗时（秒）"""
+    __slots__ = ('path', 'ok', 'error', 'size', 'elapsed')
+
+    def __init__(self, path, ok, error=None, size=0, elapsed=0.0):
+        self.path = path
+        self.ok = ok
+        self.error = error
+        self.size = size
+        self.elapsed = elapsed
+
+    def to_dict(self):
+        return {'path': self.path, 'ok': self.ok, 'error': self.error,
+                'size': self.size, 'elapsed_ms': round(self.elapsed * 1000, 3)}
+
+
+def _verify_items(items):
+    """验签进程入口：items中每项为(文件路径, (r, s), (Px, Py))，返回[(结果, 错误信息, 耗时)]"""
+    global _verify_sm2
+    if _verify_sm2 is None:
+        _verify_sm2 = SM2(load_key=False)
+    sm2 = _verify_sm2
+    results = []
+    for path, signature, point in items:
+        start = time.perf_counter()
+        try:
+            ok = sm2.verify_file(path, signature, point[0], point[1])
+            error = None if ok else '签名无效'
+        except Exception as exc:
+            ok, error = False, str(exc)
+        results.append((ok, error, time.perf_counter() - start))
+    return results
+
+
+def iter_signatures(source):
+    """逐个产出(相对路径, SignatureRecord, 公钥或None)
+    source为签名目录（每个文件对应一个.sig，兼容旧版文本格式）或签名包文件
+    """
+    if os.path.isfile(source):
+        with SignatureBundle(source) as bundle:
+            for name, record in bundle:
+                yield name, record, None
+        return
+    for path, relpath, _ in iter_files(source):
+        if not relpath.endswith(SIGNATURE_SUFFIX):
+            continue
+        try:
+            record, public_key, _ = read_signature(path)
+        except (OSError, ValueError):
+            yield relpath[:-len(SIGNATURE_SUFFIX)], None, None
+            continue
+        yield relpath[:-len(SIGNATURE_SUFFIX)], record, public_key
+
+
+def iter_verify_tree(source, input_dir, resolve_key, processes=None, batch_size=SIGN_BATCH_SIZE):
+    """批量验签，按签名的遍历顺序逐个产出VerifyResult
+    先遍历一次input_dir建立 相对路径 -> 文件大小 的索引，签名与原始文件的配对直接查索引；
+    resolve_key(指纹)返回SM2PublicKey或None，所有签名的公钥都经它查找，旧版文本.sig中附带的公钥只用于计算指纹。
+    文件缺失、大小与签名记录不一致、公钥未知的条目不进入进程池，直接产出失败结果
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    index = {relpath: size for _, relpath, size in iter_files(input_dir)}
+    pool = ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+    pending = deque()   # 按顺序排列的 已确定的VerifyResult 或 (元数据列表, future或结果列表)
+    batch_meta, batch_items = [], []
+
+    def submit_batch():
+        nonlocal batch_meta, batch_items
+        if batch_items:
+            if pool is None:
+                pending.append((batch_meta, _verify_items(batch_items)))
+            else:
+                pending.append((batch_meta, pool.submit(_verify_items, batch_items)))
+            batch_meta, batch_items = [], []
+
+    def drain():
+        entry = pending.popleft()
+        if isinstance(entry, VerifyResult):
+            yield entry
+            return
+        meta, results = entry
+        if pool is not None:
+            results = results.result()
+        for (relpath, size), (ok, error, elapsed) in zip(meta, results):
+            yield VerifyResult(relpath, ok, error, size, elapsed)
+
+    try:
+        for relpath, record, _ in iter_signatures(source):
+            size = index.get(relpath)
+            result = None
+            if record is None:
+                result = VerifyResult(relpath, False, '签名文件格式无效')
+            elif size is None:
+                result = VerifyResult(relpath, False, '原始文件不存在')
+            elif record.size and record.size != size:
+                result = VerifyResult(relpath, False, '文件大小与签名记录不一致', size)
+            else:
+                # 旧版文本.sig自带的公钥不可信，与二进制记录一样只按指纹从密钥库查找
+                public_key = resolve_key(record.fingerprint) if record.fingerprint is not None else None
+                if public_key is None:
+                    result = VerifyResult(relpath, False, '未知的公钥指纹', size)
+            if result is not None:
+                # 已确定的结果也按顺序排队，保证输出顺序与签名的遍历顺序一致
+                submit_batch()
+                pending.append(result)
+            else:
+                batch_meta.append((relpath, size))
+                batch_items.append((os.path.join(input_dir, relpath), record.signature, public_key.point))
+                if len(batch_items) >= batch_size:
+                    submit_batch()
+            while len(pending) > processes * 2 or (pool is None and pending):
+                yield from drain()
+        submit_batch()
+        while pending:
+            yield from drain()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
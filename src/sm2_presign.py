@@ -0,0 +1,141 @@
+"""SM2预签名池
+签名中最耗时的[k]G与消息无关，可以提前计算。预签名池在后台线程中预先生成(k, x1)对，
+签名时直接取用，热路径上只剩杂凑和几次模运算。
+k必须保密且只能使用一次：k使用密码学安全随机数生成；fork出的子进程会丢弃继承来的(k, x1)，
+否则父子进程可能用同一个k签名，从而泄露私钥。
+"""
+import os
+import secrets
+import threading
+import weakref
+from collections import deque
+
+# 所有预签名池，fork后在子进程中逐个重置
+_pools = weakref.WeakSet()
+
+
+def _reset_pools_after_fork():
+    for pool in list(_pools):
+        pool._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+class PresignaturePool:
+    """线程安全的(k, x1)预签名池
+    - 后台线程保持池中有size个可用的(k, x1)，数量低于low_watermark时开始补充
+    - 每个(k, x1)只会被取出一次，取出后立即从池中移除
+    - 池为空时take()在调用线程中直接计算，不会阻塞签名
+    """
+
+    def __init__(self, sm2, size=64, low_watermark=None, batch_size=8, start=True):
+        if size < 1:
+            raise ValueError("预签名池容量必须大于0")
+        self.sm2 = sm2
+        self.size = size
+        self.low_watermark = size // 2 if low_watermark is None else low_watermark
+        if not 0 <= self.low_watermark < size:
+            raise ValueError("低水位线必须在[0, size)范围内")
+        self.batch_size = batch_size
+        self.produced = 0
+        self.consumed = 0
+        self.misses = 0
+        self._ready = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+        _pools.add(self)
+        if start:
+            self.start()
+
+    def _generate(self, count):
+        """生成count个(k, x1)，k ∈ [1, n-1]"""
+        sm2 = self.sm2
+        ks = [secrets.randbelow(sm2.n - 1) + 1 for _ in range(count)]
+        # 整批[k]G共用一次求逆转换为仿射坐标
+        return [(k, point[0]) for k, point in zip(ks, sm2.base_multiply_many(ks))]
+
+    def _run(self):
+        filling = True
+        while True:
+            with self._cond:
+                if len(self._ready) >= self.size:
+                    filling = False
+                # 补满后进入等待，直到数量降到低水位线才重新开始补充
+                while not self._stopped and not filling and len(self._ready) > self.low_watermark:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                filling = True
+                need = min(self.size - len(self._ready), self.batch_size)
+            # 计算在锁外进行，不影响其他线程取用
+            pairs = self._generate(need)
+            with self._cond:
+                self._ready.extend(pairs)
+                self.produced += len(pairs)
+                self._cond.notify_all()
+
+    def _reset_after_fork(self):
+        """子进程中调用：丢弃父进程的(k, x1)；后台线程不会随fork复制，按原状态重新启动"""
+        running = self._thread is not None and not self._stopped
+        self._ready = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        if running:
+            self.start()
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='sm2-presign', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def take(self):
+        """取出一个(k, x1)；池为空时在当前线程中直接计算"""
+        with self._cond:
+            if self._ready:
+                pair = self._ready.popleft()
+                self.consumed += 1
+                if len(self._ready) <= self.low_watermark:
+                    self._cond.notify_all()
+                return pair
+            self.misses += 1
+            self._cond.notify_all()
+        return self._generate(1)[0]
+
+    def fill_level(self):
+        """当前可用数量占容量的比例，0.0 ~ 1.0"""
+        with self._cond:
+            return len(self._ready) / self.size
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'ready': len(self._ready),
+                'produced': self.produced,
+                'consumed': self.consumed,
+                'misses': self.misses,
+            }
+
+    def __len__(self):
+        with self._cond:
+            return len(self._ready)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,368 @@
+"""SM2签名文件格式
+1. 单个签名记录：固定120字节的二进制记录
+       magic(4) | 版本(u8) | 标志(u8) | 保留(u16) | r(32) | s(32) | 公钥指纹(32) | 文件大小(u64) | 签名时间(u64)
+   公钥不再随签名重复保存，验证时按指纹从密钥库(sm2_keystore)查找
+2. 签名包：把大量签名记录打包到一个文件，并带有按名称排序的索引，可以随机访问
+       头部    magic(4) | 版本(u16) | 保留(u16) | 数量(u32) | 名称表偏移(u64) | 名称数据偏移(u64) | 索引偏移(u64)
+       记录区  数量 × 120字节，按写入顺序
+       名称表  数量 × (名称偏移u64, 名称长度u32)，与记录区一一对应
+       名称    UTF-8名称依次拼接
+       索引    数量 × 记录序号(u32)，按名称字节序排序，用于二分查找
+3. 兼容旧版文本.sig（"r: ..."、"公钥X: ..."等标签行，UTF-8或系统默认编码），并可转换为二进制记录
+整数均为小端；读取基于mmap和struct.unpack_from，不复制文件内容。
+另外提供r、s的DER编码(SEQUENCE { INTEGER r, INTEGER s })，便于与其他实现交换签名。
+"""
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+from pathlib import Path
+
+from sm2_core import SM2PublicKey
+from sm2_keystore import read_legacy_text
+
+RECORD_MAGIC = b'SM2S'
+BUNDLE_MAGIC = b'SM2B'
+FORMAT_VERSION = 1
+
+_RECORD = struct.Struct('<4sBBH32s32s32sQQ')
+RECORD_SIZE = _RECORD.size
+_BUNDLE_HEADER = struct.Struct('<4sHHIQQQ')
+_NAME_ENTRY = struct.Struct('<QI')
+_INDEX_ENTRY = struct.Struct('<I')
+_RUN_ENTRY = struct.Struct('<II')
+# 写签名包时内存中排序的名称数，超过后把已排序的一段写入临时文件
+INDEX_RUN_SIZE = 1 << 16
+
+_NO_FINGERPRINT = bytes(32)
+
+
+class SignatureRecord:
+    """一条签名记录；fingerprint为签名公钥的指纹(32字节)，未知时为None"""
+    __slots__ = ('r', 's', 'fingerprint', 'size', 'timestamp')
+
+    def __init__(self, r, s, fingerprint=None, size=0, timestamp=None):
+        self.r = r
+        self.s = s
+        self.fingerprint = fingerprint
+        self.size = size
+        self.timestamp = int(time.time()) if timestamp is None else timestamp
+
+    @property
+    def signature(self):
+        return (self.r, self.s)
+
+    def to_bytes(self):
+        return _RECORD.pack(RECORD_MAGIC, FORMAT_VERSION, 0, 0,
+                            self.r.to_bytes(32, 'big'), self.s.to_bytes(32, 'big'),
+                            self.fingerprint or _NO_FINGERPRINT, self.size, self.timestamp)
+
+    @classmethod
+    def from_bytes(cls, buf, offset=0):
+        """从buf（bytes、memoryview或mmap）的offset处解析一条记录"""
+        magic, version, _, _, r, s, fingerprint, size, timestamp = _RECORD.unpack_from(buf, offset)
+        if magic != RECORD_MAGIC or version != FORMAT_VERSION:
+            raise ValueError("签名记录格式无效")
+        return cls(int.from_bytes(r, 'big'), int.from_bytes(s, 'big'),
+                   None if fingerprint == _NO_FINGERPRINT else fingerprint, size, timestamp)
+
+    def to_der(self):
+        return encode_der_signature(self.r, self.s)
+
+    def __eq__(self, other):
+        if not isinstance(other, SignatureRecord):
+            return NotImplemented
+        return (self.r, self.s, self.fingerprint, self.size, self.timestamp) == \
+            (other.r, other.s, other.fingerprint, other.size, other.timestamp)
+
+    def __repr__(self):
+        return 'SignatureRecord(r=%064X, s=%064X, fingerprint=%s)' % (
+            self.r, self.s, self.fingerprint.hex() if self.fingerprint else None)
+
+
+# ---- DER ----
+
+def _der_length(length):
+    if length < 0x80:
+        return bytes([length])
+    body = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes([0x80 | len(body)]) + body
+
+
+def _der_integer(value):
+    body = value.to_bytes(value.bit_length() // 8 + 1, 'big')
+    return b'\x02' + _der_length(len(body)) + body
+
+
+def encode_der_signature(r, s):
+    body = _der_integer(r) + _der_integer(s)
+    return b'\x30' + _der_length(len(body)) + body
+
+
+def _read_der(data, offset, tag):
+    if data[offset] != tag:
+        raise ValueError("DER格式无效")
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        n = length & 0x7F
+        length = int.from_bytes(data[offset:offset + n], 'big')
+        offset += n
+    return offset, offset + length
+
+
+def decode_der_signature(data):
+    """解析DER编码的签名，返回(r, s)"""
+    start, end = _read_der(data, 0, 0x30)
+    if end != len(data):
+        raise ValueError("DER格式无效")
+    values = []
+    for _ in range(2):
+        value_start, start = _read_der(data, start, 0x02)
+        values.append(int.from_bytes(data[value_start:start], 'big'))
+    if start != end:
+        raise ValueError("DER格式无效")
+    return values[0], values[1]
+
+
+# ---- 单个签名文件 ----
+
+def write_signature(path, record):
+    with open(path, 'wb') as f:
+        f.write(record.to_bytes())
+
+
+def read_legacy_signature(path):
+    """读取旧版文本.sig，返回(SignatureRecord, SM2PublicKey, 原始文件名)
+    旧版GUI按系统默认编码写.sig，编码识别见sm2_keystore.read_legacy_text
+    """
+    fields = {}
+    for line in read_legacy_text(path).splitlines():
+        name, sep, value = line.partition(':')
+        if sep:
+            fields[name.strip()] = value.strip()
+    try:
+        public_key = SM2PublicKey(int(fields['公钥X'], 16), int(fields['公钥Y'], 16))
+        r, s = int(fields['r'], 16), int(fields['s'], 16)
+    except (KeyError, ValueError):
+        raise ValueError("签名文件格式无效")
+    size = int(fields.get('文件大小', '0').split()[0])
+    timestamp = 0
+    if '签名时间' in fields:
+        timestamp = int(time.mktime(time.strptime(fields['签名时间'], '%Y-%m-%d %H:%M:%S')))
+    record = SignatureRecord(r, s, public_key.fingerprint(), size, timestamp)
+    return record, public_key, fields.get('原始文件')
+
+
+def read_signature(path):
+    """读取签名文件，自动识别二进制记录和旧版文本格式
+    返回(SignatureRecord, 公钥, 原始文件名)；二进制记录不含公钥，公钥为None，
+    原始文件名取签名文件名去掉.sig后缀
+    """
+    with open(path, 'rb') as f:
+        head = f.read(RECORD_SIZE)
+    if head[:4] == RECORD_MAGIC:
+        name = Path(path).name
+        return SignatureRecord.from_bytes(head), None, name[:-4] if name.endswith('.sig') else None
+    return read_legacy_signature(path)
+
+
+def migrate_legacy_signature(path, output_path=None, keystore=None):
+    """把旧版文本.sig转换为二进制记录（默认原地覆盖），公钥保存到keystore中，返回SignatureRecord"""
+    record, public_key, _ = read_legacy_signature(path)
+    if keystore is not None:
+        keystore.add_public_key(public_key)
+    write_signature(output_path or path, record)
+    return record
+
+
+# ---- 签名包 ----
+
+class SignatureBundleWriter:
+    """按顺序写入签名包，记录边写边落盘，关闭时写入名称表和索引
+    名称和名称表先写入临时文件；索引按名称分段排序，每段最多run_size个名称，
+    写满一段即落盘，关闭时归并各段，内存占用与签名包大小无关。同名条目在关闭时报错
+    with SignatureBundleWriter(path) as writer:
+        writer.add('a.txt', record)
+    """
+
+    def __init__(self, path, run_size=INDEX_RUN_SIZE):
+        self.path = path
+        self.run_size = run_size
+        self._file = open(path, 'wb')
+        self._file.write(bytes(_BUNDLE_HEADER.size))
+        self._count = 0
+        self._names_size = 0
+        # 名称表中的偏移先相对于名称区起点，关闭时再加上名称区偏移
+        self._table = tempfile.TemporaryFile()
+        self._names = tempfile.TemporaryFile()
+        self._run = []
+        self._runs = []
+
+    def add(self, name, record):
+        encoded = name.encode('utf-8')
+        self._file.write(record.to_bytes())
+        self._table.write(_NAME_ENTRY.pack(self._names_size, len(encoded)))
+        self._names.write(encoded)
+        self._names_size += len(encoded)
+        self._run.append((encoded, self._count))
+        self._count += 1
+        if len(self._run) >= self.run_size:
+            self._spill()
+
+    def _spill(self):
+        """当前段排序后写入临时文件：序号(u32) | 名称长度(u32) | 名称"""
+        self._run.sort()
+        run = tempfile.TemporaryFile()
+        for encoded, i in self._run:
+            run.write(_RUN_ENTRY.pack(i, len(encoded)))
+            run.write(encoded)
+        run.seek(0)
+        self._runs.append(run)
+        self._run = []
+
+    @staticmethod
+    def _read_run(run):
+        while True:
+            head = run.read(_RUN_ENTRY.size)
+            if not head:
+                return
+            i, length = _RUN_ENTRY.unpack(head)
+            yield run.read(length), i
+
+    def _sorted_names(self):
+        if not self._runs:
+            self._run.sort()
+            return iter(self._run)
+        if self._run:
+            self._spill()
+        return heapq.merge(*map(self._read_run, self._runs))
+
+    def __len__(self):
+        return self._count
+
+    def _write_tables(self, f):
+        count = self._count
+        name_table_offset = _BUNDLE_HEADER.size + count * RECORD_SIZE
+        names_offset = name_table_offset + count * _NAME_ENTRY.size
+        self._table.seek(0)
+        while True:
+            chunk = self._table.read(_NAME_ENTRY.size * 4096)
+            if not chunk:
+                break
+            f.write(b''.join(_NAME_ENTRY.pack(names_offset + offset, length)
+                             for offset, length in _NAME_ENTRY.iter_unpack(chunk)))
+        self._names.seek(0)
+        shutil.copyfileobj(self._names, f)
+        index_offset = names_offset + self._names_size
+        index = []
+        previous = None
+        for encoded, i in self._sorted_names():
+            if encoded == previous:
+                raise ValueError(f"签名包中已有同名条目: {encoded.decode('utf-8')}")
+            previous = encoded
+            index.append(i)
+            if len(index) >= 4096:
+                f.write(struct.pack('<%dI' % len(index), *index))
+                index = []
+        f.write(struct.pack('<%dI' % len(index), *index))
+        f.seek(0)
+        f.write(_BUNDLE_HEADER.pack(BUNDLE_MAGIC, FORMAT_VERSION, 0, count,
+                                    name_table_offset, names_offset, index_offset))
+
+    def close(self):
+        """写入名称表和索引；有同名条目时删除未完成的签名包并抛出ValueError"""
+        if self._file is None:
+            return
+        f, self._file = self._file, None
+        try:
+            self._write_tables(f)
+        except BaseException:
+            f.close()
+            os.remove(self.path)
+            raise
+        finally:
+            for temp in [self._table, self._names, *self._runs]:
+                temp.close()
+            self._run = self._runs = []
+        f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SignatureBundle:
+    """只读签名包，mmap打开，按序号或名称随机访问，不整体加载"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self._count, self._name_table_offset,
+         self._names_offset, self._index_offset) = _BUNDLE_HEADER.unpack_from(self._mm, 0)
+        if magic != BUNDLE_MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError("签名包格式无效")
+
+    def __len__(self):
+        return self._count
+
+    def record(self, i):
+        """第i条签名记录"""
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return SignatureRecord.from_bytes(self._mm, _BUNDLE_HEADER.size + i * RECORD_SIZE)
+
+    def _name_bytes(self, i):
+        offset, length = _NAME_ENTRY.unpack_from(self._mm, self._name_table_offset + i * _NAME_ENTRY.size)
+        return self._mm[offset:offset + length]
+
+    def name(self, i):
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return self._name_bytes(i).decode('utf-8')
+
+    def __getitem__(self, i):
+        return self.name(i), self.record(i)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def find(self, name):
+        """按名称二分查找，返回记录序号，不存在时返回-1"""
+        target = name.encode('utf-8')
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = _INDEX_ENTRY.unpack_from(self._mm, self._index_offset + mid * _INDEX_ENTRY.size)[0]
+            current = self._name_bytes(i)
+            if current == target:
+                return i
+            if current < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return -1
+
+    def get(self, name, default=None):
+        i = self.find(name)
+        return default if i < 0 else self.record(i)
+
+    def __contains__(self, name):
+        return self.find(name) >= 0
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,108 @@
+"""SM2预计算表的持久化
+基点G的固定窗口表和wNAF奇数倍点表只取决于曲线参数和窗口宽度，构建一次后写入二进制文件，
+之后每个进程（GUI、命令行、进程池中的工作进程）启动时只需以只读mmap方式读取，不再重新做点运算。
+多个进程映射同一个文件时共享操作系统页缓存中的同一份数据；点坐标读出后转换为Python整数，
+每个进程各自持有解码后的表，但解码只需几毫秒，远快于重新构建。
+
+文件格式（整数均为小端）：
+    头部    magic(8) | 格式版本(u32) | 基点表窗口(u32) | wNAF窗口(u32) | 行数(u32) | 每行点数(u32) |
+            wNAF表点数(u32) | 曲线参数摘要(32) | 数据摘要(32)
+    数据    所有点依次存放，每个点为 x || y 各32字节大端
+曲线参数、窗口宽度或格式版本不一致，或数据摘要校验失败时视为失效，由调用方重新构建并覆盖。
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+
+MAGIC = b'SM2PRECT'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<8s6I32s32s')
+_POINT_SIZE = 64
+
+
+def curve_digest(curve):
+    """曲线参数摘要，参数变化后旧文件自动失效"""
+    data = b''.join(v.to_bytes(32, 'big') for v in (curve.p, curve.a % curve.p, curve.b, curve.n, curve.Gx, curve.Gy))
+    return hashlib.sha256(data).digest()
+
+
+def _encode_points(points):
+    return b''.join(x.to_bytes(32, 'big') + y.to_bytes(32, 'big') for x, y in points)
+
+
+def _decode_points(buf, offset, count):
+    from_bytes = int.from_bytes
+    points = []
+    for i in range(offset, offset + count * _POINT_SIZE, _POINT_SIZE):
+        points.append((from_bytes(buf[i:i + 32], 'big'), from_bytes(buf[i + 32:i + 64], 'big')))
+    return points
+
+
+def save_tables(path, curve, base_window, g_window, base_table, g_table):
+    """写入预计算表；先写临时文件再原子替换，多个进程同时重建也不会读到半个文件
+    目录不可写时静默放弃，返回是否写入成功
+    """
+    rows = len(base_table)
+    row_size = len(base_table[0])
+    payload = _encode_points(p for row in base_table for p in row) + _encode_points(g_table)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, base_window, g_window, rows, row_size, len(g_table),
+                          curve_digest(curve), hashlib.sha256(payload).digest())
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.sm2_tables-', dir=directory)
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(payload)
+        # mkstemp创建的文件仅所有者可读，改为与普通文件相同的权限，便于其他用户的进程共享
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def load_tables(path, curve, base_window, g_window):
+    """读取预计算表，返回(基点表, wNAF表)；文件不存在、过期或损坏时返回None"""
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _parse(mm, size, curve, base_window, g_window)
+    except (OSError, ValueError):
+        return None
+
+
+def _parse(mm, size, curve, base_window, g_window):
+    (magic, version, file_base_window, file_g_window, rows, row_size, g_count,
+     file_curve, digest) = _HEADER.unpack_from(mm, 0)
+    if (magic != MAGIC or version != FORMAT_VERSION or file_base_window != base_window
+            or file_g_window != g_window or file_curve != curve_digest(curve)):
+        return None
+    if row_size != (1 << base_window) - 1 or g_count != 1 << (g_window - 2):
+        return None
+    payload_size = (rows * row_size + g_count) * _POINT_SIZE
+    if size != _HEADER.size + payload_size:
+        return None
+    with memoryview(mm) as view:
+        payload = view[_HEADER.size:]
+        try:
+            if hashlib.sha256(payload).digest() != digest:
+                return None
+            points = _decode_points(payload, 0, rows * row_size)
+            g_table = _decode_points(payload, rows * row_size * _POINT_SIZE, g_count)
+        finally:
+            payload.release()
+    base_table = [points[i:i + row_size] for i in range(0, len(points), row_size)]
+    return base_table, g_table
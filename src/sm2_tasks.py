@@ -0,0 +1,135 @@
+"""GUI后台任务执行器
+文件杂凑和签名/验签放到线程池中执行，Tk主线程只负责界面：
+- 任务函数的第一个参数为Task，通过task.set_phase / task.progress报告当前阶段和已处理字节数，
+  task.progress可以直接作为update_from_file、FileDigestCache.digests的progress回调
+- 取消只设置标志，任务在下一次报告进度（或调用task.check）时抛出TaskCancelled退出
+- 完成回调不在工作线程中执行，而是由主线程定时调用TaskRunner.poll（root.after轮询）时执行，
+  回调中可以直接操作Tk控件
+同名任务再次提交时取消前一个（例如连续选择文件只保留最后一次的杂凑计算），不同名任务可以同时运行。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskCancelled(Exception):
+    """任务已被取消"""
+
+
+class Task:
+    """一个后台任务的进度和取消状态，进度字段由工作线程写入、主线程读取"""
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.phase = ''
+        self.done = 0
+        self.total = 0
+        self.started = time.perf_counter()
+        self._cancel_event = threading.Event()
+
+    def set_phase(self, phase, total=0):
+        self.check()
+        self.phase = phase
+        self.done = 0
+        self.total = total
+
+    def progress(self, done, total=None):
+        """更新已处理字节数，任务已取消时抛出TaskCancelled"""
+        self.check()
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def check(self):
+        if self._cancel_event.is_set():
+            raise TaskCancelled(self.description)
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def status(self):
+        """用于状态栏显示的一行文字"""
+        text = self.description
+        if self.phase:
+            text += f" - {self.phase}"
+        if self.total:
+            text += f" {self.done / 1048576:.1f}/{self.total / 1048576:.1f} MB"
+        return text
+
+
+class TaskRunner:
+    """线程池执行后台任务，完成回调由主线程调用poll时执行
+    runner.submit('sign', '签名 a.txt', sign_func, path, on_done=show_result)
+    root.after(50, poll)   # poll中调用runner.poll()
+    """
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sm2-task')
+        self._lock = threading.Lock()
+        self._tasks = []    # [(Task, future, on_done, on_error)]，按提交顺序
+
+    def submit(self, name, description, func, *args, on_done=None, on_error=None):
+        """提交任务func(task, *args)，返回Task
+        on_done(结果)、on_error(异常)在poll中执行；任务被取消时两者都不调用
+        """
+        task = Task(name, description)
+        with self._lock:
+            for other, _, _, _ in self._tasks:
+                if other.name == name:
+                    other.cancel()
+            future = self._executor.submit(self._run, task, func, args)
+            self._tasks.append((task, future, on_done, on_error))
+        return task
+
+    @staticmethod
+    def _run(task, func, args):
+        task.check()
+        return func(task, *args)
+
+    def cancel(self, name=None):
+        """取消指定名称的任务，name为None时取消所有任务"""
+        with self._lock:
+            for task, _, _, _ in self._tasks:
+                if name is None or task.name == name:
+                    task.cancel()
+
+    def running(self):
+        """尚未完成且未被取消的任务列表"""
+        with self._lock:
+            return [task for task, future, _, _ in self._tasks if not future.done() and not task.cancelled]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._tasks)
+
+    def poll(self):
+        """在主线程中调用：对已完成的任务执行回调，返回仍在运行的任务列表"""
+        with self._lock:
+            finished = [item for item in self._tasks if item[1].done()]
+            self._tasks = [item for item in self._tasks if not item[1].done()]
+        for task, future, on_done, on_error in finished:
+            if task.cancelled:
+                continue
+            error = future.exception()
+            if isinstance(error, TaskCancelled):
+                continue
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+            elif on_done is not None:
+                on_done(future.result())
+        return self.running()
+
+    def shutdown(self, wait=False):
+        """取消所有任务并关闭线程池"""
+        self.cancel()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
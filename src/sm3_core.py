@@ -0,0 +1,317 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+# 初始值IV
+IV = (
+    0x7380166F, 0x4914B2B9, 0x172442D7, 0xDA8A0600,
+    0xA96F30BC, 0x163138AA, 0xE38DEE4D, 0xB0FB0E4E,
+)
+
+_MASK = 0xFFFFFFFF
+
+
+def _rotl(x, n):
+    return ((x << n) | (x >> (32 - n))) & _MASK
+
+
+# 预先循环左移好的常量 T_j <<< (j mod 32)，避免在压缩函数中重复计算
+_T = tuple(_rotl(0x79CC4519 if j < 16 else 0x7A879D8A, j % 32) for j in range(64))
+
+_unpack_block = struct.Struct('>16I').unpack_from
+
+
+def _compress(v, data, start, end):
+    """对data[start:end]中的连续64字节分组依次执行压缩函数CF，返回新的状态
+    所有的循环移位、布尔函数和置换函数都已内联，避免Python函数调用开销
+    """
+    M = _MASK
+    T = _T
+    unpack = _unpack_block
+    A, B, C, D, E, F, G, H = v
+    for offset in range(start, end, 64):
+        # 消息扩展：W0..W67，W'j = Wj ^ Wj+4 在轮函数中直接计算
+        W = list(unpack(data, offset))
+        for j in range(16, 68):
+            x = W[j - 16] ^ W[j - 9]
+            w3 = W[j - 3]
+            x ^= ((w3 << 15) | (w3 >> 17)) & M
+            x ^= (((x << 15) | (x >> 17)) & M) ^ (((x << 23) | (x >> 9)) & M)
+            w13 = W[j - 13]
+            W.append(x ^ (((w13 << 7) | (w13 >> 25)) & M) ^ W[j - 6])
+
+        a, b, c, d, e, f, g, h = A, B, C, D, E, F, G, H
+        for wj, wj4, tj in zip(W[:16], W[4:20], T[:16]):
+            a12 = ((a << 12) | (a >> 20)) & M
+            ss1 = (a12 + e + tj) & M
+            ss1 = ((ss1 << 7) | (ss1 >> 25)) & M
+            tt1 = ((a ^ b ^ c) + d + (ss1 ^ a12) + (wj ^ wj4)) & M
+            tt2 = ((e ^ f ^ g) + h + ss1 + wj) & M
+            d = c
+            c = ((b << 9) | (b >> 23)) & M
+            b = a
+            a = tt1
+            h = g
+            g = ((f << 19) | (f >> 13)) & M
+            f = e
+            e = tt2 ^ (((tt2 << 9) | (tt2 >> 23)) & M) ^ (((tt2 << 17) | (tt2 >> 15)) & M)
+        for wj, wj4, tj in zip(W[16:64], W[20:68], T[16:]):
+            a12 = ((a << 12) | (a >> 20)) & M
+            ss1 = (a12 + e + tj) & M
+            ss1 = ((ss1 << 7) | (ss1 >> 25)) & M
+            tt1 = (((a & b) | (a & c) | (b & c)) + d + (ss1 ^ a12) + (wj ^ wj4)) & M
+            tt2 = (((e & f) | (~e & g)) + h + ss1 + wj) & M
+            d = c
+            c = ((b << 9) | (b >> 23)) & M
+            b = a
+            a = tt1
+            h = g
+            g = ((f << 19) | (f >> 13)) & M
+            f = e
+            e = tt2 ^ (((tt2 << 9) | (tt2 >> 23)) & M) ^ (((tt2 << 17) | (tt2 >> 15)) & M)
+
+        A ^= a
+        B ^= b
+        C ^= c
+        D ^= d
+        E ^= e
+        F ^= f
+        G ^= g
+        H ^= h
+    return (A, B, C, D, E, F, G, H)
+
+
+class PySM3:
+    """纯Python的增量式SM3杂凑对象，接口与hashlib一致：update() / digest() / hexdigest() / copy()
+    数据按64字节分组逐块压缩，只保留不足一组的尾部数据，
+    因此无论输入多大，内存占用都是常数；输入直接以bytes/memoryview处理，不转换为整数列表
+    OpenSSL不支持SM3时作为SM3使用
+    """
+    name = 'sm3'
+    block_size = 64
+    digest_size = 32
+
+    def __init__(self, data=b''):
+        self._v = IV
+        self._buf = b''
+        self._length = 0
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        """追加数据，可以是bytes、bytearray、memoryview或mmap"""
+        view = memoryview(data).cast('B')
+        size = len(view)
+        if not size:
+            return
+        self._length += size
+        offset = 0
+        if self._buf:
+            need = 64 - len(self._buf)
+            if size < need:
+                self._buf += bytes(view)
+                return
+            self._v = _compress(self._v, self._buf + bytes(view[:need]), 0, 64)
+            self._buf = b''
+            offset = need
+        end = offset + ((size - offset) & ~63)
+        if end > offset:
+            self._v = _compress(self._v, view, offset, end)
+        if end < size:
+            self._buf = bytes(view[end:])
+
+    def copy(self):
+        other = PySM3.__new__(PySM3)
+        other._v = self._v
+        other._buf = self._buf
+        other._length = self._length
+        return other
+
+    def digest(self):
+        # 填充：追加0x80，补0至长度 ≡ 56 (mod 64)，最后追加64位消息比特长度
+        tail = self._buf + b'\x80'
+        tail += b'\x00' * ((56 - len(tail)) % 64)
+        tail += (self._length * 8).to_bytes(8, 'big')
+        return struct.pack('>8I', *_compress(self._v, tail, 0, len(tail)))
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+
+class OpenSSLSM3:
+    """基于hashlib.new('sm3')（OpenSSL）的SM3杂凑对象，接口与PySM3相同
+    OpenSSL的压缩函数比纯Python快数百倍，且处理较大的数据块时释放GIL
+    """
+    name = 'sm3'
+    block_size = 64
+    digest_size = 32
+
+    def __init__(self, data=b''):
+        self._h = hashlib.new('sm3')
+        self._length = 0
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        """追加数据，可以是bytes、bytearray、memoryview或mmap"""
+        view = memoryview(data).cast('B')
+        self._length += len(view)
+        self._h.update(view)
+
+    def copy(self):
+        other = OpenSSLSM3.__new__(OpenSSLSM3)
+        other._h = self._h.copy()
+        other._length = self._length
+        return other
+
+    def digest(self):
+        return self._h.digest()
+
+    def hexdigest(self):
+        return self._h.hexdigest()
+
+
+def _openssl_has_sm3():
+    try:
+        hashlib.new('sm3')
+    except ValueError:
+        return False
+    return True
+
+
+# 当前使用的SM3实现：'openssl'或'python'
+SM3_BACKEND = 'openssl' if _openssl_has_sm3() else 'python'
+SM3 = OpenSSLSM3 if SM3_BACKEND == 'openssl' else PySM3
+
+
+def sm3_hash(data):
+    """一次性计算data的SM3摘要，返回32字节"""
+    return SM3(data).digest()
+
+
+def update_from_stream(hasher, stream, chunk_size=1 << 20, progress=None):
+    """从文件对象中分块读取数据送入hasher，复用同一个缓冲区，返回读取的字节数
+    progress不为None时每处理一块调用progress(已处理字节数, 总字节数)，总字节数未知时为None；
+    回调中抛出的异常会中止读取，可用于取消长时间的杂凑计算
+    """
+    total = 0
+    readinto = getattr(stream, 'readinto', None)
+    if readinto is None:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                return total
+            hasher.update(chunk)
+            total += len(chunk)
+            if progress is not None:
+                progress(total, None)
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    while True:
+        n = readinto(buf)
+        if not n:
+            return total
+        hasher.update(view[:n])
+        total += n
+        if progress is not None:
+            progress(total, None)
+
+
+def update_from_file(hasher, path, chunk_size=1 << 20, use_mmap=True, progress=None):
+    """将文件内容送入hasher，默认通过只读mmap映射文件而不是读入内存，返回文件字节数
+    progress同update_from_stream，总字节数为文件大小
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if progress is not None:
+            progress(0, size)
+        if not use_mmap or size == 0:
+            report = None if progress is None else (lambda done, _: progress(done, size))
+            return update_from_stream(hasher, f, chunk_size, report)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                for offset in range(0, size, chunk_size):
+                    hasher.update(view[offset:offset + chunk_size])
+                    if progress is not None:
+                        progress(min(offset + chunk_size, size), size)
+        return size
+
+
+def sm3_file(path, chunk_size=1 << 20):
+    """计算文件的SM3摘要，返回32字节"""
+    hasher = SM3()
+    update_from_file(hasher, path, chunk_size)
+    return hasher.digest()
+
+
+class _FanOut:
+    """把同一份数据同时送入多个杂凑对象，文件只需读取一次"""
+
+    def __init__(self, hashers):
+        self.hashers = hashers
+
+    def update(self, data):
+        for hasher in self.hashers:
+            hasher.update(data)
+
+
+class FileDigestCache:
+    """按文件标识(路径, 大小, mtime)缓存文件的SM3摘要，线程安全
+    同一文件可以缓存多个不同前缀的摘要：前缀为b''时即SM3(M)，前缀为ZA时即签名/验签用的e = H(ZA || M)。
+    一次请求的多个前缀中未缓存的部分在同一遍读取中同时计算；文件被修改（大小或mtime变化）后自动失效
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path):
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+    def digests(self, path, prefixes=(b'',), chunk_size=1 << 20, progress=None):
+        """返回与prefixes一一对应的摘要列表；需要读取文件时progress同update_from_file"""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            else:
+                entry = {}
+            missing = [p for p in dict.fromkeys(prefixes) if p not in entry]
+            self.hits += len(prefixes) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            hashers = [SM3(p) for p in missing]
+            update_from_file(_FanOut(hashers), path, chunk_size, progress=progress)
+            computed = {p: h.digest() for p, h in zip(missing, hashers)}
+            with self._lock:
+                entry = self._entries.setdefault(key, entry)
+                entry.update(computed)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+            return [computed.get(p) or entry[p] for p in prefixes]
+        return [entry[p] for p in prefixes]
+
+    def digest(self, path, prefix=b'', chunk_size=1 << 20, progress=None):
+        return self.digests(path, (prefix,), chunk_size, progress)[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+# 进程内共享的文件摘要缓存，GUI和命令行调用共用
+session_digest_cache = FileDigestCache()
@@ -0,0 +1,51 @@
+import copy
+import os
+import tempfile
+from sm2_bench import (SM3_STREAM_CHUNK, compare_results, format_size, load_results, measure, parse_size, run_benchmarks,
+                       run_case, save_results, speedups)
+
+# 消息长度的解析和显示
+print("parse_size/format_size:", [parse_size(s) for s in ('64', '1K', '64KB', '1M', '1G')] ==
+      [64, 1024, 65536, 1 << 20, 1 << 30] and [format_size(s) for s in (64, 1024, 1 << 20, 1 << 30)] ==
+      ['64B', '1KB', '1MB', '1GB'])
+
+# 单次计时统计
+stats = measure(lambda: sum(range(1000)), min_time=0.05, min_iterations=10, size=1000)
+print("measure统计字段:", stats['iterations'] >= 10 and stats['min_us'] <= stats['p50_us'] <= stats['p99_us']
+      and stats['ops_per_s'] > 0 and 'mb_per_s' in stats)
+
+# 子进程中运行单项，带峰值RSS
+result = run_case('sign', min_time=0.1, min_iterations=3)
+print("子进程运行sign:", 'error' not in result and result['ops_per_s'] > 0 and bool(result['peak_rss_kb']))
+# 子进程是新启动的解释器，峰值RSS不包含父进程已占用的内存；不隔离时不记录峰值RSS
+ballast = bytearray(256 << 20)
+result = run_case('sm3/64B', min_time=0.05, min_iterations=3)
+print("峰值RSS不含父进程内存:", 'error' not in result and 0 < result['peak_rss_kb'] < (256 << 10))
+del ballast
+result = run_case('sm3/64B', min_time=0.05, min_iterations=3, isolate=False)
+print("当前进程中运行不记录峰值RSS:", result['ops_per_s'] > 0 and 'peak_rss_kb' not in result)
+
+# 与gmssl对比的小规模运行，结果可以保存为JSON并读回
+results = run_benchmarks(['addPoint', 'sm3/64B'], min_time=0.1, min_iterations=3)
+print("同时运行gmssl基线:", {(r['name'], r['impl']) for r in results['results']} ==
+      {('addPoint', 'sm2_core'), ('addPoint', 'gmssl'), ('sm3/64B', 'sm2_core'), ('sm3/64B', 'gmssl')})
+print("相对gmssl的倍数:", set(speedups(results)) == {'addPoint', 'sm3/64B'})
+try:
+    run_benchmarks(['sm3/64B'], baseline_max_size=SM3_STREAM_CHUNK * 2)
+    print("拒绝超过1MB的SM3基线:", False)
+except ValueError:
+    print("拒绝超过1MB的SM3基线:", True)
+path = os.path.join(tempfile.mkdtemp(), 'bench.json')
+save_results(results, path)
+loaded = load_results(path)
+print("JSON读写一致:", loaded == results)
+
+# 退化检测：每秒操作数下降超过阈值的项被标记
+slower = copy.deepcopy(results)
+for item in slower['results']:
+    if item['impl'] == 'sm2_core' and item['name'] == 'addPoint':
+        item['ops_per_s'] *= 0.5
+rows = {name: regressed for name, _, _, _, regressed in compare_results(results, slower, threshold=0.1)}
+print("检测到退化:", rows == {'addPoint': True, 'sm3/64B': False})
+rows = compare_results(results, slower, threshold=0.1, relative=True)
+print("按相对gmssl的倍数对比:", [name for name, *_, regressed in rows if regressed] == ['addPoint'])
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import time
+from sm2_client import DaemonError, SM2Client
+from sm2_core import SM2
+from sm2_daemon import SigningDaemon
+from sm2_keystore import KeyStore
+
+# 守护进程在后台线程的事件循环中运行，客户端通过本机Unix套接字和TCP端口连接，全程离线
+directory = tempfile.mkdtemp()
+store = KeyStore(os.path.join(directory, 'keystore.db'))
+sm2 = SM2(load_key=False)
+sm2.setSecretKey()
+fingerprint = store.add_private_key(sm2.private_key)
+store.set_default(fingerprint)
+public_key = sm2.public_key
+
+daemon = SigningDaemon(store, processes=1, batch_window=0.01, batch_size=32, max_pending=64,
+                       max_request_size=64 << 10)
+loop = asyncio.new_event_loop()
+threading.Thread(target=loop.run_forever, daemon=True).start()
+socket_path = os.path.join(directory, 'sm2d.sock')
+asyncio.run_coroutine_threadsafe(daemon.start_unix(socket_path), loop).result()
+port = asyncio.run_coroutine_threadsafe(daemon.start_tcp(), loop).result()
+print("套接字文件权限为0o600:", os.stat(socket_path).st_mode & 0o777 == 0o600)
+
+with SM2Client(socket_path) as client:
+    print("ping:", client.ping())
+
+    # 对原始数据签名，本地验签
+    signature = client.sign(b'hello daemon')
+    print("守护进程签名可在本地验证:", sm2.verify(b'hello daemon', signature, public_key))
+    print("守护进程验签(公钥):", client.verify(signature, b'hello daemon', public_key=public_key))
+    print("守护进程验签(指纹):", client.verify(signature, b'hello daemon', key=fingerprint))
+    print("篡改的数据验签失败:", not client.verify(signature, b'hello daemon!', public_key=public_key))
+
+    # 对预先计算好的摘要签名
+    path = os.path.join(directory, 'data.bin')
+    with open(path, 'wb') as f:
+        f.write(os.urandom(4096))
+    e = sm2.file_digest(path)
+    signature = client.sign(digest=e, key=fingerprint)
+    print("对摘要签名可用verify_file验证:", sm2.verify_file(path, signature, public_key))
+    print("守护进程按摘要验签:", client.verify(signature, digest=e, public_key=public_key))
+
+    # 错误请求只影响自身
+    try:
+        client.sign(b'x', key='00' * 32)
+        print("未知密钥返回错误:", False)
+    except DaemonError as exc:
+        print("未知密钥返回错误:", '私钥' in str(exc))
+
+    # 连续发送的请求被合并为微批
+    before = client.stats()
+    messages = [f'message {i}'.encode() for i in range(200)]
+    start = time.perf_counter()
+    signatures = client.sign_many(messages)
+    elapsed = time.perf_counter() - start
+    after = client.stats()
+    batches = after['batches'] - before['batches']
+    print("批量签名全部可验证:", all(sm2.verify(m, sig, public_key) for m, sig in zip(messages, signatures)))
+    print(f"200个请求合并为{batches}个批次({elapsed * 1000 / 200:.2f} ms/个):", 0 < batches < 50)
+    results = client.verify_many(list(zip(messages, signatures)), public_key=public_key)
+    print("批量验签:", all(result is True for result in results))
+
+# 本机TCP端口
+with SM2Client(port=port) as client:
+    print("TCP连接签名:", sm2.verify(b'tcp', client.sign(b'tcp'), public_key))
+
+# 超过max_request_size的请求被拒绝，连接关闭
+with SM2Client(socket_path) as client:
+    try:
+        client.sign(os.urandom(100 << 10))
+        print("过大请求被拒绝:", False)
+    except (DaemonError, ConnectionError) as exc:
+        print("过大请求被拒绝:", True)
+
+# 多个客户端同时发送请求，处理中的请求数始终不超过max_pending
+peak = [0]
+
+
+def watch():
+    while not stop.is_set():
+        peak[0] = max(peak[0], daemon.stats.pending)
+        time.sleep(0.001)
+
+
+def worker(results):
+    with SM2Client(socket_path) as client:
+        results.extend(client.sign_many([b'concurrent'] * 100))
+
+
+stop = threading.Event()
+watcher = threading.Thread(target=watch)
+watcher.start()
+collected = []
+threads = [threading.Thread(target=worker, args=(collected,)) for _ in range(4)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+stop.set()
+watcher.join()
+print(f"并发客户端(处理中的请求峰值{peak[0]})不超过背压上限:",
+      len(collected) == 400 and all(isinstance(r, tuple) for r in collected) and peak[0] <= 64)
+
+asyncio.run_coroutine_threadsafe(daemon.close(), loop).result()
+loop.call_soon_threadsafe(loop.stop)
+store.close()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import time
+from sm2_core import SM2
+from sm3_core import FileDigestCache, SM3, sm3_file
+
+sm2 = SM2(load_key=False)
+sm2.setSecretKey()
+public_key = sm2.public_key
+
+path = os.path.join(tempfile.mkdtemp(), 'data.bin')
+with open(path, 'wb') as f:
+    f.write(os.urandom(200 << 10))
+
+# sign_digest / verify_digest 与 sign_file / verify_file 结果互通
+e = sm2.file_digest(path)
+hasher = SM3(public_key.default_za())
+with open(path, 'rb') as f:
+    hasher.update(f.read())
+print("file_digest等于H(ZA || M):", e == hasher.digest())
+signature = sm2.sign_digest(e)
+print("sign_digest签名可被verify_file验证:", sm2.verify_file(path, signature, public_key))
+print("verify_digest验证sign_file签名:", sm2.verify_digest(e, sm2.sign_file(path), public_key))
+print("错误的e验证失败:", not sm2.verify_digest(bytes(32), signature, public_key))
+
+# 会话摘要缓存：显示用的SM3(M)和签名用的H(ZA || M)在同一遍读取中算出，之后签名、验签都不再读取文件
+cache = FileDigestCache()
+sm2.digest_cache = cache
+start = time.perf_counter()
+plain = cache.digests(path, [b'', public_key.default_za()])[0]
+first = time.perf_counter() - start
+start = time.perf_counter()
+signature = sm2.sign_file(path)
+ok = sm2.verify_file(path, signature, public_key)
+cached = time.perf_counter() - start
+print("SM3(M)与sm3_file一致:", plain == sm3_file(path))
+print("签名和验签命中缓存:", ok and cache.misses == 2 and cache.hits == 2)
+print(f"一遍读取两个摘要: {first * 1000:.1f} ms, 之后签名+验签: {cached * 1000:.1f} ms")
+
+# 文件修改后缓存失效
+time.sleep(0.01)
+with open(path, 'ab') as f:
+    f.write(b'changed')
+print("文件修改后重新计算:", not sm2.verify_file(path, signature, public_key) and cache.misses == 3)
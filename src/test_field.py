@@ -0,0 +1,60 @@
+from sm2_field import P, fp_reduce, fp_reduce_solinas, fp_add, fp_sub, fp_mul, fp_sqr, fp_inv
+from sm2_core import SM2
+import random
+import time
+
+# 正确性：特殊归约与通用取模结果一致
+print("对比fp_reduce_solinas与 % p 的结果：")
+samples = [0, 1, P - 1, P, P + 1, (P - 1) * (P - 1), (1 << 512) - 1]
+samples += [random.randrange(P) * random.randrange(P) for _ in range(200)]
+print(f"  是否一致: {all(fp_reduce_solinas(x) == x % P for x in samples)}")
+
+a, b = random.randrange(P), random.randrange(P)
+print("对比域运算与直接取模的结果：")
+print(f"  是否一致: {fp_add(a, b) == (a + b) % P and fp_sub(a, b) == (a - b) % P and fp_mul(a, b) == a * b % P and fp_sqr(a) == a * a % P and fp_mul(a, fp_inv(a)) == 1}")
+
+
+def measure(func, values, rounds=5):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for v in values:
+            func(v)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(values) * 1e9
+
+
+# 归约方式对比：在CPython中通用 % p 是一次C调用，移位-加法归约需要多轮Python运算
+products = [random.randrange(P) * random.randrange(P) for _ in range(2000)]
+factors = [random.randrange(P) for _ in range(2000)]
+print("\n归约耗时对比(ns/次)：")
+generic = measure(lambda x: x % P, products)
+solinas = measure(fp_reduce_solinas, products)
+print(f"  % p:              {generic:.0f}")
+print(f"  移位-加法归约:    {solinas:.0f}")
+print(f"  % p 相对加速比:   {solinas / generic:.1f}x")
+
+print("\n平方与一般乘法对比(ns/次)：")
+square = measure(lambda x: x * x % P, factors)
+general = measure(lambda x: x * b % P, factors)
+print(f"  a * a % p:  {square:.0f}")
+print(f"  a * b % p:  {general:.0f}")
+
+# 点运算公式：倍点耗时
+sm2 = SM2(load_key=False)
+points = [(random.randrange(P), random.randrange(P), random.randrange(P)) for _ in range(2000)]
+print("\nJacobian倍点耗时(ns/次)：")
+print(f"  _jacobian_double: {measure(sm2._jacobian_double, points):.0f}")
+
+# 批量仿射转换：逐点求逆与Montgomery同时求逆对比
+jacobian_points = [sm2._base_multiply_jacobian(random.randrange(1, sm2.n)) for _ in range(200)]
+start = time.perf_counter()
+single = [sm2._to_affine(Q) for Q in jacobian_points]
+single_time = time.perf_counter() - start
+start = time.perf_counter()
+batch = sm2.batch_to_affine(jacobian_points)
+batch_time = time.perf_counter() - start
+print("\n批量仿射转换(200个点)：")
+print(f"  是否一致: {single == batch}")
+print(f"  逐点求逆: {single_time * 1000:.2f} ms, 批量求逆: {batch_time * 1000:.2f} ms")
@@ -0,0 +1,43 @@
+from sm2_core import LRUCache, SM2
+
+# LRU缓存：容量、淘汰顺序和命中统计
+cache = LRUCache(3)
+for key in 'abc':
+    cache.put(key, key.upper())
+cache.get('a')                      # a变为最近使用，b成为最久未使用
+cache.put('d', 'D')
+print("超出容量淘汰最久未使用的条目:", 'b' not in cache and list('acd') == [k for k in 'abcd' if k in cache])
+print("未命中返回默认值:", cache.get('b', 'missing') == 'missing')
+stats = cache.stats()
+print("命中/未命中计数:", stats['hits'] == 1 and stats['misses'] == 1 and stats['size'] == 3)
+cache.get('c')
+cache.resize(2)                     # 按使用顺序淘汰：a最久未使用
+print("resize缩小时淘汰最久未使用的条目:", len(cache) == 2 and 'a' not in cache and 'c' in cache and 'd' in cache)
+try:
+    cache.resize(0)
+    print("拒绝容量0:", False)
+except ValueError:
+    print("拒绝容量0:", True)
+cache.evict('c')
+print("evict单个条目:", 'c' not in cache and 'd' in cache)
+cache.evict()
+print("evict清空缓存:", len(cache) == 0)
+
+# 公钥缓存：有效公钥带倍点表，无效公钥在缓存前完成校验且不计算倍点表
+sm2 = SM2(load_key=False, key_cache_size=2)
+sm2.setSecretKey()
+Px, Py = sm2.PBx, sm2.PBy
+signature = sm2.sign(b'message')
+entry = sm2.get_public_key_entry(Px, Py)
+print("有效公钥预计算倍点表:", entry.valid and entry.table is not None)
+print("再次获取命中缓存:", sm2.get_public_key_entry(Px, Py) is entry and sm2.key_cache.hits >= 1)
+
+invalid_keys = [(Px, (Py + 1) % sm2.p), (Px + sm2.p, Py), (0, 0)]
+ok = True
+for x, y in invalid_keys:
+    bad = sm2.get_public_key_entry(x, y)
+    ok = ok and not bad.valid and bad.table is None and not sm2.verify(b'message', signature, x, y)
+print("不在曲线上或坐标越界的公钥被拒绝:", ok)
+print("无效公钥的校验结论同样被缓存:", sm2.get_public_key_entry(0, 0).valid is False and (0, 0) in sm2.key_cache)
+print("公钥缓存不超过容量:", len(sm2.key_cache) == 2 and (Px, Py) not in sm2.key_cache)
+print("淘汰后重新校验仍可验签:", sm2.verify(b'message', signature, Px, Py))
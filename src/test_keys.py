@@ -0,0 +1,66 @@
+from sm2_core import SM2, SM2PrivateKey, SM2PublicKey
+
+
+def raises(func, exc=ValueError):
+    try:
+        func()
+    except exc:
+        return True
+    return False
+
+
+# 未加载密钥时访问公钥给出明确的错误
+empty = SM2(load_key=False)
+print("未加载密钥时PBx/PBy抛出ValueError:", raises(lambda: empty.PBx) and raises(lambda: empty.PBy))
+print("未加载密钥时签名抛出ValueError:", raises(lambda: empty.sign(b'message')))
+
+sm2 = SM2(load_key=False)
+d = sm2.random_private_key()
+key = SM2PrivateKey(d, sm2)
+
+# (1 + d)^-1和公钥只计算一次，修改d后失效
+inverse = key.inverse
+print("(1 + d)^-1正确:", inverse * (1 + d) % SM2.n == 1)
+public_key = key.public_key
+print("公钥等于[d]G:", public_key.point == tuple(sm2.multiPoint([SM2.Gx, SM2.Gy], d)))
+print("派生值被缓存:", key.inverse is inverse and key.public_key is public_key)
+key.d = d + 1
+print("修改d后派生值重新计算:", key.inverse * (d + 2) % SM2.n == 1 and key.public_key != public_key
+      and key.public_key.point == tuple(sm2.base_multiply(d + 1)))
+print("私钥范围校验:", raises(lambda: SM2PrivateKey(0, sm2)) and raises(lambda: SM2PrivateKey(SM2.n - 1, sm2)))
+print("repr不显示私钥:", key.to_hex() not in repr(key) and '%X' % (d + 1) not in repr(key))
+
+# SM2.d / set_private_key替换当前私钥，PBx/PBy随之变化
+sm2.d = d
+print("设置d后PBx/PBy为对应公钥:", (sm2.PBx, sm2.PBy) == public_key.point)
+sm2.set_private_key('%064X' % (d + 1))
+print("十六进制私钥:", sm2.d == d + 1 and (sm2.PBx, sm2.PBy) == key.public_key.point)
+sm2.set_private_key(key)
+print("直接使用SM2PrivateKey:", sm2.private_key is key)
+
+# user_id：str与bytes等价，默认与自定义互不通用；公钥可以是SM2PublicKey或(Px, Py)
+message = b'user id test'
+Px, Py = sm2.PBx, sm2.PBy
+signature = sm2.sign(message, user_id='alice@example.com')
+print("str签名、bytes验证:", sm2.verify(message, signature, Px, Py, user_id=b'alice@example.com'))
+print("SM2PublicKey验证:", sm2.verify(message, signature, sm2.public_key, user_id='alice@example.com'))
+print("用默认user_id验证失败:", not sm2.verify(message, signature, Px, Py))
+signature = sm2.sign(message)
+print("默认user_id:", sm2.verify(message, signature, sm2.public_key) and
+      sm2.verify(message, signature, Px, Py, user_id=SM2.DEFAULT_USER_ID))
+print("default_za与get_ZA一致:", sm2.public_key.default_za() == sm2.get_ZA(SM2.DEFAULT_USER_ID, Px, Py))
+other = SM2PrivateKey(sm2.random_private_key(), sm2)
+print("指定其他私钥签名:", sm2.verify(message, sm2.sign(message, private_key=other), other.public_key)
+      and not sm2.verify(message, sm2.sign(message, private_key=other), sm2.public_key))
+
+# SM2PublicKey.from_hex
+key_hex = sm2.public_key.to_hex()
+print("from_hex往返:", SM2PublicKey.from_hex(key_hex) == sm2.public_key)
+print("允许04前缀和小写:", SM2PublicKey.from_hex('04' + key_hex.lower()) == sm2.public_key)
+off_curve = '%064X%064X' % (Px, (Py + 1) % SM2.p)
+print("拒绝不在曲线上的点:", raises(lambda: SM2PublicKey.from_hex(off_curve)))
+print("拒绝坐标越界:", raises(lambda: SM2PublicKey.from_hex('%064X%064X' % (SM2.p, Py))))
+print("拒绝长度错误:", raises(lambda: SM2PublicKey.from_hex(key_hex[:-2])))
+print("相等的公钥哈希相同:", len({sm2.public_key, SM2PublicKey(Px, Py)}) == 1)
+print("指纹为32字节且各不相同:", len(sm2.public_key.fingerprint()) == 32
+      and sm2.public_key.fingerprint() != other.public_key.fingerprint())
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+from sm2_core import SM2
+from sm2_keystore import KeyStore
+
+sm2 = SM2(load_key=False)
+tmpdir = tempfile.mkdtemp()
+path = os.path.join(tmpdir, 'keystore.db')
+
+# 写入：单个私钥、批量密钥对、只有公钥的条目
+with KeyStore(path, sm2=sm2) as store:
+    d = sm2.random_private_key()
+    fingerprint = store.add_private_key(d, label='single')
+    store.set_default(fingerprint)
+    start = time.perf_counter()
+    count = store.add_keypairs(sm2.generate_keypairs(2000), label='bulk')
+    print(f"批量写入{count}个密钥对: {(time.perf_counter() - start) * 1000:.1f} ms")
+    Px, Py = sm2.base_multiply(sm2.random_private_key())
+    public_only = store.add_public_key((Px, Py), label='peer')
+
+# 重新打开后按指纹查找，公钥直接来自密钥库
+with KeyStore(path, sm2=SM2(load_key=False)) as store:
+    print(f"条目数: {len(store)}")
+    record = store.get_default()
+    print("默认密钥一致:", record.private_key.d == d and record.public_key.point == sm2.base_multiply(d))
+    print("只有公钥的条目:", store.get_private_key(public_only) is None and store.get_public_key(public_only).point == (Px, Py))
+    bulk = store.find('bulk')
+    start = time.perf_counter()
+    for fp in bulk:
+        store.get(fp)
+    elapsed = time.perf_counter() - start
+    print(f"按指纹查找{len(bulk)}次: {elapsed / len(bulk) * 1e6:.1f} us/次")
+    sample = store.get(bulk[123])
+    print("批量条目与[d]G一致:", sample.public_key.point == sm2.base_multiply(sample.private_key.d))
+    print("逐批遍历指纹:", sum(1 for _ in store.fingerprints(batch_size=100)) == len(store))
+
+    # 签名使用密钥库中的私钥
+    sm2.set_private_key(record.private_key)
+    signature = sm2.sign(b'keystore')
+    print("签名验证:", sm2.verify(b'keystore', signature, record.public_key))
+
+    # 旧格式导入
+    legacy = os.path.join(tmpdir, 'export.txt')
+    with open(legacy, 'w') as f:
+        f.write(f"私钥: {sm2.hex(d)}\n公钥X: {sm2.hex(sm2.PBx)}\n公钥Y: {sm2.hex(sm2.PBy)}\n")
+    print("旧格式导入:", store.import_legacy_file(legacy) == [fingerprint])
+
+    # 旧版GUI按系统默认编码导出，中文Windows上为GBK
+    with open(legacy, 'w', encoding='gbk') as f:
+        f.write(f"私钥: {sm2.hex(d)}\n公钥X: {sm2.hex(sm2.PBx)}\n公钥Y: {sm2.hex(sm2.PBy)}\n")
+    print("GBK编码的导出文件:", store.import_legacy_file(legacy) == [fingerprint])
+
+    # 私钥与公钥不匹配的密钥对被拒绝，文件中的其他条目也不导入
+    size = len(store)
+    d1, d2 = sm2.random_private_key(), sm2.random_private_key()
+    tampered = os.path.join(tmpdir, 'keypairs.txt')
+    with open(tampered, 'w', encoding='utf-8') as f:
+        f.write('%064X %064X %064X\n' % (d1, *sm2.base_multiply(d1)))
+        f.write('%064X %064X %064X\n' % (d2, *sm2.base_multiply(d1)))
+    try:
+        store.import_legacy_file(tampered)
+        print("拒绝不匹配的密钥对:", False)
+    except ValueError:
+        print("拒绝不匹配的密钥对:", len(store) == size)
+    with open(legacy, 'w', encoding='utf-8') as f:
+        f.write(f"私钥: {sm2.hex(d1)}\n公钥X: {sm2.hex(sm2.PBx)}\n公钥Y: {sm2.hex(sm2.PBy)}\n")
+    try:
+        store.import_legacy_file(legacy)
+        print("拒绝公钥不符的导出文件:", False)
+    except ValueError:
+        print("拒绝公钥不符的导出文件:", len(store) == size)
+    try:
+        store.add_keypairs([(d2, *sm2.base_multiply(d1))])
+        print("add_keypairs校验[d]G:", False)
+    except ValueError:
+        print("add_keypairs校验[d]G:", len(store) == size)
@@ -0,0 +1,60 @@
+import os
+import tempfile
+from sm2_core import SM2
+from sm2_manifest import (DigestCache, Manifest, build_manifest, inclusion_proof, iter_verify_manifest,
+                          merkle_levels, root_from_proof, verify_proof)
+from sm3_core import sm3_hash
+
+# 任意叶子数量下每个叶子的包含证明都能折叠回根
+ok = True
+for count in range(1, 18):
+    leaves = [sm3_hash(bytes([i])) for i in range(count)]
+    levels = merkle_levels(leaves)
+    ok = ok and all(root_from_proof(leaves[i], inclusion_proof(levels, i)) == levels[-1][0] for i in range(count))
+print("包含证明折叠到根:", ok)
+
+sm2 = SM2(load_key=False)
+sm2.setSecretKey()
+root = tempfile.mkdtemp()
+input_dir = os.path.join(root, 'input')
+for i in range(30):
+    directory = os.path.join(input_dir, f"d{i % 3}")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"f{i}.bin"), 'wb') as f:
+        f.write(os.urandom(i * 50))
+
+cache_path = os.path.join(root, 'digest_cache.db')
+with DigestCache(cache_path) as cache:
+    manifest = build_manifest(input_dir, sm2.private_key, cache, processes=2)
+    print(f"首次生成: 计算 {cache.misses} 个, 命中 {cache.hits} 个")
+manifest_path = os.path.join(root, 'manifest.json')
+manifest.save(manifest_path)
+
+# 修改一个文件后重新生成，只有该文件重新计算摘要
+with open(os.path.join(input_dir, 'd1', 'f4.bin'), 'ab') as f:
+    f.write(b'changed')
+with DigestCache(cache_path) as cache:
+    updated = build_manifest(input_dir, sm2.private_key, cache, processes=1)
+    print("增量生成只重新计算变化的文件:", cache.misses == 1 and cache.hits == 29)
+print("根随之变化:", updated.root != manifest.root and updated.verify_root(sm2))
+
+loaded = Manifest.load(manifest_path)
+print("清单读取后根一致且签名有效:", loaded.root == manifest.root and loaded.verify_root(sm2))
+
+proof = updated.proof('d2/f5.bin')
+print("单个文件包含证明验证:", verify_proof(os.path.join(input_dir, 'd2', 'f5.bin'), proof, sm2, sm2.public_key))
+print("其他文件不能通过该证明:", not verify_proof(os.path.join(input_dir, 'd0', 'f3.bin'), proof, sm2, sm2.public_key))
+
+# 用其他密钥对篡改后的文件重新生成清单，证明自洽但不能通过可信公钥的验证
+attacker = SM2(load_key=False)
+attacker.setSecretKey()
+forged = build_manifest(input_dir, attacker.private_key, processes=1).proof('d1/f4.bin')
+print("伪造密钥签名的证明验证失败:", not verify_proof(os.path.join(input_dir, 'd1', 'f4.bin'), forged, sm2, sm2.public_key))
+try:
+    verify_proof(os.path.join(input_dir, 'd1', 'f4.bin'), forged, sm2)
+    print("未指定可信公钥时拒绝验证:", False)
+except ValueError:
+    print("未指定可信公钥时拒绝验证:", True)
+
+failures = [r.path for r in iter_verify_manifest(manifest, input_dir, processes=1) if not r.ok]
+print("按旧清单验证时检出修改的文件:", failures == ['d1/f4.bin'])
@@ -0,0 +1,84 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+import sm2_core
+import sm3_core
+from sm2_core import (SM2, MetricsLogger, disable_metrics, enable_metrics, metrics_enabled,
+                      metrics_snapshot, metrics_to_prometheus, reset_metrics, write_prometheus)
+
+sm2 = SM2(load_key=False)
+sm2.setSecretKey()
+public_key = sm2.public_key
+message = os.urandom(1000)
+
+# 未开启时热点函数就是原函数
+originals = (SM2._jacobian_double, SM2.sign, sm2_core.fp_inv, sm3_core.SM3.update, sm3_core.SM3.digest)
+print("默认未开启:", not metrics_enabled())
+
+
+def timed_sign_verify(n=20):
+    start = time.perf_counter()
+    for _ in range(n):
+        sm2.verify(message, sm2.sign(message), public_key)
+    return (time.perf_counter() - start) / n
+
+
+timed_sign_verify(2)
+plain = timed_sign_verify()
+
+enable_metrics()
+enable_metrics()
+reset_metrics()
+signature = sm2.sign(message)
+ok = sm2.verify(message, signature, public_key)
+snapshot = metrics_snapshot()
+counters = snapshot['counters']
+print("验签结果不变:", ok)
+print("统计到倍点和点加:", counters['point_doubles'] > 200 and counters['point_adds'] > 0)
+print("统计到域求逆:", counters['field_inversions'] >= 2)
+# ZA已缓存，签名和验签各计算一次H(ZA || M)：32 + 1000字节，填充后17个分组
+print("SM3字节数和分组数:", counters['sm3_bytes'] == 2 * 1032 and counters['sm3_blocks'] == 2 * 17)
+print("各阶段计时:", all(snapshot['phases'][name]['count'] == n for name, n in
+                     (('hash', 2), ('sign_scalar', 1), ('verify_scalar', 1), ('verify_prepare', 1))))
+print("整次调用计时:", snapshot['operations']['sign']['count'] == 1 and snapshot['operations']['verify']['count'] == 1)
+print(f"计数: {counters}")
+
+text = metrics_to_prometheus(snapshot)
+print("Prometheus文本:", 'sm2_point_doubles_total %d' % counters['point_doubles'] in text
+      and 'sm2_phase_seconds_count{phase="verify_scalar"} 1' in text)
+prom_path = os.path.join(tempfile.mkdtemp(), 'sm2.prom')
+write_prometheus(prom_path, snapshot)
+with open(prom_path, encoding='utf-8') as f:
+    print("写入Prometheus文件:", f.read() == text)
+
+records = []
+handler = logging.Handler()
+handler.emit = records.append
+logger = logging.getLogger('test.metrics')
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+MetricsLogger(3600, logger).log_once()
+print("MetricsLogger写入日志:", len(records) == 1 and 'point_doubles' in records[0].getMessage())
+
+# 已结束线程的计数并入累计值，线程表不随线程数增长
+reset_metrics()
+workers = [threading.Thread(target=sm2.verify, args=(message, signature, public_key)) for _ in range(50)]
+for worker in workers:
+    worker.start()
+    worker.join()
+snapshot = metrics_snapshot()
+print("已结束线程的计数保留:", snapshot['operations']['verify']['count'] == 50)
+print("线程表只保留活动线程:", len(sm2_core._metrics.threads) <= threading.active_count())
+
+enabled = timed_sign_verify()
+reset_metrics()
+print("reset_metrics清零:", metrics_snapshot()['counters']['point_doubles'] == 0)
+
+disable_metrics()
+print("关闭后恢复原函数:", not metrics_enabled() and originals == (
+    SM2._jacobian_double, SM2.sign, sm2_core.fp_inv, sm3_core.SM3.update, sm3_core.SM3.digest))
+sm2.sign(message)
+print("关闭后不再计数:", metrics_snapshot()['counters']['point_doubles'] == 0)
+print(f"签名+验签: 未开启 {plain * 1000:.2f} ms, 开启 {enabled * 1000:.2f} ms")
@@ -0,0 +1,56 @@
+import os
+import tempfile
+from sm2_core import SM2, SM2PrivateKey
+from sm2_parallel import SHARED_MEMORY_THRESHOLD, verify_many
+
+sm2 = SM2(load_key=False)
+keys = [SM2PrivateKey(sm2.random_private_key(), sm2) for _ in range(3)]
+
+# 三个公钥交替出现，按公钥分组后同一批次内仍有多个条目；公钥使用不同的表示形式
+items = []
+for i in range(150):
+    key = keys[i % 3]
+    message = os.urandom(50 + i)
+    signature = sm2.sign(message, private_key=key)
+    public_key = (key.public_key, key.public_key.point, key.public_key.to_hex())[i % 3]
+    items.append((message, signature, public_key))
+
+# 两条大于共享内存阈值的消息
+for key in keys[:2]:
+    message = os.urandom(SHARED_MEMORY_THRESHOLD + 1)
+    items.append((message, sm2.sign(message, private_key=key), key.public_key))
+
+# 文件路径
+path = os.path.join(tempfile.mkdtemp(), 'data.bin')
+with open(path, 'wb') as f:
+    f.write(os.urandom(4096))
+items.append((path, sm2.sign_file(path, private_key=keys[2]), keys[2].public_key))
+
+# 错误的签名只影响自己的位置：签名与消息不符、公钥错误、大消息被修改
+expected = [True] * len(items)
+bad = {7: 'signature', 40: 'public_key', 150: 'shm'}
+for index, kind in bad.items():
+    message, signature, public_key = items[index]
+    if kind == 'signature':
+        items[index] = (message, items[index + 1][1], public_key)
+    elif kind == 'public_key':
+        items[index] = (message, signature, keys[(index + 1) % 3].public_key)
+    else:
+        tampered = bytearray(message)
+        tampered[-1] ^= 1
+        items[index] = (bytes(tampered), signature, public_key)
+    expected[index] = False
+
+results = verify_many(items, processes=2)
+print("结果与输入顺序一致:", results == expected)
+print("失败只出现在错误条目的位置:", [i for i, ok in enumerate(results) if not ok] == sorted(bad))
+print("共享内存路径的大消息验证正确:", results[150] is False and results[151] is True)
+print("文件路径验证正确:", results[-1] is True)
+
+unordered = list(verify_many(items, processes=2, ordered=False))
+print("ordered=False返回相同的结果集合:", sorted(unordered) == list(enumerate(expected)))
+print("ordered=False每个条目只产出一次:", len(unordered) == len(items))
+
+print("单进程结果相同:", verify_many(items, processes=1) == expected)
+print("输入可以是生成器:", verify_many((item for item in items), processes=2) == expected)
+print("空输入:", verify_many([], processes=2) == [])
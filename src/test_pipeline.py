@@ -0,0 +1,67 @@
+import os
+import tempfile
+from sm2_core import SM2
+from sm2_pipeline import sign_tree
+from sm2_sigfile import SignatureBundle, read_signature
+
+sm2 = SM2(load_key=False)
+sm2.setSecretKey()
+root = tempfile.mkdtemp()
+input_dir = os.path.join(root, 'input')
+for i in range(40):
+    directory = os.path.join(input_dir, f"d{i % 4}", f"sub{i % 3}")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"f{i}.bin"), 'wb') as f:
+        f.write(os.urandom(i * 37))
+# 超过阈值的大文件由签名进程按路径读取
+with open(os.path.join(input_dir, 'large.dat'), 'wb') as f:
+    f.write(os.urandom(100 << 10))
+
+# 输出目录位于输入目录之内时不会被再次签名
+output_dir = os.path.join(input_dir, 'signed')
+stats = sign_tree(input_dir, sm2.private_key, output_dir=output_dir, processes=2, batch_size=8, queue_size=16)
+print(f"签名文件数: {stats.files}, 失败: {stats.failed}, {stats.files_per_second:.1f} 个文件/秒")
+ok = True
+for dirpath, _, filenames in os.walk(output_dir):
+    for name in filenames:
+        signature_path = os.path.join(dirpath, name)
+        relpath = os.path.relpath(signature_path, output_dir)[:-len('.sig')]
+        record, _, _ = read_signature(signature_path)
+        ok = ok and sm2.verify_file(os.path.join(input_dir, relpath), record.signature, sm2.public_key)
+print("输出目录中的签名全部有效:", ok and stats.files == 41)
+
+# 单进程模式写入签名包
+bundle_path = os.path.join(root, 'signatures.bundle')
+stats = sign_tree(input_dir, sm2.private_key, bundle_path=bundle_path, processes=1)
+with SignatureBundle(bundle_path) as bundle:
+    print("签名包中的签名全部有效:", len(bundle) == stats.files and all(
+        sm2.verify_file(os.path.join(input_dir, name), record.signature, sm2.public_key)
+        for name, record in bundle if not name.startswith('signed/')))
+
+# 批量验签：签名目录与签名包，篡改、删除原始文件后对应条目失败
+from sm2_pipeline import iter_verify_tree
+
+resolve_key = {sm2.public_key.fingerprint(): sm2.public_key}.get
+results = list(iter_verify_tree(output_dir, input_dir, resolve_key, processes=2, batch_size=8))
+print("签名目录验签全部通过:", len(results) == 41 and all(r.ok for r in results))
+with open(os.path.join(input_dir, 'd1', 'sub1', 'f1.bin'), 'r+b') as f:
+    data = f.read()
+    f.seek(0)
+    f.write(bytes([data[0] ^ 1]) + data[1:])
+os.remove(os.path.join(input_dir, 'd2', 'sub2', 'f2.bin'))
+failures = {r.path: r.error for r in iter_verify_tree(bundle_path, input_dir, resolve_key, processes=1) if not r.ok}
+print("篡改和缺失的文件被检出:", failures == {'d1/sub1/f1.bin': '签名无效', 'd2/sub2/f2.bin': '原始文件不存在'})
+
+# 旧版文本.sig自带公钥：只有公钥指纹在密钥库中时才验签，攻击者用自己的密钥签名的文件被拒绝
+attacker = SM2(load_key=False)
+attacker.setSecretKey()
+legacy_dir = os.path.join(root, 'legacy')
+for relpath, signer in (('d3/sub0/f3.bin', sm2), ('d0/sub1/f4.bin', attacker)):
+    r, s = signer.sign_file(os.path.join(input_dir, relpath))
+    target = os.path.join(legacy_dir, relpath + '.sig')
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'w', encoding='utf-8') as f:
+        f.write(f"r: {signer.hex(r)}\ns: {signer.hex(s)}\n公钥X: {signer.hex(signer.PBx)}\n公钥Y: {signer.hex(signer.PBy)}\n")
+results = {r.path: (r.ok, r.error) for r in iter_verify_tree(legacy_dir, input_dir, resolve_key, processes=1)}
+print("旧版.sig中不可信的公钥被拒绝:", results == {'d3/sub0/f3.bin': (True, None),
+                                                   'd0/sub1/f4.bin': (False, '未知的公钥指纹')})
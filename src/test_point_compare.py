@@ -28,6 +28,17 @@ for k in k_list:
     print(f"  是否一致: {my_point[0]==gmssl_x and my_point[1]==gmssl_y}")
     print("-")
 
+# 基点走预计算表，任意点走通用的Jacobian标量乘法，两条路径都要与gmssl对比
+print("\n对比multiPoint(任意点标量乘法)结果：")
+for k in k_list:
+    my_point = sm2.multiPoint([Px, Py], k)
+    gmssl_point = sm2_crypt._kg(k, public_key)
+    gmssl_x = int(gmssl_point[0:64], 16)
+    gmssl_y = int(gmssl_point[64:], 16)
+    print(f"k={k}")
+    print(f"  是否一致: {my_point[0]==gmssl_x and my_point[1]==gmssl_y}")
+    print("-")
+
 # 对比点加法
 print("\n对比addPoint(椭圆曲线点加法)结果：")
 points = [
@@ -45,4 +56,14 @@ for P, Q in points:
     # gmssl没有直接点加法接口，略
     print("-")
 
+# 对比双标量乘法[s]G + [t]P与分别计算后相加的结果
+print("\n对比double_scalar_multiply(双标量乘法)结果：")
+st_list = [(1, 1), (2, 3), (123456, 654321), (n-1, n-1), (n-2, 2)]
+for s, t in st_list:
+    my_point = sm2.double_scalar_multiply(s, t, (Px, Py))
+    ref_point = sm2.addPoint(sm2.multiPoint([Gx, Gy], s), sm2.multiPoint([Px, Py], t))
+    print(f"s={s}, t={t}")
+    print(f"  是否一致: {my_point == ref_point}")
+    print("-")
+
 print("\n如需更详细对比，可补充更多k和点对。")
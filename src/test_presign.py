@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from sm2_core import SM2
+from sm2_presign import PresignaturePool
+
+sm2 = SM2(load_key=False)
+sm2.setSecretKey()
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def valid_pair(k, x1):
+    return 1 <= k < sm2.n and sm2.base_multiply(k)[0] == x1
+
+
+# 后台线程补满，fill_level和stats反映当前状态
+pool = PresignaturePool(sm2, size=32, batch_size=8)
+print("后台补满:", wait_until(lambda: pool.fill_level() == 1.0))
+stats = pool.stats()
+print("stats:", stats['ready'] == 32 and stats['produced'] == 32 and stats['consumed'] == 0 and stats['misses'] == 0)
+
+# 多线程同时取用，任何(k, x1)都不会被取出两次
+taken = []
+lock = threading.Lock()
+
+
+def worker():
+    pairs = [pool.take() for _ in range(50)]
+    with lock:
+        taken.extend(pairs)
+
+
+threads = [threading.Thread(target=worker) for _ in range(8)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+print("多线程取用没有重复:", len(taken) == 400 and len({k for k, _ in taken}) == 400)
+print("取出的(k, x1)满足x1 = ([k]G).x:", all(valid_pair(k, x1) for k, x1 in taken[::25]))
+stats = pool.stats()
+print("consumed + misses等于取用次数:", stats['consumed'] + stats['misses'] == 400)
+pool.stop()
+
+# 低水位线：降到低水位线之前不补充，降到之后补满
+pool = PresignaturePool(sm2, size=16, low_watermark=4, batch_size=4)
+wait_until(lambda: len(pool) == 16)
+for _ in range(11):
+    pool.take()
+time.sleep(0.3)
+produced = pool.stats()['produced']
+print("高于低水位线时不补充:", len(pool) == 5 and produced == 16)
+pool.take()
+print("降到低水位线后补满:", wait_until(lambda: len(pool) == 16) and pool.stats()['produced'] > produced)
+
+# 池为空时在调用线程中直接计算
+empty = PresignaturePool(sm2, size=4, start=False)
+k, x1 = empty.take()
+print("池为空时直接计算:", valid_pair(k, x1) and empty.stats()['misses'] == 1 and len(empty) == 0)
+
+# 使用预签名池签名
+sm2.presign_pool = pool
+signature = sm2.sign(b'presign')
+print("使用预签名池的签名可以验证:", sm2.verify(b'presign', signature, sm2.public_key))
+sm2.presign_pool = None
+
+# fork出的子进程丢弃父进程中的(k, x1)，重新生成
+if hasattr(os, 'fork'):
+    parent_ks = {k for k, _ in list(pool._ready)}
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            ks = [pool.take()[0] for _ in range(16)]
+            reused = any(k in parent_ks for k in ks)
+            refilled = wait_until(lambda: len(pool) == 16)
+            os.write(w, b'%d%d' % (reused, refilled))
+        finally:
+            os._exit(0)
+    os.close(w)
+    os.waitpid(pid, 0)
+    result = os.read(r, 2)
+    print("子进程不复用父进程的k:", result[:1] == b'0')
+    print("子进程中后台线程重新补充:", result[1:] == b'1')
+    print("父进程的池不受影响:", {k for k, _ in list(pool._ready)} == parent_ks)
+pool.stop()
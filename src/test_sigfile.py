@@ -0,0 +1,84 @@
+import os
+import tempfile
+import time
+from sm2_core import SM2
+from sm2_sigfile import (SignatureRecord, SignatureBundle, SignatureBundleWriter, RECORD_SIZE,
+                         migrate_legacy_signature, read_signature, write_signature, encode_der_signature,
+                         decode_der_signature)
+
+sm2 = SM2(load_key=False)
+sm2.setSecretKey()
+fingerprint = sm2.public_key.fingerprint()
+tmpdir = tempfile.mkdtemp()
+
+# 单个二进制签名记录
+r, s = sm2.sign(b'artifact')
+record = SignatureRecord(r, s, fingerprint, 8)
+path = os.path.join(tmpdir, 'artifact.bin.sig')
+write_signature(path, record)
+loaded, public_key, name = read_signature(path)
+print(f"记录大小: {os.path.getsize(path)} 字节 (固定{RECORD_SIZE}字节)")
+print("二进制记录读写一致:", loaded == record and public_key is None and name == 'artifact.bin')
+
+# 旧版文本.sig
+legacy_path = os.path.join(tmpdir, 'legacy.txt.sig')
+with open(legacy_path, 'w', encoding='utf-8') as f:
+    f.write("原始文件: legacy.txt\n文件大小: 8 bytes\n签名时间: 2024-01-01 12:00:00\n")
+    f.write(f"r: {sm2.hex(r)}\ns: {sm2.hex(s)}\n公钥X: {sm2.hex(sm2.PBx)}\n公钥Y: {sm2.hex(sm2.PBy)}\n")
+legacy, public_key, name = read_signature(legacy_path)
+print("旧版文本格式读取:", legacy.signature == (r, s) and legacy.fingerprint == fingerprint
+      and public_key == sm2.public_key and name == 'legacy.txt')
+print("旧版签名验证:", sm2.verify(b'artifact', legacy.signature, public_key))
+
+# 旧版GUI按系统默认编码写.sig，中文Windows上为GBK；原始文件名含中文时不是合法的UTF-8
+gbk_path = os.path.join(tmpdir, '报告.txt.sig')
+with open(gbk_path, 'w', encoding='gbk') as f:
+    f.write("原始文件: 报告.txt\n文件大小: 8 bytes\n签名时间: 2024-01-01 12:00:00\n")
+    f.write(f"r: {sm2.hex(r)}\ns: {sm2.hex(s)}\n公钥X: {sm2.hex(sm2.PBx)}\n公钥Y: {sm2.hex(sm2.PBy)}\n")
+legacy, public_key, name = read_signature(gbk_path)
+print("GBK编码的旧版.sig读取:", legacy.signature == (r, s) and public_key == sm2.public_key and name == '报告.txt')
+migrated = migrate_legacy_signature(gbk_path)
+print("GBK编码的旧版.sig转换为二进制记录:", read_signature(gbk_path)[0] == migrated and migrated.signature == (r, s))
+
+# DER编码
+der = record.to_der()
+print("DER编解码一致:", decode_der_signature(der) == (r, s), all(
+    decode_der_signature(encode_der_signature(a, b)) == (a, b) for a, b in [(1, 1), (127, 128), (sm2.n - 1, 255)]))
+
+# 签名包：写入大量记录后按序号和名称随机访问
+count = 20000
+bundle_path = os.path.join(tmpdir, 'signatures.bundle')
+start = time.perf_counter()
+with SignatureBundleWriter(bundle_path) as writer:
+    for i in range(count):
+        writer.add(f"dir/file-{i:06d}.bin", SignatureRecord(r + i, s, fingerprint, i, 0))
+write_time = time.perf_counter() - start
+with SignatureBundle(bundle_path) as bundle:
+    start = time.perf_counter()
+    ok = all(bundle.get(f"dir/file-{i:06d}.bin").r == r + i for i in range(0, count, 7))
+    lookup_time = (time.perf_counter() - start) / len(range(0, count, 7))
+    print("签名包按名称查找:", ok and len(bundle) == count and "missing" not in bundle)
+    print("签名包按序号读取:", bundle[123] == ("dir/file-000123.bin", SignatureRecord(r + 123, s, fingerprint, 123, 0)))
+print(f"写入{count}条: {write_time * 1000:.1f} ms, 平均每次按名称查找: {lookup_time * 1e6:.1f} us")
+print(f"签名包大小: {os.path.getsize(bundle_path) / count:.1f} 字节/条")
+
+# 索引分段排序后归并：倒序写入，每段1000个名称，仍能按名称查找
+merged_path = os.path.join(tmpdir, 'merged.bundle')
+with SignatureBundleWriter(merged_path, run_size=1000) as writer:
+    for i in reversed(range(count)):
+        writer.add(f"dir/file-{i:06d}.bin", SignatureRecord(r + i, s, fingerprint, i, 0))
+with SignatureBundle(merged_path) as bundle:
+    ok = all(bundle.get(f"dir/file-{i:06d}.bin").r == r + i for i in range(0, count, 7))
+    print("签名包分段排序后归并:", ok and len(bundle) == count)
+
+# 同名条目在关闭时报错，不留下未完成的签名包
+for run_size in (1000, 100000):
+    duplicate_path = os.path.join(tmpdir, 'duplicate.bundle')
+    try:
+        with SignatureBundleWriter(duplicate_path, run_size=run_size) as writer:
+            for i in range(3000):
+                writer.add(f"file-{i % 2999}", SignatureRecord(r, s, fingerprint, i, 0))
+        rejected = False
+    except ValueError:
+        rejected = True
+    print(f"签名包拒绝同名条目(每段{run_size}个):", rejected and not os.path.exists(duplicate_path))
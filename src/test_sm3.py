@@ -0,0 +1,58 @@
+from sm3_core import SM3, SM3_BACKEND, PySM3, sm3_hash
+from gmssl import sm3, func
+import os
+import time
+
+# 标准测试向量（GB/T 32905 附录A）
+vectors = [
+    (b"abc", "66c7f0f462eeedd9d1f2d46bdc10e4e24167c4875cf2f7a2297da02b8f4ba8e0"),
+    (b"abcd" * 16, "debe9ff92275b8a138604889c18e5a4d6fdb70e5387e5765293dcba39c0c5732"),
+]
+
+print("对比SM3标准测试向量：")
+for msg, expected in vectors:
+    print(f"len={len(msg)}  是否一致: {sm3_hash(msg).hex() == expected}")
+
+# 不同长度的随机消息，覆盖填充边界
+print("\n对比sm3_core与gmssl摘要结果：")
+for size in [0, 1, 55, 56, 63, 64, 65, 119, 120, 128, 1000, 65537]:
+    data = os.urandom(size)
+    mine = sm3_hash(data).hex()
+    ref = sm3.sm3_hash(func.bytes_to_list(data))
+    # 分块update的结果必须与一次性计算相同；纯Python实现与OpenSSL实现结果相同
+    h = SM3()
+    py = PySM3()
+    for i in range(0, size, 37):
+        h.update(memoryview(data)[i:i + 37])
+        py.update(memoryview(data)[i:i + 37])
+    print(f"len={size}  是否一致: {mine == ref and h.hexdigest() == ref and py.hexdigest() == ref}")
+
+# copy()之后两个对象互不影响
+print(f"\n当前SM3实现: {SM3_BACKEND}")
+for cls in dict.fromkeys((SM3, PySM3)):
+    h = cls(b"ab")
+    c = h.copy()
+    c.update(b"c")
+    print(f"{cls.__name__}.copy()互不影响: {c.hexdigest() == vectors[0][1] and h.digest() == sm3_hash(b'ab')}")
+
+# 吞吐量对比
+print("\n吞吐量对比(MB/s)：")
+data = os.urandom(256 * 1024)
+mb = len(data) / (1024 * 1024)
+
+start = time.perf_counter()
+sm3_hash(data)
+mine_time = time.perf_counter() - start
+
+start = time.perf_counter()
+PySM3(data).digest()
+py_time = time.perf_counter() - start
+
+start = time.perf_counter()
+sm3.sm3_hash(func.bytes_to_list(data))
+ref_time = time.perf_counter() - start
+
+print(f"  sm3_core({SM3_BACKEND}): {mb / mine_time:.2f} MB/s")
+print(f"  sm3_core(python):  {mb / py_time:.2f} MB/s")
+print(f"  gmssl:    {mb / ref_time:.2f} MB/s")
+print(f"  加速比:   {ref_time / mine_time:.1f}x")
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+# 无界面启动的时间预算（秒）：导入模块并构造SM2实例
+STARTUP_BUDGET = 0.2
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+cases = [
+    ("sm2_core + SM2(load_key=False)", "import sm2_core; sm2_core.SM2(load_key=False)"),
+    ("main", "import main"),
+    ("launcher", "import launcher"),
+]
+
+print("无界面启动耗时(在新进程中测量)：")
+for name, code in cases:
+    probe = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{code}\n"
+        "elapsed = time.perf_counter() - start\n"
+        "print(elapsed, 'tkinter' in sys.modules)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", probe], cwd=current_dir,
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+    elapsed, tk_loaded = float(output[-2]), output[-1] == "True"
+    print(f"{name}: {elapsed * 1000:.1f} ms, 加载tkinter: {tk_loaded}")
+    print(f"  是否在预算内: {elapsed < STARTUP_BUDGET and not tk_loaded}")
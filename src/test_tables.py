@@ -0,0 +1,35 @@
+import os
+import tempfile
+import time
+from sm2_core import SM2
+from sm2_tables import load_tables, save_tables
+
+sm2 = SM2(load_key=False)
+path = os.path.join(tempfile.mkdtemp(), 'sm2_tables.bin')
+
+start = time.perf_counter()
+base_table = sm2._build_base_table()
+g_table = sm2._odd_multiples((sm2.Gx, sm2.Gy), sm2.G_WNAF_WINDOW)
+build_time = time.perf_counter() - start
+print("写入预计算表:", save_tables(path, sm2, sm2.BASE_WINDOW, sm2.G_WNAF_WINDOW, base_table, g_table))
+
+start = time.perf_counter()
+tables = load_tables(path, sm2, sm2.BASE_WINDOW, sm2.G_WNAF_WINDOW)
+load_time = time.perf_counter() - start
+print("读取结果与构建结果一致:", tables == (base_table, g_table))
+print(f"构建: {build_time * 1000:.1f} ms, mmap读取: {load_time * 1000:.1f} ms")
+
+# 窗口宽度不同视为过期，数据被篡改时摘要校验失败
+print("窗口宽度不同时失效:", load_tables(path, sm2, sm2.BASE_WINDOW + 1, sm2.G_WNAF_WINDOW) is None)
+with open(path, 'r+b') as f:
+    f.seek(-1, os.SEEK_END)
+    last = f.read(1)
+    f.seek(-1, os.SEEK_END)
+    f.write(bytes([last[0] ^ 1]))
+print("数据损坏时失效:", load_tables(path, sm2, sm2.BASE_WINDOW, sm2.G_WNAF_WINDOW) is None)
+
+# SM2在文件损坏时自动重建并覆盖
+SM2.TABLE_PATH = path
+SM2._base_table = SM2._g_wnaf_table = None
+sm2._get_base_table()
+print("自动重建后文件有效:", load_tables(path, sm2, sm2.BASE_WINDOW, sm2.G_WNAF_WINDOW) == (base_table, g_table))
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import time
+from sm2_tasks import TaskRunner
+from sm3_core import FileDigestCache, SM3, sm3_file, update_from_file
+
+# 没有显示器时无法创建Tk窗口，这里在主线程中按GUI的方式定时轮询，测量后台杂凑期间主线程的响应延迟
+POLL_INTERVAL = 0.05
+
+directory = tempfile.mkdtemp()
+small = os.path.join(directory, 'small.bin')
+large = os.path.join(directory, 'large.bin')
+with open(small, 'wb') as f:
+    f.write(os.urandom(64 << 10))
+with open(large, 'wb') as f:
+    f.write(os.urandom(1 << 20))
+
+
+def hash_task(task, path):
+    task.set_phase("计算杂凑值", os.path.getsize(path))
+
+    # OpenSSL的SM3计算1 MB只需几毫秒，每块暂停10 ms模拟慢速磁盘，使任务持续足够长的时间
+    def progress(done, total):
+        task.progress(done, total)
+        time.sleep(0.01)
+    return FileDigestCache().digest(path, b'', 16 << 10, progress)
+
+
+def run_until_idle(runner, timeout=60):
+    """模拟root.after轮询，返回两次轮询之间超出预定间隔的最大延迟(秒)和观察到的进度"""
+    worst = 0.0
+    seen = []
+    deadline = time.perf_counter() + timeout
+    while len(runner) and time.perf_counter() < deadline:
+        expected = time.perf_counter() + POLL_INTERVAL
+        time.sleep(POLL_INTERVAL)
+        worst = max(worst, time.perf_counter() - expected)
+        for task in runner.poll():
+            seen.append((task.phase, task.done, task.total))
+    return worst, seen
+
+
+runner = TaskRunner(max_workers=2)
+
+# 进度报告与主线程响应
+results = {}
+runner.submit('hash', '读取 large.bin', hash_task, large, on_done=lambda d: results.__setitem__('large', d))
+worst, seen = run_until_idle(runner)
+print("后台杂凑结果正确:", results.get('large') == sm3_file(large))
+print("主线程能看到字节进度:", any(0 < done < total for _, done, total in seen))
+print(f"后台杂凑期间主线程最大延迟 {worst * 1000:.1f} ms，低于100 ms:", worst < 0.1)
+
+# 取消：任务在下一次报告进度时退出，不调用完成回调
+called = []
+task = runner.submit('hash', '读取 large.bin', hash_task, large, on_done=called.append, on_error=called.append)
+time.sleep(0.2)
+start = time.perf_counter()
+runner.cancel()
+run_until_idle(runner)
+print("取消后很快结束且不回调:", not called and time.perf_counter() - start < 1.0 and task.cancelled)
+
+# 同名任务：后提交的取消先提交的，只显示最后一次
+shown = []
+runner.submit('hash', '读取 large.bin', hash_task, large, on_done=lambda d: shown.append('large'))
+runner.submit('hash', '读取 small.bin', hash_task, small, on_done=lambda d: shown.append('small'))
+run_until_idle(runner)
+print("同名任务只保留最后一个:", shown == ['small'])
+
+# 不同名任务可以同时运行，第一个未结束时就能开始第二个
+done = []
+runner.submit(('sign', large), '签名 large.bin', hash_task, large, on_done=lambda d: done.append('large'))
+runner.submit(('sign', small), '签名 small.bin', hash_task, small, on_done=lambda d: done.append('small'))
+run_until_idle(runner)
+print("不同任务并发执行:", sorted(done) == ['large', 'small'] and done[0] == 'small')
+
+# 任务中的异常交给on_error
+errors = []
+runner.submit('hash', '读取 missing', hash_task, os.path.join(directory, 'missing'), on_error=errors.append)
+run_until_idle(runner)
+print("异常传给on_error:", len(errors) == 1 and isinstance(errors[0], OSError))
+
+# progress回调按块报告，最后一次等于文件大小
+reports = []
+hasher = SM3()
+update_from_file(hasher, small, 16 << 10, progress=lambda d, t: reports.append((d, t)))
+print("update_from_file进度回调:", reports[0] == (0, 64 << 10) and reports[-1] == (64 << 10, 64 << 10)
+      and len(reports) == 5 and hasher.digest() == sm3_file(small))
+
+runner.shutdown()
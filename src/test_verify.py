@@ -1,15 +1,11 @@
 from sm2_core import SM2
 from gmssl import sm3, func, sm2 as gmssl_sm2
-import sys
 import os
 
 # 获取当前文件所在目录的绝对路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
-log_file = os.path.join(current_dir, "sm2_debug_log.txt")
 test_file = os.path.join(current_dir, "assets", "test1.txt")
 
-sys.stdout = open(log_file, "w", encoding="utf-8")
-
 sm2 = SM2()
 Px, Py = sm2.PBx, sm2.PBy
 
@@ -0,0 +1,48 @@
+from gmssl import func, sm3
+from sm2_core import SM2, compute_za
+
+
+def reference_za(user_id, Px, Py):
+    """按GB/T 32918直接拼接后用gmssl的SM3计算ZA"""
+    data = (
+        (len(user_id) * 8).to_bytes(2, 'big') + user_id +
+        b''.join(v.to_bytes(32, 'big') for v in (SM2.a, SM2.b, SM2.Gx, SM2.Gy, Px, Py))
+    )
+    return bytes.fromhex(sm3.sm3_hash(func.bytes_to_list(data)))
+
+
+sm2 = SM2(load_key=False)
+sm2.setSecretKey()
+Px, Py = sm2.PBx, sm2.PBy
+message = b'ZA test message'
+
+# 缓存的ZA与参考计算一致：默认用户ID和自定义用户ID
+for user_id in ('1234567812345678', 'alice@example.com', '用户'):
+    expected = reference_za(user_id.encode('utf-8'), Px, Py)
+    first = sm2.get_ZA(user_id, Px, Py)
+    hits = sm2.za_cache.hits
+    second = sm2.get_ZA(user_id.encode('utf-8'), Px, Py)
+    print(f"user_id={user_id} ZA与参考计算一致:", first == expected and compute_za(user_id, Px, Py) == expected)
+    print(f"user_id={user_id} 再次获取命中缓存:", second == expected and sm2.za_cache.hits == hits + 1)
+print("compute_ZA返回十六进制:", sm2.compute_ZA('alice@example.com', Px, Py) == reference_za(b'alice@example.com', Px, Py).hex())
+print("默认公钥的ZA:", sm2.public_key.default_za() == reference_za(b'1234567812345678', Px, Py))
+
+# 调用方直接提供ZA：bytes和十六进制字符串均可，与按user_id计算的结果互通
+ZA = reference_za(b'alice@example.com', Px, Py)
+signature = sm2.sign(message, ZA=ZA)
+print("bytes形式的ZA签名可按user_id验证:", sm2.verify(message, signature, Px, Py, user_id='alice@example.com'))
+signature = sm2.sign(message, user_id='alice@example.com')
+print("十六进制形式的ZA验证:", sm2.verify(message, signature, Px, Py, ZA=ZA.hex()))
+print("bytearray形式的ZA验证:", sm2.verify(message, signature, Px, Py, ZA=bytearray(ZA)))
+print("ZA与user_id不符时验证失败:", not sm2.verify(message, signature, Px, Py))
+
+# 长度错误的ZA被拒绝
+ok = True
+for bad in (ZA[:31], ZA + b'\x00', ZA.hex()[:62], ''):
+    for call in (lambda: sm2.sign(message, ZA=bad), lambda: sm2.verify(message, signature, Px, Py, ZA=bad)):
+        try:
+            call()
+            ok = False
+        except ValueError:
+            pass
+print("长度错误的ZA抛出ValueError:", ok)